@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import chat, health
+from app.api.api_v1.endpoints import admin, chat, health, jobs
 
 api_router = APIRouter()
 
@@ -9,8 +9,20 @@ api_router.include_router(
     tags=["chat"]
 )
 
+api_router.include_router(
+    jobs.router,
+    prefix="/chat/jobs",
+    tags=["jobs"]
+)
+
 api_router.include_router(
     health.router,
     prefix="/system",
     tags=["system"]
 )
+
+api_router.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["admin"]
+)
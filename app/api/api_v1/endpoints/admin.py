@@ -0,0 +1,61 @@
+# ================================
+# FILE: app/api/api_v1/endpoints/admin.py
+# ================================
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from datetime import datetime
+import asyncio
+import threading
+import logging
+
+from app.core.config import settings
+from app.core.profiling import collapsed, sample_stacks
+from app.dependencies.thread import current_admin_user, ClerkUser
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# One profile at a time per worker; overlapping samplers would profile each other
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    all_threads: bool = False,
+    include_idle: bool = False,
+    user: ClerkUser = Depends(current_admin_user)
+):
+    """
+    Sample this worker's Python stacks for ``seconds`` and return them as a
+    collapsed-stack file (flamegraph.pl, speedscope). By default only the
+    event loop thread is sampled and samples of the idle loop are dropped.
+    """
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS}"
+        )
+    if _profile_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+
+    async with _profile_lock:
+        logger.info(f"Profiling worker for {seconds}s at {interval_ms}ms (requested by {user.id})")
+        counts = await asyncio.to_thread(
+            sample_stacks,
+            seconds,
+            interval_ms / 1000,
+            None if all_threads else threading.get_ident(),
+            include_idle
+        )
+
+    filename = f"profile-{datetime.utcnow():%Y%m%dT%H%M%S}.collapsed"
+    return PlainTextResponse(
+        collapsed(counts),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(sum(counts.values())),
+        }
+    )
@@ -1,105 +1,365 @@
 # ================================
 # FILE: app/api/api_v1/endpoints/chat.py
 # ================================
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from fastapi.responses import Response, StreamingResponse
-from app.schemas.chat import ChatRequest, ChatResponse, ChatHistory
-from app.services.chat_service import chat_service
+from app.schemas.chat import ChatRequest, ChatResponse, ChatHistory, MessageEditRequest, MessageRegenerateRequest
+from app.schemas.chat import BatchChatRequest, BatchChatResult
+from app.services.chat_service import ChatTurnError, chat_service
+from app.services.synthetic_stream import LATENCY_DISTRIBUTIONS, default_profile
+from app.services.langgraph_agent import ForkError, MessageNotFoundError
+from app.services.admission import AdmissionRejected
+from app.services.thread_locks import ThreadBusyError
+from app.services.idempotency import (
+    IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyConflict, idempotency_store, request_fingerprint
+)
 from app.dependencies.thread import verify_from_request_body,verify_from_path,verify_from_update_title_req_body
+from app.dependencies.thread import verify_from_edit_req_body, verify_from_regenerate_req_body
+from app.core.config import settings
 from app.core.database import db_manager
-from langchain_google_genai import ChatGoogleGenerativeAI
+from app.utils.thread_permissions import verify_threads_ownership
 from app.schemas.threads import ThreadCreate, ThreadResponse
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
 from uuid import uuid4
+import math
 from app.schemas.threads import ThreadCreate, ThreadResponse,ThreadTitleUpdateRequest
 from datetime import datetime
 from typing import List
 from app.dependencies.thread import current_active_user,ClerkUser
+from app.utils.sse import SSE_HEADERS, is_event, dumps
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _turn_http_error(e: Exception) -> HTTPException:
+    """Map turn admission/fork errors to HTTP errors"""
+    if isinstance(e, AdmissionRejected):
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after or 1))}
+        )
+    if isinstance(e, MessageNotFoundError):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    if isinstance(e, (ThreadBusyError, ForkError, IdempotencyConflict)):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return HTTPException(status_code=500, detail=str(e))
+
+
+def _streaming_backend():
+    """The agent, or the synthetic backend when SYNTHETIC_STREAM_ENABLED switches it on globally"""
+    if settings.SYNTHETIC_STREAM_ENABLED:
+        return chat_service.process_chat_message_streaming_mock
+    return chat_service.process_chat_message_streaming
+
+
 # Add this endpoint for testing mock streaming
 @router.post("/message/stream/mock")
 async def send_message_streaming_mock(
-    request: ChatRequest
+    request: ChatRequest,
+    distribution: Optional[str] = Query(None, pattern="^(" + "|".join(LATENCY_DISTRIBUTIONS) + ")$"),
+    ttft: Optional[float] = Query(None, ge=0, le=60),
+    chunk_delay: Optional[float] = Query(None, ge=0, le=10),
+    words: Optional[int] = Query(None, ge=1, le=10000),
+    tool_call_ratio: Optional[float] = Query(None, ge=0, le=1),
+    tool_latency: Optional[float] = Query(None, ge=0, le=60),
+    seed: Optional[int] = None
     # user: ClerkUser = Depends(current_active_user),
     # _: None = Depends(verify_from_request_body)
 ):
     """
-    Mock streaming endpoint for testing
+    Stream a synthetic turn (same events as /message/stream, no LLM or tools).
+    Query parameters override the SYNTHETIC_* settings for this request;
+    delays are means of ``distribution``, ``seed`` makes the timing repeatable.
     """
     try:
+        profile = default_profile().with_overrides(
+            distribution=distribution,
+            ttft=ttft,
+            chunk_delay=chunk_delay,
+            response_words=words,
+            tool_call_ratio=tool_call_ratio,
+            tool_latency=tool_latency,
+            seed=seed
+        )
         return StreamingResponse(
             chat_service.process_chat_message_streaming_mock(
                 message=request.message,
-                thread_id=request.thread_id
+                thread_id=request.thread_id,
+                profile=profile
             ),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Content-Type": "text/event-stream",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Cache-Control"
-            }
+            headers=SSE_HEADERS
         )
     except Exception as e:
         logger.error(f"Error in mock streaming endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 @router.post("/message/stream")
 async def send_message_streaming(
-    request: ChatRequest
-    # user: ClerkUser = Depends(current_active_user),
-    # _: None = Depends(verify_from_request_body)
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255),
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_request_body)
 ):
     """
-    Send a message to the chatbot and get a streaming response
+    Send a message to the chatbot and get a streaming response.
+    With an Idempotency-Key header a retried request re-streams the run
+    started by the first one (from its first frame) instead of running the turn again.
     """
     try:
+        stream_turn = _streaming_backend()
+        if idempotency_key is None:
+            return StreamingResponse(
+                stream_turn(
+                    message=request.message,
+                    thread_id=request.thread_id,
+                    user_id=str(user.id)
+                ),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS
+            )
+
+        async def produce(run):
+            async for frame in stream_turn(
+                    message=request.message,
+                    thread_id=request.thread_id,
+                    user_id=str(user.id)
+            ):
+                if is_event(frame, "error"):
+                    run.failed = True
+                run.append(frame)
+
+        run, replayed = idempotency_store.start(
+            request.thread_id,
+            idempotency_key,
+            request_fingerprint("message/stream", request.thread_id, request.message),
+            produce
+        )
         return StreamingResponse(
-            chat_service.process_chat_message_streaming(
-                message=request.message,
-                thread_id=request.thread_id
-            ),
+            run.stream(),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Content-Type": "text/event-stream",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Cache-Control"
-            }
+            headers={**SSE_HEADERS, REPLAYED_HEADER: str(replayed).lower()}
         )
+    except IdempotencyConflict as e:
+        raise _turn_http_error(e)
     except Exception as e:
         logger.error(f"Error in streaming send_message endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/message", response_model=ChatResponse)
-async def send_message(request: ChatRequest,user: ClerkUser = Depends(current_active_user),_: None = Depends(verify_from_request_body)):
+async def send_message(
+    request: ChatRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255),
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_request_body)
+):
     """
-    Send a message to the chatbot and get a response
+    Send a message to the chatbot and get a response.
+    With an Idempotency-Key header a retried request gets the response of the
+    first one (waiting for it if it is still running) instead of running the turn again.
     """
     try:
-        response = await chat_service.process_chat_message(
-            message=request.message,
-            thread_id=request.thread_id
+        if idempotency_key is None:
+            return await chat_service.process_chat_message(
+                message=request.message,
+                thread_id=request.thread_id,
+                user_id=str(user.id)
+            )
+
+        async def produce(run):
+            try:
+                return await chat_service.process_chat_message(
+                    message=request.message,
+                    thread_id=request.thread_id,
+                    user_id=str(user.id),
+                    raise_on_error=True
+                )
+            except ChatTurnError as e:
+                # Answer as without a key, but free the key so that a retry runs the turn again
+                run.failed = True
+                return e.response
+
+        run, replayed = idempotency_store.start(
+            request.thread_id,
+            idempotency_key,
+            request_fingerprint("message", request.thread_id, request.message),
+            produce
         )
-        return response
+        response.headers[REPLAYED_HEADER] = str(replayed).lower()
+        return await run.wait()
+    except (AdmissionRejected, ThreadBusyError, IdempotencyConflict) as e:
+        raise _turn_http_error(e)
     except Exception as e:
         logger.error(f"Error in send_message endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _create_threads(user_id: str, titles: List[str]) -> List[str]:
+    """Create one thread per title in a single round trip"""
+    now = datetime.now(timezone.utc)
+    thread_ids = [str(uuid4()) for _ in titles]
+    async with db_manager.get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.executemany(
+                "INSERT INTO threads (id, user_id, thread_title, created_at) VALUES (%s, %s, %s, %s)",
+                [(thread_id, user_id, title, now) for thread_id, title in zip(thread_ids, titles)]
+            )
+    logger.info(f"Created {len(thread_ids)} threads for batch of user_id: {user_id}")
+    return thread_ids
+
+
+@router.post("/batch")
+async def send_message_batch(
+    request: BatchChatRequest,
+    user: ClerkUser = Depends(current_active_user)
+):
+    """
+    Run many chat turns in one request and stream one JSON line per turn
+    (application/x-ndjson) in completion order. Items without a thread_id get
+    a new thread. Ownership of all given threads is checked up front with one
+    query; turns on the same thread run in order.
+    """
+    if len(request.items) > settings.CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"A batch can hold at most {settings.CHAT_BATCH_MAX_ITEMS} items"
+        )
+    user_id = str(user.id)
+    existing = {item.thread_id for item in request.items if item.thread_id}
+    if existing:
+        await verify_threads_ownership(existing, user_id)
+
+    new_items = [index for index, item in enumerate(request.items) if not item.thread_id]
+    thread_ids = [item.thread_id for item in request.items]
+    if new_items:
+        titles = [request.items[i].thread_title or request.items[i].message[:50] for i in new_items]
+        for index, thread_id in zip(new_items, await _create_threads(user_id, titles)):
+            thread_ids[index] = thread_id
+
+    concurrency = min(request.concurrency or settings.CHAT_BATCH_CONCURRENCY, settings.CHAT_BATCH_MAX_CONCURRENCY)
+    turns = [(thread_id, item.message) for thread_id, item in zip(thread_ids, request.items)]
+
+    async def results():
+        async for index, outcome in chat_service.process_chat_batch(turns, user_id, concurrency):
+            result = BatchChatResult(
+                index=index,
+                custom_id=request.items[index].custom_id,
+                thread_id=thread_ids[index],
+                status="error" if isinstance(outcome, Exception) else "ok",
+                response=None if isinstance(outcome, Exception) else outcome,
+                error=str(outcome) if isinstance(outcome, Exception) else None
+            )
+            yield dumps(result.model_dump(mode="json", exclude_none=True)) + b"\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("/message/regenerate", response_model=ChatResponse)
+async def regenerate_message(
+    request: MessageRegenerateRequest,
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_regenerate_req_body)
+):
+    """
+    Regenerate an assistant message: re-run its turn from the checkpoint before it.
+    The new answer becomes the current branch; the old one stays reachable via history.
+    """
+    try:
+        return await chat_service.process_chat_message(
+            message=None,
+            thread_id=request.thread_id,
+            user_id=str(user.id),
+            replace_message_id=request.message_id
+        )
+    except (AdmissionRejected, ThreadBusyError, ForkError) as e:
+        raise _turn_http_error(e)
+    except Exception as e:
+        logger.error(f"Error in regenerate_message endpoint: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/message/regenerate/stream")
+async def regenerate_message_streaming(
+    request: MessageRegenerateRequest,
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_regenerate_req_body)
+):
+    """
+    Regenerate an assistant message and stream the new response
+    """
+    return StreamingResponse(
+        chat_service.process_chat_message_streaming(
+            message=None,
+            thread_id=request.thread_id,
+            user_id=str(user.id),
+            replace_message_id=request.message_id
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.post("/message/edit", response_model=ChatResponse)
+async def edit_message(
+    request: MessageEditRequest,
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_edit_req_body)
+):
+    """
+    Replace a user message and re-run the conversation from that point.
+    Later turns stay on the previous branch.
+    """
+    try:
+        return await chat_service.process_chat_message(
+            message=request.message,
+            thread_id=request.thread_id,
+            user_id=str(user.id),
+            replace_message_id=request.message_id
+        )
+    except (AdmissionRejected, ThreadBusyError, ForkError) as e:
+        raise _turn_http_error(e)
+    except Exception as e:
+        logger.error(f"Error in edit_message endpoint: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/message/edit/stream")
+async def edit_message_streaming(
+    request: MessageEditRequest,
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_edit_req_body)
+):
+    """
+    Replace a user message and stream the new response
+    """
+    return StreamingResponse(
+        chat_service.process_chat_message_streaming(
+            message=request.message,
+            thread_id=request.thread_id,
+            user_id=str(user.id),
+            replace_message_id=request.message_id
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @router.get("/history/{thread_id}", response_model=ChatHistory)
-async def get_chat_history(thread_id: str,user: ClerkUser = Depends(current_active_user), _: None = Depends(verify_from_path)):
+async def get_chat_history(
+    thread_id: str,
+    include_branches: bool = False,
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_path)
+):
     """
-    Get chat history for a specific thread
+    Get chat history for a specific thread (the current branch).
+    With include_branches, messages replaced by edits/regenerations are listed as alternatives.
     """
     try:
-        history = await chat_service.get_chat_history(thread_id)
+        history = await chat_service.get_chat_history(thread_id, include_branches=include_branches)
         return history
     except Exception as e:
         logger.error(f"Error in get_chat_history endpoint: {e}")
@@ -211,7 +471,8 @@ async def update_thread_title(
     user: ClerkUser = Depends(current_active_user),
     _: None = Depends(verify_from_update_title_req_body)
 ):
-    # Initialize LLM
+    # Initialize LLM (imported here: the Google client is slow to import and only titles use it)
+    from langchain_google_genai import ChatGoogleGenerativeAI
     llm = ChatGoogleGenerativeAI(model="gemma-3-27b-it")
 
     # Compose a prompt for title generation
@@ -3,15 +3,15 @@
 # ================================
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, status, Form
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi_users.db import SQLAlchemyUserDatabase
 from typing import Optional
 import os
 
-from app.core.database import User, get_user_db
 from fastapi import APIRouter
-from app.schemas.chat import HealthCheck
+from app.schemas.chat import HealthCheck, LivenessCheck, ReadinessCheck
 from app.core.config import settings
+from app.services.resilience import circuit_breakers
+from app.services.health_monitor import health_monitor
+from app.services.warmup import warmup
 from datetime import datetime
 
 router = APIRouter()
@@ -20,10 +20,49 @@ router = APIRouter()
 @router.get("/health", response_model=HealthCheck)
 async def health_check():
     """
-    Health check endpoint
+    Health overview from the health monitor's last snapshot. Reports "degraded"
+    while any circuit breaker is not closed or the worker is not ready; always
+    200, use /live and /ready for probes.
     """
+    snapshot = health_monitor.snapshot()
+    degraded = circuit_breakers.any_open() or bool(health_monitor.not_ready_reasons())
     return HealthCheck(
-        status="healthy",
+        status="degraded" if degraded else "healthy",
         timestamp=datetime.utcnow(),
-        version=settings.VERSION
+        version=settings.VERSION,
+        circuit_breakers=circuit_breakers.snapshot(),
+        checks=snapshot["checks"],
+        checks_age_seconds=snapshot["age_seconds"]
+    )
+
+
+@router.get("/live", response_model=LivenessCheck)
+async def liveness_check():
+    """
+    Liveness probe. Answers as long as the event loop does; touches no
+    dependency, so a slow database never gets a worker restarted.
+    """
+    return LivenessCheck(status="alive", timestamp=datetime.utcnow())
+
+
+@router.get("/ready", response_model=ReadinessCheck, responses={503: {"model": ReadinessCheck}})
+async def readiness_check(response: Response):
+    """
+    Readiness probe. Returns 503 until the startup warmup has finished and
+    while the DB pool is saturated, the checkpointer database is unreachable
+    or the event loop lags. Read from the health monitor's snapshot; the probe
+    itself queries nothing. Open circuit breakers are reported, not failed on:
+    every worker shares the same upstreams.
+    """
+    reasons = health_monitor.not_ready_reasons()
+    if reasons:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    snapshot = health_monitor.snapshot()
+    return ReadinessCheck(
+        status="warming_up" if "warming_up" in reasons else ("not_ready" if reasons else "ready"),
+        timestamp=datetime.utcnow(),
+        reasons=reasons,
+        checks=snapshot["checks"],
+        checks_age_seconds=snapshot["age_seconds"],
+        warmup=warmup.snapshot()
     )
@@ -0,0 +1,87 @@
+# ================================
+# FILE: app/api/api_v1/endpoints/jobs.py
+# ================================
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.schemas.chat import ChatRequest, ChatJob
+from app.services.chat_jobs import chat_job_worker
+from app.services.idempotency import IDEMPOTENCY_HEADER, IdempotencyConflict
+from app.dependencies.thread import current_active_user, ClerkUser, verify_from_request_body
+from app.utils.sse import SSE_HEADERS
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+async def _owned_job(job_id: str, user: ClerkUser) -> ChatJob:
+    job = await chat_job_worker.get(job_id, str(user.id))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.post("", response_model=ChatJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255),
+    user: ClerkUser = Depends(current_active_user),
+    _: None = Depends(verify_from_request_body)
+):
+    """
+    Queue a chat turn and return at once. Poll GET /jobs/{job_id} or stream
+    GET /jobs/{job_id}/events for the result; the turn keeps running if the
+    client goes away and is picked up by another worker if this one stops.
+    """
+    try:
+        return await chat_job_worker.submit(
+            thread_id=request.thread_id,
+            user_id=str(user.id),
+            message=request.message,
+            idempotency_key=idempotency_key
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in submit_job endpoint: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{job_id}", response_model=ChatJob)
+async def get_job(job_id: str, user: ClerkUser = Depends(current_active_user)):
+    """
+    Status of a job, with the response once it has succeeded
+    """
+    return await _owned_job(job_id, user)
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    after: int = 0,
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    user: ClerkUser = Depends(current_active_user)
+):
+    """
+    Stream the job's chat events (same frames as /chat/message/stream) from
+    the start, or after ``after`` / Last-Event-ID when reconnecting.
+    """
+    job = await _owned_job(job_id, user)
+    return StreamingResponse(
+        chat_job_worker.events(job, after=last_event_id if last_event_id is not None else after),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@router.delete("/{job_id}", response_model=ChatJob)
+async def cancel_job(job_id: str, user: ClerkUser = Depends(current_active_user)):
+    """
+    Cancel a job: queued jobs never run, a running turn is stopped by its worker
+    """
+    job = await chat_job_worker.cancel(job_id, str(user.id))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
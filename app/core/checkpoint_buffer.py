@@ -0,0 +1,229 @@
+# ================================
+# FILE: app/core/checkpoint_buffer.py
+# ================================
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.postgres import _ainternal
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+from psycopg.types.json import Jsonb
+
+from app.core.checkpoint_cache import CachedCheckpointSaver
+from app.core.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint durability modes for a turn
+DURABILITY_STEP = "step"          # every superstep is written as it completes (LangGraph default)
+DURABILITY_BATCHED = "batched"    # every superstep is kept, written in one transaction at turn end
+DURABILITY_FINAL = "final"        # only the state at turn end is written
+DURABILITY_MODES = (DURABILITY_STEP, DURABILITY_BATCHED, DURABILITY_FINAL)
+
+
+@dataclass
+class _BufferedPut:
+    config: RunnableConfig
+    next_config: RunnableConfig
+    checkpoint: Checkpoint
+    metadata: CheckpointMetadata
+    new_versions: ChannelVersions
+
+
+@dataclass
+class _BufferedWrites:
+    config: RunnableConfig
+    writes: List[Tuple[str, Any]] = field(default_factory=list)
+    task_id: str = ""
+    task_path: str = ""
+
+
+class BufferedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Per-turn checkpointer that keeps writes in memory until ``flush()``.
+
+    Reads go to ``inner`` unless they ask for a checkpoint buffered by this
+    turn. ``flush()`` persists everything in order; on the Postgres saver it
+    is a single pipelined transaction instead of one round trip per superstep.
+    Buffered steps are lost if the process dies before the flush.
+    """
+
+    def __init__(self, inner: BaseCheckpointSaver):
+        super().__init__(serde=inner.serde)
+        self.inner = inner
+        self._ops: List[Any] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._ops)
+
+    @property
+    def config_specs(self) -> list:
+        return self.inner.config_specs
+
+    def get_next_version(self, current: Optional[Any], channel: None) -> Any:
+        return self.inner.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        checkpoint_id = get_checkpoint_id(config)
+        for index in range(len(self._ops) - 1, -1, -1):
+            op = self._ops[index]
+            if not isinstance(op, _BufferedPut):
+                continue
+            op_configurable = op.next_config["configurable"]
+            if (op_configurable["thread_id"], op_configurable["checkpoint_ns"]) != (
+                    configurable["thread_id"], configurable.get("checkpoint_ns", "")):
+                continue
+            if checkpoint_id not in (None, op.checkpoint["id"]):
+                continue
+            pending_writes = [
+                (w.task_id, channel, value)
+                for w in self._ops[index + 1:]
+                if isinstance(w, _BufferedWrites) and get_checkpoint_id(w.config) == op.checkpoint["id"]
+                for channel, value in w.writes
+            ]
+            parent_id = get_checkpoint_id(op.config)
+            return CheckpointTuple(
+                config=op.next_config,
+                checkpoint=copy_checkpoint(op.checkpoint),
+                metadata=get_checkpoint_metadata(op.config, op.metadata),
+                parent_config={"configurable": {**op_configurable, "checkpoint_id": parent_id}} if parent_id else None,
+                pending_writes=pending_writes,
+            )
+        return await self.inner.aget_tuple(config)
+
+    def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        return self.inner.alist(config, filter=filter, before=before, limit=limit)
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        next_config: RunnableConfig = {"configurable": {
+            "thread_id": configurable["thread_id"],
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+            "checkpoint_id": checkpoint["id"],
+        }}
+        self._ops.append(_BufferedPut(config, next_config, copy_checkpoint(checkpoint), metadata, new_versions))
+        return next_config
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        self._ops.append(_BufferedWrites(config, list(writes), task_id, task_path))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self._ops = [
+            op for op in self._ops
+            if str(op.config["configurable"]["thread_id"]) != str(thread_id)
+        ]
+        await self.inner.adelete_thread(thread_id)
+
+    async def flush(self) -> int:
+        """Persist buffered checkpoints and writes; returns the number of operations written"""
+        ops, self._ops = self._ops, []
+        if not ops:
+            return 0
+
+        cache = self.inner if isinstance(self.inner, CachedCheckpointSaver) else None
+        target = cache.inner if cache is not None else self.inner
+        try:
+            with stage_timer("checkpoint_flush"):
+                if isinstance(target, AsyncPostgresSaver):
+                    await _write_postgres_batch(target, ops)
+                else:
+                    for op in ops:
+                        await _replay(target, op)
+        except BaseException:
+            if cache is not None:
+                for op in ops:
+                    cache.invalidate(str(op.config["configurable"]["thread_id"]))
+            raise
+
+        if cache is not None:
+            for op in ops:
+                if isinstance(op, _BufferedPut):
+                    cache.remember_put(op.config, op.next_config, op.checkpoint, op.metadata)
+                else:
+                    cache.remember_writes(op.config, op.writes, op.task_id)
+        return len(ops)
+
+
+async def _replay(saver: BaseCheckpointSaver, op: Any):
+    if isinstance(op, _BufferedPut):
+        await saver.aput(op.config, op.checkpoint, op.metadata, op.new_versions)
+    else:
+        await saver.aput_writes(op.config, op.writes, op.task_id, op.task_path)
+
+
+def _postgres_params(saver: AsyncPostgresSaver, ops: Sequence[Any]) -> List[Tuple[str, List[Tuple]]]:
+    """(query, params) batches in the same shape AsyncPostgresSaver.aput/aput_writes send"""
+    blobs: List[Tuple] = []
+    checkpoints: List[Tuple] = []
+    writes: Dict[str, List[Tuple]] = {}
+    for op in ops:
+        configurable = op.config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        if isinstance(op, _BufferedPut):
+            copy = op.checkpoint.copy()
+            blobs.extend(saver._dump_blobs(thread_id, checkpoint_ns, copy.pop("channel_values"), op.new_versions))
+            checkpoints.append((
+                thread_id,
+                checkpoint_ns,
+                op.checkpoint["id"],
+                get_checkpoint_id(op.config),
+                Jsonb(saver._dump_checkpoint(copy)),
+                saver._dump_metadata(get_checkpoint_metadata(op.config, op.metadata)),
+            ))
+        else:
+            query = (
+                saver.UPSERT_CHECKPOINT_WRITES_SQL
+                if all(channel in WRITES_IDX_MAP for channel, _ in op.writes)
+                else saver.INSERT_CHECKPOINT_WRITES_SQL
+            )
+            writes.setdefault(query, []).extend(saver._dump_writes(
+                thread_id, checkpoint_ns, configurable["checkpoint_id"], op.task_id, op.task_path, op.writes
+            ))
+    batches = [(saver.UPSERT_CHECKPOINT_BLOBS_SQL, blobs), (saver.UPSERT_CHECKPOINTS_SQL, checkpoints)]
+    return [(query, params) for query, params in batches + list(writes.items()) if params]
+
+
+async def _write_postgres_batch(saver: AsyncPostgresSaver, ops: Sequence[Any]):
+    """Write all buffered operations in one transaction and one pipeline sync"""
+    batches = await asyncio.to_thread(_postgres_params, saver, ops)
+    async with _ainternal.get_connection(saver.conn) as conn:
+        async with conn.pipeline(), conn.transaction(), conn.cursor() as cur:
+            for query, params in batches:
+                await cur.executemany(query, params)
+    logger.debug(f"Flushed {len(ops)} buffered checkpoint operations")
@@ -0,0 +1,253 @@
+# ================================
+# FILE: app/core/checkpoint_cache.py
+# ================================
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+_CacheKey = Tuple[str, str]
+
+
+def _cache_key(config: RunnableConfig) -> _CacheKey:
+    configurable = config["configurable"]
+    return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Write-through LRU cache of the latest checkpoint per thread.
+
+    Every ``aput``/``aput_writes`` goes to ``inner`` first and then updates the
+    cached tuple, so reading the latest state of a thread this worker wrote
+    recently skips the database. Entries expire after ``ttl`` seconds, which
+    bounds staleness if another worker writes the same thread; run with sticky
+    thread routing (or a single worker) when the TTL is long. Explicit
+    checkpoint ids, history listing and the sync API go straight to ``inner``.
+    """
+
+    def __init__(self, inner: BaseCheckpointSaver, max_threads: int, ttl: float):
+        super().__init__(serde=inner.serde)
+        self.inner = inner
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self._entries: "OrderedDict[_CacheKey, Tuple[float, CheckpointTuple]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def config_specs(self) -> list:
+        return self.inner.config_specs
+
+    def get_next_version(self, current: Optional[Any], channel: None) -> Any:
+        return self.inner.get_next_version(current, channel)
+
+    # Cache bookkeeping
+
+    def _get(self, key: _CacheKey) -> Optional[CheckpointTuple]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, checkpoint_tuple = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return checkpoint_tuple
+
+    def _set(self, key: _CacheKey, checkpoint_tuple: CheckpointTuple):
+        self._entries[key] = (time.monotonic(), checkpoint_tuple)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_threads:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, thread_id: str):
+        """Drop every cached namespace of ``thread_id``"""
+        for key in [key for key in self._entries if key[0] == thread_id]:
+            del self._entries[key]
+
+    @staticmethod
+    def _copy(checkpoint_tuple: CheckpointTuple) -> CheckpointTuple:
+        # Callers mutate checkpoints they load (channel_values, pending_sends); keep the cached one intact
+        return checkpoint_tuple._replace(
+            checkpoint=copy_checkpoint(checkpoint_tuple.checkpoint),
+            pending_writes=list(checkpoint_tuple.pending_writes or []),
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cache occupancy and hit rate, for health and metrics reporting"""
+        lookups = self.hits + self.misses
+        return {
+            "threads": len(self._entries),
+            "max_threads": self.max_threads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    # Async API (used by the agent)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        key = _cache_key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        cached = self._get(key)
+        if cached is not None and checkpoint_id in (None, cached.checkpoint["id"]):
+            self.hits += 1
+            return self._copy(cached)
+
+        self.misses += 1
+        checkpoint_tuple = await self.inner.aget_tuple(config)
+        if checkpoint_tuple is not None and checkpoint_id is None:
+            self._set(key, checkpoint_tuple)
+            return self._copy(checkpoint_tuple)
+        return checkpoint_tuple
+
+    def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        return self.inner.alist(config, filter=filter, before=before, limit=limit)
+
+    def remember_put(
+            self,
+            config: RunnableConfig,
+            next_config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata
+    ):
+        """Cache a checkpoint that has already been written to ``inner``"""
+        key = _cache_key(config)
+        parent_id = get_checkpoint_id(config)
+        parent_config = None
+        if parent_id:
+            thread_id, checkpoint_ns = key
+            parent_config = {"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id
+            }}
+        self._set(key, CheckpointTuple(
+            config=next_config,
+            checkpoint=copy_checkpoint(checkpoint),
+            metadata=get_checkpoint_metadata(config, metadata),
+            parent_config=parent_config,
+            pending_writes=[],
+        ))
+
+    def remember_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str):
+        """Attach writes that have already been written to ``inner`` to the cached checkpoint"""
+        key = _cache_key(config)
+        cached = self._entries.get(key)
+        if cached is None or cached[1].checkpoint["id"] != get_checkpoint_id(config):
+            return
+        # Mirror the saver's semantics: special channels overwrite, regular writes keep the first copy
+        pending: List[Tuple[str, str, Any]] = list(cached[1].pending_writes or [])
+        indexed: Dict[Tuple[str, int], int] = {}
+        task_counts: Dict[str, int] = {}
+        for position, (write_task, write_channel, _) in enumerate(pending):
+            task_idx = task_counts.get(write_task, 0)
+            task_counts[write_task] = task_idx + 1
+            indexed[(write_task, WRITES_IDX_MAP.get(write_channel, task_idx))] = position
+        for idx, (channel, value) in enumerate(writes):
+            write_key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+            if write_key in indexed:
+                if channel in WRITES_IDX_MAP:
+                    pending[indexed[write_key]] = (task_id, channel, value)
+                continue
+            indexed[write_key] = len(pending)
+            pending.append((task_id, channel, value))
+        self._entries[key] = (cached[0], cached[1]._replace(pending_writes=pending))
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        try:
+            next_config = await self.inner.aput(config, checkpoint, metadata, new_versions)
+        except BaseException:
+            self._entries.pop(_cache_key(config), None)
+            raise
+        self.remember_put(config, next_config, checkpoint, metadata)
+        return next_config
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        try:
+            await self.inner.aput_writes(config, writes, task_id, task_path)
+        except BaseException:
+            self._entries.pop(_cache_key(config), None)
+            raise
+        self.remember_writes(config, writes, task_id)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.invalidate(str(thread_id))
+        try:
+            await self.inner.adelete_thread(thread_id)
+        finally:
+            # A turn may have written through while the delete was in flight
+            self.invalidate(str(thread_id))
+
+    # Sync API: delegate and keep the cache from going stale
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.inner.get_tuple(config)
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[Dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.inner.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        self._entries.pop(_cache_key(config), None)
+        return self.inner.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[Tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        self._entries.pop(_cache_key(config), None)
+        self.inner.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.invalidate(str(thread_id))
+        self.inner.delete_thread(thread_id)
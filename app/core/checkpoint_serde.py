@@ -0,0 +1,108 @@
+# ================================
+# FILE: app/core/checkpoint_serde.py
+# ================================
+
+import logging
+import zlib
+from typing import Any, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Format tag separator: "msgpack+zstd" is a zstd-compressed msgpack blob
+TAG_SEPARATOR = "+"
+CODECS = ("zstd", "zlib")
+
+
+def _compress(codec: str, data: bytes, level: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.compress(data, level)
+    return zlib.compress(data, level)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Checkpoint blob is zstd-compressed but the zstandard package is not installed")
+        return zstandard.decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise NotImplementedError(f"Unknown checkpoint compression codec: {codec}")
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Checkpoint serializer that compresses large blobs.
+
+    Values are serialized by ``inner`` (JsonPlusSerializer by default). Blobs of
+    at least ``min_bytes`` are compressed with ``codec`` and stored with the
+    codec appended to the type tag (``msgpack+zstd``). Blobs that are small or
+    do not shrink keep their plain tag, and rows written before compression was
+    enabled load unchanged, so the setting can be switched at any time.
+    """
+
+    def __init__(
+            self,
+            inner: Optional[SerializerProtocol] = None,
+            codec: Optional[str] = "zstd",
+            min_bytes: int = 1024,
+            level: int = 3
+    ):
+        if codec == "none":
+            codec = None
+        if codec == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, compressing checkpoints with zlib instead")
+            codec = "zlib"
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unsupported checkpoint compression codec: {codec}")
+        self.inner = inner or JsonPlusSerializer()
+        self.codec = codec
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def compress_typed(self, type_: str, data: bytes) -> Tuple[str, bytes]:
+        """Compress an already serialized (type, bytes) pair if it is worth it"""
+        if self.codec is None or TAG_SEPARATOR in type_ or not data or len(data) < self.min_bytes:
+            return type_, data
+        compressed = _compress(self.codec, data, self.level)
+        if len(compressed) >= len(data):
+            return type_, data
+        return f"{type_}{TAG_SEPARATOR}{self.codec}", compressed
+
+    @staticmethod
+    def decompress_typed(type_: str, data: bytes) -> Tuple[str, bytes]:
+        """Strip a compression tag, returning the inner serializer's (type, bytes)"""
+        base, separator, codec = type_.partition(TAG_SEPARATOR)
+        if not separator:
+            return type_, data
+        return base, _decompress(codec, data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.compress_typed(*self.inner.dumps_typed(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self.inner.loads_typed(self.decompress_typed(*data))
+
+
+def build_checkpoint_serde() -> CompressedSerializer:
+    """Checkpoint serializer configured from CHECKPOINT_COMPRESSION* settings"""
+    return CompressedSerializer(
+        codec=settings.CHECKPOINT_COMPRESSION,
+        min_bytes=settings.CHECKPOINT_COMPRESSION_MIN_BYTES,
+        level=settings.CHECKPOINT_COMPRESSION_LEVEL,
+    )
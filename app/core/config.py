@@ -4,7 +4,8 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List, Union
+from typing import Dict, List, Union
+import json
 import os
 from dotenv import load_dotenv
 
@@ -42,6 +43,21 @@ class Settings(BaseSettings):
     PSQL_PORT: str = os.getenv("PSQL_PORT", "5432")
     PSQL_DATABASE: str = os.getenv("PSQL_DATABASE", "chatbot_db")
     PSQL_SSLMODE: str = os.getenv("PSQL_SSLMODE", "prefer")
+    # Connections the pool keeps open (opened during startup warmup) and its cap
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "4"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+
+    # Checkpoint blob compression: zstd, zlib or none (blobs below MIN_BYTES are stored as-is)
+    CHECKPOINT_COMPRESSION: str = os.getenv("CHECKPOINT_COMPRESSION", "zstd").lower()
+    CHECKPOINT_COMPRESSION_MIN_BYTES: int = int(os.getenv("CHECKPOINT_COMPRESSION_MIN_BYTES", "1024"))
+    CHECKPOINT_COMPRESSION_LEVEL: int = int(os.getenv("CHECKPOINT_COMPRESSION_LEVEL", "3"))
+
+    # In-process cache of the latest checkpoint per thread (0 threads disables it)
+    CHECKPOINT_CACHE_THREADS: int = int(os.getenv("CHECKPOINT_CACHE_THREADS", "1000"))
+    CHECKPOINT_CACHE_TTL_SECONDS: float = float(os.getenv("CHECKPOINT_CACHE_TTL_SECONDS", "300"))
+
+    # Checkpoint durability per turn: step (write every step), batched (one transaction at turn end), final
+    CHECKPOINT_DURABILITY: str = os.getenv("CHECKPOINT_DURABILITY", "step").lower()
 
     @property
     def DATABASE_URL(self) -> str:
@@ -50,14 +66,123 @@ class Settings(BaseSettings):
             f"@{self.PSQL_HOST}:{self.PSQL_PORT}/{self.PSQL_DATABASE}"
         )
 
+    @property
+    def PSYCOPG_DATABASE_URL(self) -> str:
+        # Connection string for psycopg_pool without the +asyncpg dialect
+        return (
+            f"postgresql://{self.PSQL_USERNAME}:{self.PSQL_PASSWORD}"
+            f"@{self.PSQL_HOST}:{self.PSQL_PORT}/{self.PSQL_DATABASE}"
+        )
+
     # AI API Keys
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     
+    # LLM Provider Routing (LLM_PROVIDERS is a priority-ordered list: groq, google)
+    LLM_PROVIDERS: str = os.getenv("LLM_PROVIDERS", "groq,google")
+    GROQ_MODEL: str = os.getenv("GROQ_MODEL", "qwen/qwen3-32b")
+    GOOGLE_CHAT_MODEL: str = os.getenv("GOOGLE_CHAT_MODEL", "gemini-2.0-flash")
+    LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+    LLM_ROUTER_WINDOW: int = int(os.getenv("LLM_ROUTER_WINDOW", "100"))
+    LLM_ROUTER_MAX_ERROR_RATE: float = float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+    # Conversation context window (CONTEXT_TOKEN_BUDGETS is a JSON map of model name -> budget)
+    CONTEXT_KEEP_TURNS: int = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+    CONTEXT_TOKEN_BUDGETS: Dict[str, int] = json.loads(os.getenv("CONTEXT_TOKEN_BUDGETS", "{}"))
+    CONTEXT_SUMMARY_MAX_WORDS: int = int(os.getenv("CONTEXT_SUMMARY_MAX_WORDS", "250"))
+
+    # Tool output persistence: store full results in tool_payloads, keep references in graph state
+    TOOL_PAYLOAD_COMPACTION: bool = os.getenv("TOOL_PAYLOAD_COMPACTION", "true").lower() == "true"
+    TOOL_PAYLOAD_MIN_CHARS: int = int(os.getenv("TOOL_PAYLOAD_MIN_CHARS", "512"))
+
+    # Tool calls of one model step run concurrently up to this cap, over a shared HTTP connection pool
+    TOOL_MAX_PARALLEL_CALLS: int = int(os.getenv("TOOL_MAX_PARALLEL_CALLS", "4"))
+    TOOL_HTTP_MAX_CONNECTIONS: int = int(os.getenv("TOOL_HTTP_MAX_CONNECTIONS", "20"))
+
+    # Deadlines and circuit breakers
+    LLM_CALL_TIMEOUT_SECONDS: float = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "45"))
+    TOOL_CALL_TIMEOUT_SECONDS: float = float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", "15"))
+    TURN_TIMEOUT_SECONDS: float = float(os.getenv("TURN_TIMEOUT_SECONDS", "120"))
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RESET_SECONDS: float = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+    # LLM Admission Control
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_USER_RATE_PER_MINUTE: float = float(os.getenv("LLM_USER_RATE_PER_MINUTE", "20"))
+    LLM_USER_BURST: int = int(os.getenv("LLM_USER_BURST", "5"))
+    LLM_USER_MAX_RATE_DELAY_SECONDS: float = float(os.getenv("LLM_USER_MAX_RATE_DELAY_SECONDS", "10"))
+    LLM_QUEUE_MAX_SIZE: int = int(os.getenv("LLM_QUEUE_MAX_SIZE", "256"))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+
+    # Per-thread turn serialization ("queue" or "reject"; "local" or "postgres")
+    THREAD_TURN_POLICY: str = os.getenv("THREAD_TURN_POLICY", "queue")
+    THREAD_TURN_WAIT_SECONDS: float = float(os.getenv("THREAD_TURN_WAIT_SECONDS", "30"))
+    THREAD_LOCK_BACKEND: str = os.getenv("THREAD_LOCK_BACKEND", "local")
+    THREAD_LOCK_POLL_SECONDS: float = float(os.getenv("THREAD_LOCK_POLL_SECONDS", "0.1"))
+
+    # Idempotency-Key handling for message submission (per worker)
+    IDEMPOTENCY_TTL_SECONDS: float = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "1000"))
+
+    # Batch chat endpoint: default and maximum turns in flight per batch, admission retries per item
+    CHAT_BATCH_MAX_ITEMS: int = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "1000"))
+    CHAT_BATCH_CONCURRENCY: int = int(os.getenv("CHAT_BATCH_CONCURRENCY", "4"))
+    CHAT_BATCH_MAX_CONCURRENCY: int = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", "16"))
+    CHAT_BATCH_ADMISSION_RETRIES: int = int(os.getenv("CHAT_BATCH_ADMISSION_RETRIES", "3"))
+
+    # Background chat jobs (CHAT_JOB_WORKERS=0 runs no workers in this process, e.g. API-only nodes)
+    CHAT_JOB_WORKERS: int = int(os.getenv("CHAT_JOB_WORKERS", "4"))
+    CHAT_JOB_POLL_SECONDS: float = float(os.getenv("CHAT_JOB_POLL_SECONDS", "1.0"))
+    CHAT_JOB_HEARTBEAT_SECONDS: float = float(os.getenv("CHAT_JOB_HEARTBEAT_SECONDS", "10"))
+    CHAT_JOB_STALE_SECONDS: float = float(os.getenv("CHAT_JOB_STALE_SECONDS", "60"))
+    CHAT_JOB_MAX_ATTEMPTS: int = int(os.getenv("CHAT_JOB_MAX_ATTEMPTS", "3"))
+    CHAT_JOB_RETENTION_HOURS: float = float(os.getenv("CHAT_JOB_RETENTION_HOURS", "24"))
+    CHAT_JOB_EVENT_FLUSH_SECONDS: float = float(os.getenv("CHAT_JOB_EVENT_FLUSH_SECONDS", "0.1"))
+    CHAT_JOB_STREAM_POLL_SECONDS: float = float(os.getenv("CHAT_JOB_STREAM_POLL_SECONDS", "0.25"))
+
+    # Synthetic stream backend (/chat/message/stream/mock, or every /chat/message/stream when enabled)
+    SYNTHETIC_STREAM_ENABLED: bool = os.getenv("SYNTHETIC_STREAM_ENABLED", "false").lower() == "true"
+    SYNTHETIC_LATENCY_DISTRIBUTION: str = os.getenv("SYNTHETIC_LATENCY_DISTRIBUTION", "lognormal")
+    SYNTHETIC_TTFT_SECONDS: float = float(os.getenv("SYNTHETIC_TTFT_SECONDS", "0.4"))
+    SYNTHETIC_CHUNK_DELAY_SECONDS: float = float(os.getenv("SYNTHETIC_CHUNK_DELAY_SECONDS", "0.03"))
+    SYNTHETIC_RESPONSE_WORDS: int = int(os.getenv("SYNTHETIC_RESPONSE_WORDS", "60"))
+    SYNTHETIC_TOOL_CALL_RATIO: float = float(os.getenv("SYNTHETIC_TOOL_CALL_RATIO", "0.3"))
+    SYNTHETIC_TOOL_LATENCY_SECONDS: float = float(os.getenv("SYNTHETIC_TOOL_LATENCY_SECONDS", "0.5"))
+
+    # Request tracing: sampled traces are exported to a JSON-lines file (jsonl or otlp format) or an OTLP/HTTP URL
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    TRACE_EXPORT_ENDPOINT: str = os.getenv("TRACE_EXPORT_ENDPOINT", "traces.jsonl")
+    TRACE_EXPORT_FORMAT: str = os.getenv("TRACE_EXPORT_FORMAT", "jsonl")
+    TRACE_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "2.0"))
+    TRACE_MAX_QUEUED_SPANS: int = int(os.getenv("TRACE_MAX_QUEUED_SPANS", "10000"))
+
+    # Sampling profiler (/admin/profile) and event-loop stall monitor
+    PROFILER_MAX_SECONDS: float = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+    LOOP_MONITOR_INTERVAL_SECONDS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_SECONDS", "0.1"))
+    LOOP_STALL_THRESHOLD_SECONDS: float = float(os.getenv("LOOP_STALL_THRESHOLD_SECONDS", "0.25"))
+
+    # Startup warmup: the worker reports ready (/system/ready) only once it is done or timed out
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+    WARMUP_PRECONNECT_HTTP: bool = os.getenv("WARMUP_PRECONNECT_HTTP", "true").lower() == "true"
+
+    # Health monitor: background dependency checks behind /system/ready and /system/health
+    HEALTH_CHECK_INTERVAL_SECONDS: float = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "5"))
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+    HEALTH_POOL_SATURATION_THRESHOLD: float = float(os.getenv("HEALTH_POOL_SATURATION_THRESHOLD", "0.9"))
+    HEALTH_MAX_LOOP_LAG_SECONDS: float = float(os.getenv("HEALTH_MAX_LOOP_LAG_SECONDS", "0.5"))
+
     # Clerk Authentication Settings
     CLERK_INSTANCE_URL: str = os.getenv("CLERK_INSTANCE_URL", "")
     CLERK_JWT_VERIFICATION_KEY: str = os.getenv("CLERK_JWT_VERIFICATION_KEY", "")
+    # Clerk user ids (comma-separated) allowed to use the /admin endpoints
+    ADMIN_USER_IDS: str = os.getenv("ADMIN_USER_IDS", "")
 
     class Config:
         case_sensitive = True
@@ -2,63 +2,40 @@
 # FILE: app/core/database.py
 # ================================
 
-import os
+import time
+from psycopg import AsyncCursor
 from psycopg_pool import AsyncConnectionPool
 from psycopg.rows import dict_row
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from contextlib import asynccontextmanager
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, String
-from fastapi import Depends
-from fastapi_users.db import SQLAlchemyBaseUserTableUUID, SQLAlchemyUserDatabase
 
 from app.core.config import settings
+from app.core.checkpoint_serde import build_checkpoint_serde
+from app.core.checkpoint_cache import CachedCheckpointSaver
+from app.core.metrics import DB_POOL_WAIT_SECONDS, snapshot_collector, stage_timer
+from app.core.tracing import current_span, trace_span
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-# --------------------------------------
-# SQLAlchemy Setup for ORM and FastAPI Users
-# --------------------------------------
-
-class Base(DeclarativeBase):
-    pass
-
-
-class User(SQLAlchemyBaseUserTableUUID, Base):
-    oauth_provider = Column(String, nullable=True)
-    oauth_account_id = Column(String, nullable=True)
-
-
-# SQLAlchemy async engine and session
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    pool_size=int(os.getenv("DB_POOL_SIZE", "50")),
-    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
-)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
-
-# Yield AsyncSession for FastAPI Dependency Injection
-from typing import AsyncGenerator
+# The SQLAlchemy/FastAPI Users setup lives in app/core/user_db.py and is only
+# imported when first used, since both packages are slow to import
+_USER_DB_NAMES = ("Base", "User", "engine", "async_session_maker", "get_async_session", "get_user_db")
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
-        yield session
-
-
-# FastAPI Users dependency
-async def get_user_db(session: AsyncSession = Depends(get_async_session)):
-    yield SQLAlchemyUserDatabase(session, User)
+def __getattr__(name: str):
+    if name in _USER_DB_NAMES:
+        from app.core import user_db
+        return getattr(user_db, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Create tables
 async def create_db_and_tables():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        logger.info("SQLAlchemy tables (including users) created successfully")
+    from app.core.user_db import create_user_tables
+    await create_user_tables()
 
     # Ensure the threads table exists for raw SQL operations
     create_threads_table_query = """
@@ -69,46 +46,140 @@ async def create_db_and_tables():
         created_at TIMESTAMP NOT NULL
     );
     """
+    # Content-addressed store for full tool outputs referenced from compacted graph state
+    create_tool_payloads_table_query = """
+    CREATE TABLE IF NOT EXISTS tool_payloads (
+        digest CHAR(64) PRIMARY KEY,
+        tool_name VARCHAR(255) NOT NULL,
+        payload TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL
+    );
+    """
+    # Background chat jobs (app/services/chat_jobs.py) and the SSE frames they produced
+    create_chat_jobs_tables_query = """
+    CREATE TABLE IF NOT EXISTS chat_jobs (
+        id VARCHAR(36) PRIMARY KEY,
+        thread_id VARCHAR(100) NOT NULL,
+        user_id VARCHAR(255) NOT NULL,
+        message TEXT NOT NULL,
+        idempotency_key VARCHAR(255),
+        status VARCHAR(16) NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+        worker_id VARCHAR(255),
+        result JSONB,
+        error TEXT,
+        available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        heartbeat_at TIMESTAMPTZ,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        started_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ,
+        UNIQUE (thread_id, idempotency_key)
+    );
+    CREATE INDEX IF NOT EXISTS chat_jobs_queued_idx ON chat_jobs (created_at) WHERE status = 'queued';
+    CREATE INDEX IF NOT EXISTS chat_jobs_running_idx ON chat_jobs (heartbeat_at) WHERE status = 'running';
+    CREATE TABLE IF NOT EXISTS chat_job_events (
+        job_id VARCHAR(36) NOT NULL REFERENCES chat_jobs (id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        frame TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (job_id, seq)
+    );
+    """
     async with db_manager.get_connection() as conn:
         async with conn.cursor() as cur:
             await cur.execute(create_threads_table_query)
             logger.info("Ensured threads table exists in the database")
+            await cur.execute(create_tool_payloads_table_query)
+            logger.info("Ensured tool_payloads table exists in the database")
+            await cur.execute(create_chat_jobs_tables_query)
+            logger.info("Ensured chat_jobs tables exist in the database")
 
 
 # --------------------------------------
 # Psycopg Pool and LangGraph Checkpointer
 # --------------------------------------
 
+def _statement(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = repr(query)
+    return " ".join(query.split())[:300]
+
+
+class TracedAsyncCursor(AsyncCursor):
+    """Cursor of the pool's connections; each query is a ``db.query`` span when the request is traced"""
+
+    async def execute(self, query, params=None, **kwargs):
+        if current_span() is None:
+            return await super().execute(query, params, **kwargs)
+        with trace_span("db.query", **{"db.statement": _statement(query)}):
+            return await super().execute(query, params, **kwargs)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        if current_span() is None:
+            return await super().executemany(query, params_seq, **kwargs)
+        with trace_span("db.query", **{"db.statement": _statement(query), "db.executemany": True}):
+            return await super().executemany(query, params_seq, **kwargs)
+
+
+class TimedPostgresSaver(AsyncPostgresSaver):
+    """AsyncPostgresSaver that records checkpoint read/write latency"""
+
+    async def aget_tuple(self, config):
+        with stage_timer("checkpoint_read"):
+            return await super().aget_tuple(config)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        with stage_timer("checkpoint_write"):
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        with stage_timer("checkpoint_write"):
+            return await super().aput_writes(config, writes, task_id, task_path)
+
+
 class DatabaseManager:
     def __init__(self):
         self.pool: AsyncConnectionPool | None = None
-        self.memory: AsyncPostgresSaver | None = None
+        self.memory: BaseCheckpointSaver | None = None
 
     async def initialize(self):
         """Initialize database connection pool and memory checkpointer"""
         try:
-            # Construct a connection string for psycopg_pool without +asyncpg dialect
-            db_url_for_psycopg = f"postgresql://{settings.PSQL_USERNAME}:{settings.PSQL_PASSWORD}@{settings.PSQL_HOST}:{settings.PSQL_PORT}/{settings.PSQL_DATABASE}"
             self.pool = AsyncConnectionPool(
-                conninfo=db_url_for_psycopg,
-                max_size=20,
+                conninfo=settings.PSYCOPG_DATABASE_URL,
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
                 kwargs={
                     "autocommit": True,
                     "prepare_threshold": 0,
                     "row_factory": dict_row,
+                    "cursor_factory": TracedAsyncCursor,
                     "sslmode": settings.PSQL_SSLMODE,
                 },
             )
 
-            # Initialize the memory checkpointer
-            async with self.pool.connection() as conn:
-                self.memory = AsyncPostgresSaver(conn)  # type: ignore[arg-type]
-                # Setup the checkpointer tables (run only once)
-                try:
-                    await self.memory.setup()
-                    logger.info("Memory checkpointer setup completed")
-                except Exception as e:
-                    logger.info(f"Memory checkpointer already setup or error: {e}")
+            # Initialize the memory checkpointer on the pool, so every call checks out its own connection
+            saver = TimedPostgresSaver(self.pool, serde=build_checkpoint_serde())  # type: ignore[arg-type]
+            # Setup the checkpointer tables (run only once)
+            try:
+                await saver.setup()
+                logger.info("Memory checkpointer setup completed")
+            except Exception as e:
+                logger.info(f"Memory checkpointer already setup or error: {e}")
+
+            # Serve the latest state of recently active threads from memory
+            self.memory = saver
+            if settings.CHECKPOINT_CACHE_THREADS > 0:
+                self.memory = CachedCheckpointSaver(
+                    saver,
+                    max_threads=settings.CHECKPOINT_CACHE_THREADS,
+                    ttl=settings.CHECKPOINT_CACHE_TTL_SECONDS,
+                )
+                snapshot_collector.register_snapshot("checkpoint_cache", self._cache_stats)
 
             # Ensure all database tables are created
             await create_db_and_tables()
@@ -127,10 +198,37 @@ class DatabaseManager:
         """Get a database connection from the pool"""
         if self.pool is None:
             raise ValueError("Database pool is not initialized")
+        requested = time.perf_counter()
         async with self.pool.connection() as conn:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - requested)
             yield conn
 
-    def get_memory_checkpointer(self) -> AsyncPostgresSaver:
+    def _cache_stats(self) -> dict:
+        if not isinstance(self.memory, CachedCheckpointSaver):
+            return {}
+        snapshot = self.memory.snapshot()
+        return {
+            "threads": snapshot["threads"],
+            "hits_total": snapshot["hits"],
+            "misses_total": snapshot["misses"],
+        }
+
+    def pool_stats(self) -> dict:
+        """Pool occupancy for metrics; counters are cumulative since startup"""
+        if self.pool is None:
+            return {}
+        stats = self.pool.get_stats()
+        return {
+            "size": stats.get("pool_size", 0),
+            "available": stats.get("pool_available", 0),
+            "max_size": stats.get("pool_max", 0),
+            "requests_waiting": stats.get("requests_waiting", 0),
+            "requests_total": stats.get("requests_num", 0),
+            "requests_wait_seconds_total": stats.get("requests_wait_ms", 0) / 1000,
+            "requests_errors_total": stats.get("requests_errors", 0),
+        }
+
+    def get_memory_checkpointer(self) -> BaseCheckpointSaver:
         """Get the memory checkpointer instance"""
         if self.memory is None:
             raise ValueError("Memory checkpointer is not initialized")
@@ -139,3 +237,4 @@ class DatabaseManager:
 
 # Global database manager instance
 db_manager = DatabaseManager()
+snapshot_collector.register_snapshot("db_pool", db_manager.pool_stats)
@@ -0,0 +1,146 @@
+# ================================
+# FILE: app/core/metrics.py
+# ================================
+
+"""
+Prometheus metrics for the chat request path.
+
+``chat_stage_duration_seconds{stage=...}`` breaks a chat request down into
+the stages it spends time in:
+
+    auth_jwt, user_provision, thread_ownership   request dependencies
+    admission_wait                               waiting for an LLM slot
+    agent_turn                                   whole agent run (process_message)
+    llm_ttft, llm_call                           per LLM call (first token, full call)
+    tool_call                                    per tool call
+    checkpoint_read, checkpoint_write            Postgres checkpointer round trips
+    checkpoint_flush                             batched-durability flush at turn end
+
+Pool, admission and cache gauges are read from their snapshots at scrape time.
+Stages timed with ``stage_timer`` are also spans of the current trace.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.tracing import span_exporter, trace_span
+
+# Spans a fast DB round trip (ms) up to a slow agent turn (minutes)
+_STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds",
+    "Time spent in each stage of a chat request",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "chat_llm_tokens_total",
+    "LLM tokens reported by the providers",
+    ["provider", "kind"],
+)
+SSE_FRAMES = Counter(
+    "chat_sse_frames_total",
+    "Server-sent event frames produced for chat streams",
+    ["event"],
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time waiting to check a connection out of the psycopg pool (db_manager.get_connection)",
+    buckets=_STAGE_BUCKETS,
+)
+AGENT_RUNS_IN_FLIGHT = Gauge(
+    "chat_agent_runs_in_flight",
+    "Agent runs (LangGraphAgent.process_message) currently executing",
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop monitor's periodic wake-up ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total",
+    "Event loop stalls longer than LOOP_STALL_THRESHOLD_SECONDS",
+)
+CHAT_TURNS = Counter(
+    "chat_turns_total",
+    "Chat turns handled by ChatService",
+    ["mode", "outcome"],
+)
+
+
+@contextmanager
+def stage_timer(stage: str, trace: bool = True) -> Iterator[None]:
+    """
+    Record the duration of the enclosed block (including failures) under
+    ``stage``, and trace it as a span unless ``trace`` is False
+    """
+    started = time.perf_counter()
+    try:
+        if trace:
+            with trace_span(stage):
+                yield
+        else:
+            yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_llm_usage(provider: str, message: Any):
+    """Count the tokens of an LLM response (AIMessage or merged chunk) if the provider reported them"""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    LLM_TOKENS.labels(provider, "input").inc(usage.get("input_tokens", 0))
+    LLM_TOKENS.labels(provider, "output").inc(usage.get("output_tokens", 0))
+
+
+class SnapshotCollector:
+    """
+    Exposes gauges computed at scrape time from ``snapshot()``-style sources,
+    registered with ``register_snapshot(name, fn)``; a source that fails or
+    is not initialized yet is skipped.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+
+    def register_snapshot(self, name: str, source: Callable[[], Optional[Dict[str, Any]]]):
+        self._sources[name] = source
+
+    def collect(self):
+        for name, source in self._sources.items():
+            try:
+                values = source()
+            except Exception:
+                continue
+            for key, value in (values or {}).items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                if key.endswith("_total"):
+                    family: Any = CounterMetricFamily(f"{name}_{key[:-len('_total')]}", f"{name} {key}")
+                else:
+                    family = GaugeMetricFamily(f"{name}_{key}", f"{name} {key}")
+                family.add_metric([], value)
+                yield family
+
+
+snapshot_collector = SnapshotCollector()
+REGISTRY.register(snapshot_collector)
+snapshot_collector.register_snapshot("trace_export", span_exporter.snapshot)
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+def render_metrics() -> bytes:
+    """All registered metrics in the Prometheus text exposition format"""
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,196 @@
+# ================================
+# FILE: app/core/profiling.py
+# ================================
+
+"""
+Live-process diagnostics: an on-demand sampling profiler and an event-loop
+stall monitor.
+
+``sample_stacks`` runs in a helper thread and reads the other threads'
+Python stacks every few milliseconds (``sys._current_frames``), so the
+profiled code is not instrumented and pays only for the GIL hand-offs. The
+result is in the collapsed-stack format read by flamegraph.pl, speedscope
+and similar tools: one ``root;...;leaf <count>`` line per distinct stack.
+
+``EventLoopMonitor`` wakes up on the loop every ``interval`` seconds and
+records how late it ran. A watchdog thread notices a wake-up that is
+overdue by more than ``threshold`` while the loop is still blocked, and
+logs the loop thread's stack at that moment, i.e. the code causing the stall.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from types import CodeType
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG_SECONDS, EVENT_LOOP_STALLS, snapshot_collector
+
+logger = logging.getLogger(__name__)
+
+_labels: Dict[CodeType, str] = {}
+# Path prefixes stripped from frame labels: installed packages, the app, the standard library
+_path_markers = ("site-packages" + os.sep, os.getcwd() + os.sep, os.path.dirname(os.__file__) + os.sep)
+
+
+def _frame_label(code: CodeType) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for marker in _path_markers:
+            index = filename.find(marker)
+            if index != -1:
+                filename = filename[index + len(marker):]
+                break
+        # ';' separates frames in the collapsed format
+        label = f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ":")
+        _labels[code] = label
+    return label
+
+
+def _is_idle(code: CodeType) -> bool:
+    """Whether a leaf frame is the event loop waiting for I/O"""
+    return code.co_name in ("select", "poll") and code.co_filename.endswith("selectors.py")
+
+
+def sample_stacks(
+        seconds: float,
+        interval: float,
+        thread_id: Optional[int] = None,
+        include_idle: bool = False
+) -> "Counter[str]":
+    """
+    Sample Python stacks for ``seconds`` (blocking; run it in a thread).
+    Only ``thread_id`` is sampled if given, otherwise every other thread,
+    with the thread name as the root frame.
+    """
+    counts: "Counter[str]" = Counter()
+    own_id = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for tid, frame in sys._current_frames().items():
+            if tid == own_id or (thread_id is not None and tid != thread_id):
+                continue
+            if not include_idle and _is_idle(frame.f_code):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if thread_id is None:
+                stack.append(names.get(tid, f"thread-{tid}").replace(";", ":"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts: "Counter[str]") -> str:
+    """Collapsed-stack text, most frequent stacks first"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class EventLoopMonitor:
+    """
+    Measures event-loop lag and logs the loop's stack when it is blocked for
+    longer than ``threshold`` seconds.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._window_lag = 0.0
+        self.stalls = 0
+        self._loop_thread: Optional[int] = None
+        self._beat = 0.0
+        self._reported_beat = -1.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat_loop())
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started (stall threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _heartbeat_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            previous_beat, self._beat = self._beat, time.monotonic()
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._window_lag = max(self._window_lag, lag)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                EVENT_LOOP_STALLS.inc()
+                if self._reported_beat != previous_beat:
+                    # Too short for the watchdog to catch it in the act
+                    logger.warning(f"Event loop stalled for {lag * 1000:.0f} ms")
+
+    def _watch(self):
+        check_every = min(self.interval, self.threshold) / 2
+        while not self._stopped.wait(check_every):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)  # type: ignore[arg-type]
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "  <no Python frame>\n"
+            logger.warning(
+                f"Event loop blocked for {blocked * 1000:.0f} ms so far; loop thread stack:\n{stack}"
+            )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def take_window_lag(self) -> float:
+        """Largest lag since the previous call (for the health monitor), starting a new window"""
+        lag, self._window_lag = self._window_lag, 0.0
+        return lag
+
+    def snapshot(self) -> Dict[str, float]:
+        """Lag figures, for metrics (stalls are counted by EVENT_LOOP_STALLS)"""
+        return {
+            "last_lag_seconds": self.last_lag,
+            "max_lag_seconds": self.max_lag,
+        }
+
+
+# Global event loop monitor (started by the app lifespan when LOOP_MONITOR_ENABLED)
+loop_monitor = EventLoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=settings.LOOP_STALL_THRESHOLD_SECONDS,
+)
+snapshot_collector.register_snapshot("event_loop", loop_monitor.snapshot)
@@ -0,0 +1,460 @@
+# ================================
+# FILE: app/core/tracing.py
+# ================================
+
+"""
+Lightweight request tracing.
+
+``TracingMiddleware`` opens one root span per sampled HTTP request; code on
+the request path adds child spans with ``trace_span`` (the current span is
+kept in a contextvar, so spans nest across awaits and tasks started from the
+request). Inside an agent turn, ``TracingCallbackHandler`` turns LangChain
+callbacks into spans for graph nodes, LLM calls (with TTFT and token counts)
+and tool calls.
+
+Finished spans are queued and written in batches by ``span_exporter`` to
+TRACE_EXPORT_ENDPOINT: a file with one JSON object per span (``jsonl``) or
+per OTLP/JSON batch (``otlp``), or an OTLP/HTTP collector URL. Unsampled
+requests create no spans at all.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACE_ID_HEADER = "X-Trace-Id"
+
+_SPAN_KIND_INTERNAL = 1
+_SPAN_KIND_SERVER = 2
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation of a trace; exported when ``end()`` is called"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 kind: int = _SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def child(self, name: str, **attributes: Any) -> "Span":
+        return Span(name, self.trace_id, self.span_id, attributes=attributes)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            span_exporter.submit(self)
+
+    def elapsed_ms(self) -> float:
+        return (time.time_ns() - self.start_ns) / 1e6
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": _STATUS_ERROR, "message": self.error} if self.error else {"code": _STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _parse_traceparent(header: Optional[str]):
+    """(trace_id, parent_span_id, sampled) from a W3C traceparent header, or None"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+@contextmanager
+def trace_root(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Start a trace (or continue the caller's from ``traceparent``) if tracing is
+    enabled and the request is sampled; yields the root span or None.
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    parent = _parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = random.random() < settings.TRACE_SAMPLE_RATE
+    if not sampled:
+        yield None
+        return
+
+    span = Span(name, trace_id, parent_id, kind=_SPAN_KIND_SERVER, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+@contextmanager
+def trace_span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current span for the enclosed block; a no-op outside a sampled trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = parent.child(name, **attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """
+    Child span of the current span that the caller ends, without making it
+    current (for async generators, where a contextvar would leak to the consumer)
+    """
+    parent = _current_span.get()
+    return parent.child(name, **attributes) if parent is not None else None
+
+
+class TracingCallbackHandler(AsyncCallbackHandler):
+    """
+    Spans for the graph nodes, LLM calls and tool calls of one agent run,
+    nested by LangChain run id under ``root``.
+    """
+
+    run_inline = True
+
+    def __init__(self, root: Span):
+        self.root = root
+        self._spans: Dict[UUID, Span] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+
+    def span_for(self, run_id: UUID) -> Optional[Span]:
+        return self._spans.get(run_id)
+
+    def _parent_span(self, parent_run_id: Optional[UUID]) -> Span:
+        while parent_run_id is not None:
+            span = self._spans.get(parent_run_id)
+            if span is not None:
+                return span
+            parent_run_id = self._parents.get(parent_run_id)
+        return self.root
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, **attributes: Any):
+        self._spans[run_id] = self._parent_span(parent_run_id).child(name, **attributes)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        self._parents.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            if error is not None:
+                span.record_error(error)
+            span.end()
+        return span
+
+    async def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                             tags=None, metadata=None, **kwargs: Any):
+        self._parents[run_id] = parent_run_id
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run gets a span, not the runnables it is built from
+        if node and kwargs.get("name") == node:
+            self._start(run_id, parent_run_id, "graph.node", **{
+                "graph.node": node,
+                "graph.step": (metadata or {}).get("langgraph_step"),
+            })
+
+    async def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    async def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                                  tags=None, metadata=None, **kwargs: Any):
+        self._parents[run_id] = parent_run_id
+        self._start(run_id, parent_run_id, "llm.call", **{
+            "llm.model": kwargs.get("name") or (serialized or {}).get("name"),
+            "llm.input_messages": sum(len(batch) for batch in messages),
+        })
+
+    async def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+        span = self._spans.get(run_id)
+        if span is not None and "llm.ttft_ms" not in span.attributes:
+            span.attributes["llm.ttft_ms"] = round(span.elapsed_ms(), 3)
+
+    async def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        span = self._spans.get(run_id)
+        if span is not None:
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage:
+                        span.set(**{
+                            "llm.input_tokens": usage.get("input_tokens", 0),
+                            "llm.output_tokens": usage.get("output_tokens", 0),
+                        })
+        self._end(run_id)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
+
+    async def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                            tags=None, metadata=None, **kwargs: Any):
+        self._parents[run_id] = parent_run_id
+        self._start(run_id, parent_run_id, "tool.call", **{
+            "tool.name": kwargs.get("name") or (serialized or {}).get("name"),
+        })
+
+    async def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
+
+
+def annotate_run(run_manager: Any, **attributes: Any):
+    """Add attributes to the span of a LangChain run (e.g. from inside a chat model or tool)"""
+    if run_manager is None:
+        return
+    for handler in run_manager.handlers:
+        if isinstance(handler, TracingCallbackHandler):
+            span = handler.span_for(run_manager.run_id)
+            if span is not None:
+                span.set(**attributes)
+
+
+class SpanExporter:
+    """
+    Buffers finished spans and writes them every ``interval`` seconds.
+    Spans beyond ``max_queued`` are dropped rather than blocking requests.
+    """
+
+    def __init__(self, endpoint: str, fmt: str, interval: float, max_queued: int, service_name: str):
+        if fmt not in ("jsonl", "otlp"):
+            raise ValueError(f"Unknown trace export format: {fmt}")
+        self.endpoint = endpoint
+        self.format = fmt
+        self.interval = interval
+        self.max_queued = max_queued
+        self.service_name = service_name
+        self._queue: List[Span] = []
+        self._task: Optional[asyncio.Task] = None
+        self._client = None
+        self._exported = 0
+        self._dropped = 0
+
+    @property
+    def is_http(self) -> bool:
+        return self.endpoint.startswith(("http://", "https://"))
+
+    def submit(self, span: Span):
+        if len(self._queue) >= self.max_queued:
+            self._dropped += 1
+            return
+        self._queue.append(span)
+
+    def start(self):
+        if settings.TRACING_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._export_loop())
+            logger.info(f"Exporting traces to {self.endpoint}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _export_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+    async def flush(self) -> int:
+        """Export the queued spans; returns how many were written"""
+        spans, self._queue = self._queue, []
+        if not spans:
+            return 0
+        if self.is_http:
+            await self._post(spans)
+        else:
+            await asyncio.to_thread(self._write_file, self._encode_lines(spans))
+        self._exported += len(spans)
+        return len(spans)
+
+    def _otlp_batch(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}],
+        }]}
+
+    def _encode_lines(self, spans: List[Span]) -> str:
+        if self.format == "otlp":
+            return json.dumps(self._otlp_batch(spans), default=str) + "\n"
+        return "".join(json.dumps(span.to_json(), default=str) + "\n" for span in spans)
+
+    def _write_file(self, lines: str):
+        with open(self.endpoint, "a", encoding="utf-8") as sink:
+            sink.write(lines)
+
+    async def _post(self, spans: List[Span]):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        response = await self._client.post(self.endpoint, json=self._otlp_batch(spans))
+        response.raise_for_status()
+
+    def snapshot(self) -> Dict[str, int]:
+        """Export counters, for metrics reporting"""
+        return {
+            "queued": len(self._queue),
+            "exported_spans_total": self._exported,
+            "dropped_spans_total": self._dropped,
+        }
+
+
+class TracingMiddleware:
+    """ASGI middleware giving every sampled HTTP request a root span (covering the whole streamed body)"""
+
+    def __init__(self, app, exclude_paths=("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        with trace_root(
+                f"{scope['method']} {scope['path']}",
+                traceparent,
+                **{"http.method": scope["method"], "http.target": scope["path"]}
+        ) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    span.set(**{"http.status_code": message["status"]})
+                    if message["status"] >= 500:
+                        span.error = f"HTTP {message['status']}"
+                    message = {
+                        **message,
+                        "headers": [*message.get("headers", []), (TRACE_ID_HEADER.lower().encode(), span.trace_id.encode())],
+                    }
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    span.name = f"{scope['method']} {route.path}"
+                    span.set(**{"http.route": route.path})
+
+
+# Global span exporter
+span_exporter = SpanExporter(
+    endpoint=settings.TRACE_EXPORT_ENDPOINT,
+    fmt=settings.TRACE_EXPORT_FORMAT,
+    interval=settings.TRACE_EXPORT_INTERVAL_SECONDS,
+    max_queued=settings.TRACE_MAX_QUEUED_SPANS,
+    service_name=settings.PROJECT_NAME,
+)
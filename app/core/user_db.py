@@ -0,0 +1,57 @@
+# ================================
+# FILE: app/core/user_db.py
+# ================================
+
+import os
+from typing import AsyncGenerator
+
+from fastapi import Depends
+from fastapi_users.db import SQLAlchemyBaseUserTableUUID, SQLAlchemyUserDatabase
+from sqlalchemy import Column, String
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------
+# SQLAlchemy Setup for ORM and FastAPI Users
+# --------------------------------------
+
+class Base(DeclarativeBase):
+    pass
+
+
+class User(SQLAlchemyBaseUserTableUUID, Base):
+    oauth_provider = Column(String, nullable=True)
+    oauth_account_id = Column(String, nullable=True)
+
+
+# SQLAlchemy async engine and session
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "50")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+)
+async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+
+# Yield AsyncSession for FastAPI Dependency Injection
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_maker() as session:
+        yield session
+
+
+# FastAPI Users dependency
+async def get_user_db(session: AsyncSession = Depends(get_async_session)):
+    yield SQLAlchemyUserDatabase(session, User)
+
+
+async def create_user_tables():
+    """Create the ORM tables (users)"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        logger.info("SQLAlchemy tables (including users) created successfully")
@@ -7,8 +7,9 @@ from typing import Optional
 import asyncio
 from functools import lru_cache
 from app.core.database import db_manager
+from app.core.metrics import stage_timer
 from app.utils.thread_permissions import verify_thread_ownership
-from app.schemas.chat import ChatRequest
+from app.schemas.chat import ChatRequest, MessageEditRequest, MessageRegenerateRequest
 from app.schemas.threads import ThreadTitleUpdateRequest
 
 # Security scheme for JWT tokens
@@ -172,14 +173,29 @@ async def current_active_user(
     Dependency to get the current active user from Clerk JWT token
     """
     # Verify the JWT token and get user ID
-    clerk_user_id, payload = await verify_clerk_jwt(credentials.credentials)
+    with stage_timer("auth_jwt"):
+        clerk_user_id, payload = await verify_clerk_jwt(credentials.credentials)
 
     # Get or create user in local database
-    user = await get_or_create_user(clerk_user_id, payload)
+    with stage_timer("user_provision"):
+        user = await get_or_create_user(clerk_user_id, payload)
 
     return user
 
 
+async def current_admin_user(user: ClerkUser = Depends(current_active_user)) -> ClerkUser:
+    """
+    Dependency for admin endpoints: the current user must be listed in ADMIN_USER_IDS
+    """
+    admin_ids = {user_id.strip() for user_id in settings.ADMIN_USER_IDS.split(",") if user_id.strip()}
+    if str(user.id) not in admin_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return user
+
+
 # Dependency for request body endpoints
 async def verify_from_request_body(
         request: ChatRequest,
@@ -219,6 +235,27 @@ async def verify_from_update_title_req_body(
     await verify_thread_ownership(request.thread_id, user_id_str)
 
 
+# Dependencies for edit/regenerate endpoints
+async def verify_from_edit_req_body(
+        request: MessageEditRequest,
+        user: ClerkUser = Depends(current_active_user)
+):
+    """
+    Verify thread ownership for message edit requests
+    """
+    await verify_thread_ownership(request.thread_id, str(user.id))
+
+
+async def verify_from_regenerate_req_body(
+        request: MessageRegenerateRequest,
+        user: ClerkUser = Depends(current_active_user)
+):
+    """
+    Verify thread ownership for message regenerate requests
+    """
+    await verify_thread_ownership(request.thread_id, str(user.id))
+
+
 # Optional: Helper function to get current user info without verification dependencies
 async def get_user_from_token(token: str) -> ClerkUser:
     """
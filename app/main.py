@@ -3,12 +3,19 @@
 # ================================
 
 import logging
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from app.core.config import settings
 from app.core.database import db_manager
+from app.core.metrics import METRICS_CONTENT_TYPE, render_metrics
+from app.core.tracing import TracingMiddleware, span_exporter
+from app.core.profiling import loop_monitor
+from app.services.chat_jobs import chat_job_worker
+from app.services.tools import close_http_client
+from app.services.warmup import warmup
+from app.services.health_monitor import health_monitor
 from app.api.api_v1.api import api_router
 from app.dependencies.thread import current_active_user,ClerkUser
 # Load environment variables from .env file
@@ -23,14 +30,29 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up FastAPI LangGraph Chatbot...")
+    span_exporter.start()
+    if settings.SYNTHETIC_STREAM_ENABLED:
+        logger.warning("SYNTHETIC_STREAM_ENABLED: /chat/message/stream serves synthetic answers, not the agent")
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
     await db_manager.initialize()
     logger.info("Database initialized successfully")
+    await chat_job_worker.start()
+    # Pool connections, JWKS, agent graph and provider connections; /system/ready waits for it
+    warmup.start()
+    health_monitor.start()
 
     yield
 
     # Shutdown
     logger.info("Shutting down...")
+    await warmup.stop()
+    await health_monitor.stop()
+    await chat_job_worker.stop()
+    await close_http_client()
     await db_manager.close()
+    await span_exporter.stop()
+    await loop_monitor.stop()
     logger.info("Shutdown complete")
 
 
@@ -51,6 +73,10 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Root span per sampled request; added last so it is the outermost middleware
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -64,6 +90,12 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # --- Protected Route Example ---
 @app.get("/protected-route")
 def protected_route(user: ClerkUser = Depends(current_active_user)):
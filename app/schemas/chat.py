@@ -18,6 +18,8 @@ class ChatMessage(BaseModel):
     content: str
     timestamp: Optional[datetime] = None
     message_id: Optional[str] = None
+    # Other versions of this message on branches left by edits/regenerations (history with include_branches)
+    alternatives: Optional[List["ChatMessage"]] = None
 
 
 class ChatRequest(BaseModel):
@@ -25,6 +27,17 @@ class ChatRequest(BaseModel):
     thread_id: str = Field(..., min_length=1, max_length=100)
 
 
+class MessageRegenerateRequest(BaseModel):
+    thread_id: str = Field(..., min_length=1, max_length=100)
+    message_id: str = Field(..., min_length=1, max_length=100)
+
+
+class MessageEditRequest(BaseModel):
+    thread_id: str = Field(..., min_length=1, max_length=100)
+    message_id: str = Field(..., min_length=1, max_length=100)
+    message: str = Field(..., min_length=1, max_length=10000)
+
+
 class ChatResponse(BaseModel):
     response: str
     thread_id: str
@@ -33,6 +46,49 @@ class ChatResponse(BaseModel):
     tool_calls: Optional[List[Dict[str, Any]]] = None
 
 
+class ChatJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ChatJob(BaseModel):
+    job_id: str
+    thread_id: str
+    status: ChatJobStatus
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+
+class BatchChatItem(BaseModel):
+    message: str = Field(..., min_length=1, max_length=10000)
+    # Omit to run the turn on a new thread created for this item
+    thread_id: Optional[str] = Field(None, min_length=1, max_length=100)
+    thread_title: Optional[str] = Field(None, min_length=1, max_length=255)
+    # Echoed back in the result line so callers can match results to inputs
+    custom_id: Optional[str] = Field(None, max_length=255)
+
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(None, ge=1)
+
+
+class BatchChatResult(BaseModel):
+    index: int
+    custom_id: Optional[str] = None
+    thread_id: str
+    status: str
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+
 class ChatHistory(BaseModel):
     thread_id: str
     messages: List[ChatMessage]
@@ -43,6 +99,23 @@ class HealthCheck(BaseModel):
     status: str
     timestamp: datetime
     version: str
+    circuit_breakers: Optional[Dict[str, Dict[str, Any]]] = None
+    checks: Optional[Dict[str, Any]] = None
+    checks_age_seconds: Optional[float] = None
+
+
+class LivenessCheck(BaseModel):
+    status: str
+    timestamp: datetime
+
+
+class ReadinessCheck(BaseModel):
+    status: str
+    timestamp: datetime
+    reasons: List[str] = []
+    checks: Optional[Dict[str, Any]] = None
+    checks_age_seconds: Optional[float] = None
+    warmup: Dict[str, Any]
 
 
 class ChatDelete(BaseModel):
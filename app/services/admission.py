@@ -0,0 +1,272 @@
+# ================================
+# FILE: app/services/admission.py
+# ================================
+
+import asyncio
+import itertools
+import logging
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import snapshot_collector
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping for idle users is pruned once this many users have been seen
+_PRUNE_THRESHOLD = 4096
+
+
+class AdmissionRejected(Exception):
+    """Raised when an agent run cannot be admitted (queue full, rate limited or timed out)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Take one token, returning how long the caller must wait before it is usable"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class _Waiter:
+    __slots__ = ("user_key", "start_tag", "finish_tag", "not_before", "seq", "future", "bucket")
+
+    def __init__(self, user_key, start_tag, finish_tag, not_before, seq, future, bucket):
+        self.user_key = user_key
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.not_before = not_before
+        self.seq = seq
+        self.future = future
+        self.bucket = bucket
+
+    def sort_key(self):
+        return self.finish_tag, self.seq
+
+
+class AdmissionTicket:
+    """
+    A queued request for one agent run. Use as an async context manager:
+    entering waits for admission, leaving frees the concurrency slot.
+    """
+
+    def __init__(self, controller: "AdmissionController", waiter: _Waiter, position: int):
+        self.position = position
+        self._controller = controller
+        self._waiter = waiter
+        self._acquired = False
+        self._released = False
+
+    async def acquire(self):
+        future = self._waiter.future
+        try:
+            async with asyncio.timeout(self._controller.queue_timeout):
+                await future
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # Admitted at the same moment we gave up - hand the slot back
+                self._controller._release()
+            else:
+                self._controller._abandon(self._waiter)
+            self._released = True
+            if isinstance(e, TimeoutError):
+                raise AdmissionRejected(
+                    "Timed out waiting for LLM capacity",
+                    retry_after=self._controller.queue_timeout
+                ) from None
+            raise
+        self._acquired = True
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        if self._acquired:
+            self._controller._release()
+        else:
+            self._controller._abandon(self._waiter)
+
+    async def __aenter__(self) -> "AdmissionTicket":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class AdmissionController:
+    """
+    Admission control for LLM-bound agent runs.
+
+    - A global cap bounds how many runs are in flight at once.
+    - Each user has a token bucket; a request that finds it empty is delayed
+      until a token refills, or rejected if that would take too long.
+    - Waiting requests are served in weighted-fair-queuing order (smallest
+      virtual finish tag first), so one heavy user cannot starve the rest.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            user_rate_per_minute: float,
+            user_burst: int,
+            max_queue_size: int,
+            queue_timeout: float,
+            max_rate_delay: float
+    ):
+        self.max_concurrency = max_concurrency
+        self.user_rate = user_rate_per_minute / 60.0
+        self.user_burst = user_burst
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.max_rate_delay = max_rate_delay
+
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._weights: Dict[str, float] = {}
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def set_weight(self, user_key: str, weight: float):
+        """Give a user a larger (or smaller) share of capacity while queued"""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self._weights[user_key] = weight
+
+    def enqueue(self, user_key: str, cost: float = 1.0) -> AdmissionTicket:
+        """
+        Queue a run for ``user_key`` and return its ticket.
+
+        ``ticket.position`` is 0 when the run was admitted immediately,
+        otherwise the number of runs that will be served before it.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        if len(self._waiters) >= self.max_queue_size:
+            raise AdmissionRejected("LLM queue is full, please retry shortly", retry_after=1.0)
+
+        if len(self._last_finish) > _PRUNE_THRESHOLD:
+            self._prune(now)
+
+        bucket = self._buckets.get(user_key)
+        if bucket is None:
+            bucket = self._buckets[user_key] = _TokenBucket(self.user_rate, self.user_burst, now)
+        delay = bucket.reserve(now)
+        if delay > self.max_rate_delay:
+            bucket.refund()
+            raise AdmissionRejected("Rate limit exceeded, please slow down", retry_after=delay)
+
+        weight = self._weights.get(user_key, 1.0)
+        start_tag = max(self._virtual_time, self._last_finish.get(user_key, 0.0))
+        finish_tag = start_tag + cost / weight
+        self._last_finish[user_key] = finish_tag
+
+        waiter = _Waiter(user_key, start_tag, finish_tag, now + delay, next(self._seq), loop.create_future(), bucket)
+        self._waiters.append(waiter)
+        self._dispatch()
+
+        if waiter.future.done():
+            position = 0
+        else:
+            position = 1 + sum(1 for w in self._waiters if w.sort_key() < waiter.sort_key())
+            logger.info(f"LLM run for {user_key} queued at position {position}")
+        return AdmissionTicket(self, waiter, position)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current load, for health and metrics reporting"""
+        return {
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        # A cancelled ticket (client gone, queue deadline) withdraws itself only once its task
+        # runs again; drop it now so a release in between does not hand the slot to it
+        for waiter in [w for w in self._waiters if w.future.done()]:
+            self._waiters.remove(waiter)
+            waiter.bucket.refund()
+
+        while self._active < self.max_concurrency and self._waiters:
+            chosen = None
+            next_eligible_at = None
+            for waiter in self._waiters:
+                if waiter.not_before <= now:
+                    if chosen is None or waiter.sort_key() < chosen.sort_key():
+                        chosen = waiter
+                elif next_eligible_at is None or waiter.not_before < next_eligible_at:
+                    next_eligible_at = waiter.not_before
+
+            if chosen is None:
+                # Everyone waiting is still rate limited; wake up when the first becomes eligible
+                if next_eligible_at is not None:
+                    self._timer = loop.call_at(next_eligible_at, self._dispatch)
+                return
+
+            self._waiters.remove(chosen)
+            chosen.future.set_result(None)
+            self._active += 1
+            self._virtual_time = max(self._virtual_time, chosen.start_tag)
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _abandon(self, waiter: _Waiter):
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+            waiter.bucket.refund()
+            self._dispatch()
+
+    def _prune(self, now: float):
+        waiting_users = {w.user_key for w in self._waiters}
+        for user_key in [k for k, finish in self._last_finish.items()
+                         if finish <= self._virtual_time and k not in waiting_users]:
+            del self._last_finish[user_key]
+        for user_key in [k for k, bucket in self._buckets.items()
+                         if bucket.is_full(now) and k not in waiting_users]:
+            del self._buckets[user_key]
+
+
+# Global admission controller instance
+admission_controller = AdmissionController(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    user_rate_per_minute=settings.LLM_USER_RATE_PER_MINUTE,
+    user_burst=settings.LLM_USER_BURST,
+    max_queue_size=settings.LLM_QUEUE_MAX_SIZE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+    max_rate_delay=settings.LLM_USER_MAX_RATE_DELAY_SECONDS,
+)
+snapshot_collector.register_snapshot("llm_admission", admission_controller.snapshot)
@@ -0,0 +1,429 @@
+# ================================
+# FILE: app/services/chat_jobs.py
+# ================================
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from psycopg.types.json import Jsonb
+
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.tracing import trace_root
+from app.schemas.chat import ChatJob, ChatJobStatus, ChatResponse
+from app.services.chat_service import chat_service
+from app.services.idempotency import IdempotencyConflict
+from app.services.langgraph_agent import langgraph_agent
+from app.utils.sse import SSEEventEncoder, is_event
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (ChatJobStatus.SUCCEEDED, ChatJobStatus.FAILED, ChatJobStatus.CANCELLED)
+
+_FRAME_PREFIX = b"data: "
+
+JOB_COLUMNS = "id, thread_id, status, attempts, created_at, started_at, finished_at, result, error"
+
+
+def _job_from_row(row: Dict[str, Any]) -> ChatJob:
+    return ChatJob(
+        job_id=row["id"],
+        thread_id=row["thread_id"],
+        status=ChatJobStatus(row["status"]),
+        attempts=row["attempts"],
+        created_at=row["created_at"],
+        started_at=row["started_at"],
+        finished_at=row["finished_at"],
+        result=ChatResponse(**row["result"]) if row["result"] else None,
+        error=row["error"],
+    )
+
+
+def _frame_payload(frame: bytes) -> Dict[str, Any]:
+    return json.loads(frame[len(_FRAME_PREFIX):])
+
+
+class _EventWriter:
+    """Appends a job's SSE frames to chat_job_events, batching token frames"""
+
+    def __init__(self, job_id: str, next_seq: int, flush_interval: float):
+        self.job_id = job_id
+        self.next_seq = next_seq
+        self.flush_interval = flush_interval
+        self._pending: List[tuple] = []
+        self._last_flush = asyncio.get_running_loop().time()
+
+    async def append(self, frame: bytes):
+        self._pending.append((self.job_id, self.next_seq, frame.decode("utf-8")))
+        self.next_seq += 1
+        now = asyncio.get_running_loop().time()
+        # Token frames are written together; every other event is visible at once
+        if not is_event(frame, "content_chunk") or now - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        self._last_flush = asyncio.get_running_loop().time()
+        async with db_manager.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(
+                    "INSERT INTO chat_job_events (job_id, seq, frame) VALUES (%s, %s, %s) "
+                    "ON CONFLICT (job_id, seq) DO NOTHING",
+                    rows
+                )
+
+
+class ChatJobWorker:
+    """
+    Runs chat turns submitted as jobs in the ``chat_jobs`` table.
+
+    ``concurrency`` worker loops per process claim queued jobs with
+    ``FOR UPDATE SKIP LOCKED``, so any number of app processes can share the
+    queue. Each job runs through ``chat_service`` (thread locks, admission
+    control) and its SSE frames are stored in ``chat_job_events`` for
+    clients to stream or poll. Running jobs are heartbeated; a job whose
+    worker stops heartbeating is re-queued (up to ``max_attempts``) and, if
+    its user message was already checkpointed, resumed from the latest
+    checkpoint instead of being sent again. On shutdown a worker hands its
+    running jobs back to the queue without using up an attempt.
+    """
+
+    def __init__(
+            self,
+            concurrency: int,
+            poll_interval: float,
+            heartbeat_interval: float,
+            stale_after: float,
+            max_attempts: int,
+            retention_hours: float,
+            event_flush_interval: float
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.retention_hours = retention_hours
+        self.event_flush_interval = event_flush_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._loops: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    # Lifecycle
+
+    async def start(self):
+        if self.concurrency <= 0:
+            logger.info("Chat job workers disabled in this process (CHAT_JOB_WORKERS=0)")
+            return
+        self._stopping = False
+        self._loops = [asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)]
+        self._loops.append(asyncio.create_task(self._maintenance_loop()))
+        logger.info(f"Started {self.concurrency} chat job workers as {self.worker_id}")
+
+    async def stop(self):
+        self._stopping = True
+        held = list(self._running)
+        for task in self._loops:
+            task.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+        if held:
+            # Give the jobs back; this was a shutdown, not a failed attempt
+            async with db_manager.get_connection() as conn:
+                await conn.execute(
+                    "UPDATE chat_jobs SET status = 'queued', worker_id = NULL, attempts = GREATEST(attempts - 1, 0) "
+                    "WHERE id = ANY(%s) AND worker_id = %s AND status = 'running'",
+                    (held, self.worker_id)
+                )
+            logger.info(f"Re-queued {len(held)} running chat jobs on shutdown")
+
+    # Client API
+
+    async def submit(
+            self,
+            thread_id: str,
+            user_id: str,
+            message: str,
+            idempotency_key: Optional[str] = None
+    ) -> ChatJob:
+        """Queue a turn; with ``idempotency_key`` a repeated submission returns the existing job"""
+        async with db_manager.get_connection() as conn:
+            cur = await conn.execute(
+                f"INSERT INTO chat_jobs (id, thread_id, user_id, message, idempotency_key, status) "
+                f"VALUES (%s, %s, %s, %s, %s, 'queued') "
+                f"ON CONFLICT (thread_id, idempotency_key) DO NOTHING RETURNING {JOB_COLUMNS}",
+                (str(uuid.uuid4()), thread_id, user_id, message, idempotency_key)
+            )
+            row = await cur.fetchone()
+            if row is None:
+                cur = await conn.execute(
+                    f"SELECT {JOB_COLUMNS}, message FROM chat_jobs WHERE thread_id = %s AND idempotency_key = %s",
+                    (thread_id, idempotency_key)
+                )
+                row = await cur.fetchone()
+                if row["message"] != message:
+                    raise IdempotencyConflict(f"Idempotency-Key {idempotency_key!r} was already used for a different job")
+                return _job_from_row(row)
+        self._wakeup.set()
+        return _job_from_row(row)
+
+    async def get(self, job_id: str, user_id: str) -> Optional[ChatJob]:
+        async with db_manager.get_connection() as conn:
+            cur = await conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM chat_jobs WHERE id = %s AND user_id = %s", (job_id, user_id)
+            )
+            row = await cur.fetchone()
+        return _job_from_row(row) if row else None
+
+    async def cancel(self, job_id: str, user_id: str) -> Optional[ChatJob]:
+        """Cancel a queued job at once, or ask the worker running it to stop"""
+        async with db_manager.get_connection() as conn:
+            cur = await conn.execute(
+                f"UPDATE chat_jobs SET cancel_requested = TRUE, "
+                f"status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END, "
+                f"finished_at = CASE WHEN status = 'queued' THEN now() ELSE finished_at END "
+                f"WHERE id = %s AND user_id = %s RETURNING {JOB_COLUMNS}",
+                (job_id, user_id)
+            )
+            row = await cur.fetchone()
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return _job_from_row(row) if row else None
+
+    async def events(self, job: ChatJob, after: int = 0) -> AsyncIterator[bytes]:
+        """
+        SSE frames of a job after sequence number ``after``, following the job
+        until it finishes. Frames carry ``id:`` lines so a client can resume
+        with Last-Event-ID; a ``job_end`` frame closes the stream.
+        """
+        while True:
+            async with db_manager.get_connection() as conn:
+                cur = await conn.execute("SELECT status FROM chat_jobs WHERE id = %s", (job.job_id,))
+                row = await cur.fetchone()
+                finished = row is None or row["status"] in TERMINAL_STATUSES
+                # Events are written before the job is marked finished, so this read sees them all
+                cur = await conn.execute(
+                    "SELECT seq, frame FROM chat_job_events WHERE job_id = %s AND seq > %s ORDER BY seq",
+                    (job.job_id, after)
+                )
+                rows = await cur.fetchall()
+            for event in rows:
+                after = event["seq"]
+                yield f"id: {after}\n".encode("ascii") + event["frame"].encode("utf-8")
+            if finished:
+                status = row["status"] if row else ChatJobStatus.CANCELLED.value
+                yield SSEEventEncoder(job.thread_id).encode("job_end", job_id=job.job_id, status=status)
+                return
+            if not rows:
+                await asyncio.sleep(settings.CHAT_JOB_STREAM_POLL_SECONDS)
+
+    # Worker side
+
+    async def _worker_loop(self):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to claim chat job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    async with asyncio.timeout(self.poll_interval):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._traced_run_job(job))
+            self._running[job["id"]] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                if self._stopping:
+                    raise
+            finally:
+                self._running.pop(job["id"], None)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        async with db_manager.get_connection() as conn:
+            cur = await conn.execute(
+                "UPDATE chat_jobs SET status = 'running', worker_id = %s, attempts = attempts + 1, "
+                "started_at = now(), heartbeat_at = now() "
+                "WHERE id = (SELECT id FROM chat_jobs WHERE status = 'queued' AND available_at <= now() "
+                "            ORDER BY created_at FOR UPDATE SKIP LOCKED LIMIT 1) "
+                "RETURNING id, thread_id, user_id, message, attempts, "
+                "(SELECT COALESCE(MAX(seq), 0) FROM chat_job_events WHERE job_id = chat_jobs.id) AS last_seq",
+                (self.worker_id,)
+            )
+            return await cur.fetchone()
+
+    async def _traced_run_job(self, job: Dict[str, Any]):
+        """Run a job as its own trace (there is no HTTP request to hang it from)"""
+        with trace_root("chat_job", **{"chat.job_id": job["id"], "chat.thread_id": job["thread_id"]}):
+            await self._run_job(job)
+
+    async def _run_job(self, job: Dict[str, Any]):
+        job_id, thread_id = job["id"], job["thread_id"]
+        writer = _EventWriter(job_id, job["last_seq"] + 1, self.event_flush_interval)
+        try:
+            message: Optional[str] = job["message"]
+            # Checked on every run: a shutdown hands the job back without using up an attempt,
+            # so the attempt count cannot tell whether an earlier run already started the turn
+            if await langgraph_agent.has_message(thread_id, job_id):
+                # An earlier run checkpointed the user message; continue that turn
+                logger.info(f"Resuming chat job {job_id} from the latest checkpoint")
+                message = None
+
+            final: Optional[Dict[str, Any]] = None
+            error: Optional[Dict[str, Any]] = None
+            async with aclosing(chat_service.process_chat_message_streaming(
+                    message, thread_id, user_id=job["user_id"], message_id=job_id
+            )) as frames:
+                async for frame in frames:
+                    await writer.append(frame)
+                    if is_event(frame, "final_response"):
+                        final = _frame_payload(frame)
+                    elif is_event(frame, "error"):
+                        error = _frame_payload(frame)
+            await writer.flush()
+
+            if error is not None and error.get("retry_after") is not None and job["attempts"] < self.max_attempts:
+                # Not admitted (rate limit / full queue): try again later
+                await self._finish(job_id, "queued", delay=error["retry_after"])
+            elif error is not None:
+                await self._finish(job_id, "failed", error=error["message"])
+            else:
+                await self._finish(job_id, "succeeded", result=await self._result(thread_id, final))
+
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise
+            await asyncio.shield(self._finish(job_id, "cancelled", error="Cancelled"))
+        except Exception as e:
+            logger.error(f"Chat job {job_id} failed: {e}")
+            await self._finish(job_id, "failed", error=str(e))
+        finally:
+            await asyncio.shield(writer.flush())
+
+    @staticmethod
+    async def _result(thread_id: str, final: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if final is not None:
+            return ChatResponse(
+                response=final["response"],
+                thread_id=thread_id,
+                message_id=final["message_id"],
+                timestamp=final["timestamp"],
+                tool_calls=final.get("tool_calls")
+            ).model_dump(mode="json")
+
+        # Resumed a turn that had already finished: report its stored answer
+        history = await langgraph_agent.get_chat_history(thread_id)
+        last = history[-1] if history and history[-1]["role"] == "assistant" else None
+        return ChatResponse(
+            response=last["content"] if last else "",
+            thread_id=thread_id,
+            message_id=last["message_id"] if last else None,
+            timestamp=datetime.utcnow()
+        ).model_dump(mode="json")
+
+    async def _finish(
+            self,
+            job_id: str,
+            status: str,
+            result: Optional[Dict[str, Any]] = None,
+            error: Optional[str] = None,
+            delay: float = 0.0
+    ):
+        async with db_manager.get_connection() as conn:
+            if status == "queued":
+                await conn.execute(
+                    "UPDATE chat_jobs SET status = 'queued', worker_id = NULL, "
+                    "available_at = now() + make_interval(secs => %s) WHERE id = %s AND worker_id = %s",
+                    (delay, job_id, self.worker_id)
+                )
+                return
+            await conn.execute(
+                "UPDATE chat_jobs SET status = %s, result = %s, error = %s, finished_at = now(), worker_id = NULL "
+                "WHERE id = %s AND worker_id = %s",
+                (status, Jsonb(result) if result is not None else None, error, job_id, self.worker_id)
+            )
+        logger.info(f"Chat job {job_id} {status}")
+
+    async def _maintenance_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat()
+                await self._requeue_stale()
+                await self._purge_finished()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chat job maintenance failed: {e}")
+
+    async def _heartbeat(self):
+        if not self._running:
+            return
+        async with db_manager.get_connection() as conn:
+            cur = await conn.execute(
+                "UPDATE chat_jobs SET heartbeat_at = now() WHERE id = ANY(%s) AND worker_id = %s "
+                "RETURNING id, cancel_requested",
+                (list(self._running), self.worker_id)
+            )
+            rows = await cur.fetchall()
+        for row in rows:
+            # Cancellation requested through another process
+            if row["cancel_requested"] and row["id"] in self._running:
+                self._running[row["id"]].cancel()
+
+    async def _requeue_stale(self):
+        async with db_manager.get_connection() as conn:
+            cur = await conn.execute(
+                "UPDATE chat_jobs SET worker_id = NULL, "
+                "status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END, "
+                "error = CASE WHEN attempts >= %s THEN 'Worker stopped responding' ELSE error END, "
+                "finished_at = CASE WHEN attempts >= %s THEN now() END "
+                "WHERE id IN (SELECT id FROM chat_jobs WHERE status = 'running' "
+                "             AND heartbeat_at < now() - make_interval(secs => %s) FOR UPDATE SKIP LOCKED) "
+                "RETURNING id, status",
+                (self.max_attempts, self.max_attempts, self.max_attempts, self.stale_after)
+            )
+            rows = await cur.fetchall()
+        for row in rows:
+            logger.warning(f"Chat job {row['id']} lost its worker, now {row['status']}")
+        if rows:
+            self._wakeup.set()
+
+    async def _purge_finished(self):
+        async with db_manager.get_connection() as conn:
+            await conn.execute(
+                "DELETE FROM chat_jobs WHERE finished_at < now() - make_interval(secs => %s)",
+                (self.retention_hours * 3600,)
+            )
+
+
+# Global chat job worker pool
+chat_job_worker = ChatJobWorker(
+    concurrency=settings.CHAT_JOB_WORKERS,
+    poll_interval=settings.CHAT_JOB_POLL_SECONDS,
+    heartbeat_interval=settings.CHAT_JOB_HEARTBEAT_SECONDS,
+    stale_after=settings.CHAT_JOB_STALE_SECONDS,
+    max_attempts=settings.CHAT_JOB_MAX_ATTEMPTS,
+    retention_hours=settings.CHAT_JOB_RETENTION_HOURS,
+    event_flush_interval=settings.CHAT_JOB_EVENT_FLUSH_SECONDS,
+)
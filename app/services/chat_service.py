@@ -1,55 +1,85 @@
 # ================================
 # FILE: app/services/chat_service.py
 # ================================
-import json
 from typing import AsyncGenerator
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
 from datetime import datetime
-from app.services.langgraph_agent import langgraph_agent
+from app.core.config import settings
+from app.core.metrics import CHAT_TURNS, stage_timer
+from app.services.langgraph_agent import langgraph_agent, ForkError
+from app.services.admission import admission_controller, AdmissionRejected
+from app.services.thread_locks import thread_turn_locks, ThreadBusyError
+from app.services.synthetic_stream import SyntheticProfile, default_profile, synthetic_stream
 from app.schemas.chat import ChatResponse, ChatHistory, ChatMessage, MessageRole, ChatDelete
+from app.utils.sse import SSEEventEncoder
 import logging
 import uuid
 import asyncio,re
 logger = logging.getLogger(__name__)
 
 
+class ChatTurnError(Exception):
+    """
+    Raised by ``process_chat_message(raise_on_error=True)`` when the turn
+    failed; ``response`` is the apology it would otherwise have returned.
+    """
+
+    def __init__(self, message: str, response: ChatResponse):
+        super().__init__(message)
+        self.response = response
+
+
 class ChatService:
     async def process_chat_message_streaming(
             self,
-            message: str,
-            thread_id: str
-    ) -> AsyncGenerator[str, None]:
+            message: Optional[str],
+            thread_id: str,
+            user_id: Optional[str] = None,
+            replace_message_id: Optional[str] = None,
+            message_id: Optional[str] = None
+    ) -> AsyncGenerator[bytes, None]:
         """
-        Process a chat message and yield streaming JSON responses
+        Process a chat message and yield streaming JSON responses.
+        With ``replace_message_id`` the turn that produced that message is
+        re-run on a new branch: edited with ``message``, or regenerated when
+        ``message`` is None. Otherwise a ``message`` of None resumes the
+        thread's unfinished turn, and ``message_id`` sets the user message id.
         """
+        encoder = SSEEventEncoder(thread_id)
+        lease = None
+        ticket = None
+        chunks = None
+        outcome = "error"
         try:
-            message_id = str(uuid.uuid4())
-            timestamp = datetime.utcnow()
-            
+            # Only one turn at a time may run on a thread
+            lease = await thread_turn_locks.acquire(thread_id)
+
+            checkpoint_id = None
+            if replace_message_id is not None:
+                checkpoint_id, message, message_id = await langgraph_agent.resolve_fork(
+                    thread_id, replace_message_id, message
+                )
+
+            # Queue for an LLM slot and report where we are in line
+            ticket = admission_controller.enqueue(user_id or thread_id)
+
             # Send initial response
-            initial_response = {
-                "type": "stream_start",
-                "thread_id": thread_id,
-                "message_id": message_id,
-                "timestamp": timestamp.isoformat()
-            }
-            yield f"data: {json.dumps(initial_response)}\n\n"
+            yield encoder.encode("stream_start", queue_position=ticket.position)
+            with stage_timer("admission_wait"):
+                await ticket.acquire()
 
             response_content = ""
             tool_calls = []
             accumulated_content = ""
 
-            # Process the message through LangGraph agent
-            async for chunk in langgraph_agent.process_message(message, thread_id):
+            # Process the message through LangGraph agent; the generator is run to the end so that
+            # checkpoints buffered by the durability mode are flushed before stream_end
+            chunks = langgraph_agent.process_message(
+                message, thread_id, checkpoint_id=checkpoint_id, message_id=message_id
+            )
+            async for chunk in chunks:
                 if "error" in chunk:
-                    error_response = {
-                        "type": "error",
-                        "message": chunk["message"],
-                        "thread_id": thread_id,
-                        "message_id": message_id,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                    yield f"data: {json.dumps(error_response)}\n\n"
+                    yield encoder.encode("error", message=chunk["message"])
                     return
 
                 # Extract response information
@@ -58,14 +88,7 @@ class ChatService:
                 # Handle tool calls
                 if response_info["is_tool_call"]:
                     tool_calls.extend(response_info["tool_calls"])
-                    tool_response = {
-                        "type": "tool_calls",
-                        "tool_calls": response_info["tool_calls"],
-                        "thread_id": thread_id,
-                        "message_id": message_id,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                    yield f"data: {json.dumps(tool_response)}\n\n"
+                    yield encoder.encode("tool_calls", tool_calls=response_info["tool_calls"])
 
                 # Handle content - check if we got new content
                 if response_info.get("content") and response_info["content"] != accumulated_content:
@@ -90,14 +113,7 @@ class ChatService:
                                 word.endswith('!') or 
                                 word.endswith('?')):
                                 
-                                content_response = {
-                                    "type": "content_chunk",
-                                    "content": current_chunk.strip(),
-                                    "thread_id": thread_id,
-                                    "message_id": message_id,
-                                    "timestamp": datetime.utcnow().isoformat()
-                                }
-                                yield f"data: {json.dumps(content_response)}\n\n"
+                                yield encoder.content_chunk(current_chunk.strip())
                                 
                                 # Small delay to simulate streaming
                                 await asyncio.sleep(0.1)
@@ -105,14 +121,7 @@ class ChatService:
                         
                         # Send any remaining content
                         if current_chunk.strip():
-                            content_response = {
-                                "type": "content_chunk",
-                                "content": current_chunk.strip(),
-                                "thread_id": thread_id,
-                                "message_id": message_id,
-                                "timestamp": datetime.utcnow().isoformat()
-                            }
-                            yield f"data: {json.dumps(content_response)}\n\n"
+                            yield encoder.content_chunk(current_chunk.strip())
                         
                         accumulated_content = new_content
                     
@@ -120,51 +129,101 @@ class ChatService:
 
                 # Check for final response
                 if response_info["is_final_response"]:
-                    final_response = {
-                        "type": "final_response",
-                        "response": response_content,
-                        "thread_id": thread_id,
-                        "message_id": message_id,
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "tool_calls": tool_calls if tool_calls else None
-                    }
-                    yield f"data: {json.dumps(final_response)}\n\n"
-                    break
+                    yield encoder.encode(
+                        "final_response",
+                        response=response_content,
+                        tool_calls=tool_calls if tool_calls else None
+                    )
 
             # Send stream end signal
-            end_response = {
-                "type": "stream_end",
-                "thread_id": thread_id,
-                "message_id": message_id,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            yield f"data: {json.dumps(end_response)}\n\n"
+            outcome = "ok"
+            yield encoder.encode("stream_end")
 
+        except AdmissionRejected as e:
+            outcome = "rejected"
+            logger.warning(f"Streaming chat request rejected for thread {thread_id}: {e}")
+            yield encoder.encode("error", message=str(e), retry_after=e.retry_after)
+        except ThreadBusyError as e:
+            outcome = "busy"
+            logger.warning(f"Streaming chat request rejected for busy thread {thread_id}: {e}")
+            yield encoder.encode("error", message=str(e))
+        except ForkError as e:
+            logger.warning(f"Cannot re-run message {replace_message_id} on thread {thread_id}: {e}")
+            yield encoder.encode("error", message=str(e))
         except Exception as e:
             logger.error(f"Error in streaming chat service: {e}")
-            error_response = {
-                "type": "error",
-                "message": f"I apologize, but I encountered an error: {str(e)}",
-                "thread_id": thread_id,
-                "message_id": str(uuid.uuid4()),
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            yield f"data: {json.dumps(error_response)}\n\n"
+            yield encoder.encode("error", message=f"I apologize, but I encountered an error: {str(e)}")
+        finally:
+            if chunks is not None:
+                # Finalize the turn (pending checkpoint flush) before the thread is released
+                await chunks.aclose()
+            if ticket is not None:
+                ticket.release()
+            if lease is not None:
+                await lease.release()
+            CHAT_TURNS.labels("stream", outcome).inc()
 
-    async def process_chat_message(
+    async def process_chat_message_streaming_mock(
             self,
             message: str,
-            thread_id: str
+            thread_id: str,
+            user_id: Optional[str] = None,
+            profile: Optional[SyntheticProfile] = None
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Stream a synthetic turn with the same events as ``process_chat_message_streaming``
+        (no LLM, tools or checkpoints); ``profile`` defaults to the SYNTHETIC_* settings.
+        ``user_id`` is accepted so both backends share one signature; synthetic turns skip admission.
+        """
+        outcome = "error"
+        try:
+            async for frame in synthetic_stream(message, thread_id, profile or default_profile()):
+                yield frame
+            outcome = "ok"
+        finally:
+            CHAT_TURNS.labels("synthetic", outcome).inc()
+
+    async def process_chat_message(
+            self,
+            message: Optional[str],
+            thread_id: str,
+            user_id: Optional[str] = None,
+            replace_message_id: Optional[str] = None,
+            raise_on_error: bool = False
     ) -> ChatResponse:
         """
-        Process a chat message and return the response
+        Process a chat message and return the response.
+        ``replace_message_id`` edits or regenerates an earlier turn as in
+        ``process_chat_message_streaming``.
+        Raises ThreadBusyError when another turn holds the thread,
+        AdmissionRejected when the LLM queue cannot take the request and
+        ForkError when the message to replace cannot be re-run. A failed turn
+        returns an apology response, or raises ChatTurnError with it when
+        ``raise_on_error`` is set, for callers that must tell failures apart.
         """
         try:
+            lease = await thread_turn_locks.acquire(thread_id)
+        except ThreadBusyError:
+            CHAT_TURNS.labels("message", "busy").inc()
+            raise
+        ticket = None
+        outcome = "error"
+        try:
+            checkpoint_id = message_id = None
+            if replace_message_id is not None:
+                checkpoint_id, message, message_id = await langgraph_agent.resolve_fork(
+                    thread_id, replace_message_id, message
+                )
+            ticket = admission_controller.enqueue(user_id or thread_id)
+            with stage_timer("admission_wait"):
+                await ticket.acquire()
             response_content = ""
             tool_calls = []
 
             # Process the message through LangGraph agent
-            async for chunk in langgraph_agent.process_message(message, thread_id):
+            async for chunk in langgraph_agent.process_message(
+                message, thread_id, checkpoint_id=checkpoint_id, message_id=message_id
+            ):
                 if "error" in chunk:
                     raise Exception(chunk["message"])
 
@@ -178,6 +237,7 @@ class ChatService:
                 if response_info["is_final_response"]:
                     response_content = response_info["content"]
 
+            outcome = "ok"
             return ChatResponse(
                 response=response_content,
                 thread_id=thread_id,
@@ -186,31 +246,97 @@ class ChatService:
                 tool_calls=tool_calls if tool_calls else None
             )
 
+        except AdmissionRejected:
+            outcome = "rejected"
+            raise
+        except (ThreadBusyError, ForkError):
+            raise
         except Exception as e:
             logger.error(f"Error in chat service: {e}")
-            return ChatResponse(
+            error_response = ChatResponse(
                 response=f"I apologize, but I encountered an error: {str(e)}",
                 thread_id=thread_id,
                 message_id=str(uuid.uuid4()),
                 timestamp=datetime.utcnow(),
                 tool_calls=None
             )
+            if raise_on_error:
+                raise ChatTurnError(str(e), error_response) from e
+            return error_response
+        finally:
+            if ticket is not None:
+                ticket.release()
+            await lease.release()
+            CHAT_TURNS.labels("message", outcome).inc()
+
+    async def process_chat_batch(
+            self,
+            turns: Sequence[Tuple[str, str]],
+            user_id: str,
+            concurrency: int
+    ) -> AsyncGenerator[Tuple[int, Union[ChatResponse, Exception]], None]:
+        """
+        Run (thread_id, message) turns with at most ``concurrency`` in flight,
+        yielding (index, response or error) as each one finishes.
+        Turns on the same thread run one after another in submission order.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        batch_thread_locks: Dict[str, asyncio.Lock] = {}
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def run(index: int, thread_id: str, message: str):
+            # Take the thread's place in line before a slot, so queued follow-ups don't hold slots
+            lock = batch_thread_locks.setdefault(thread_id, asyncio.Lock())
+            try:
+                async with lock, semaphore:
+                    result = await self._process_batch_turn(message, thread_id, user_id)
+            except Exception as e:
+                result = e
+            finished.put_nowait((index, result))
+
+        tasks = [asyncio.create_task(run(index, thread_id, message)) for index, (thread_id, message) in enumerate(turns)]
+        try:
+            for _ in tasks:
+                yield await finished.get()
+        finally:
+            # Client went away: stop the turns that have not finished
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-    async def get_chat_history(self, thread_id: str) -> ChatHistory:
+    async def _process_batch_turn(self, message: str, thread_id: str, user_id: str) -> ChatResponse:
+        # Batches are expected to hit the per-user rate limit; wait it out instead of failing the item
+        retries = 0
+        while True:
+            try:
+                # Failed turns raise, so the batch reports them as errors rather than as apologies
+                return await self.process_chat_message(message, thread_id, user_id, raise_on_error=True)
+            except AdmissionRejected as e:
+                retries += 1
+                if retries > settings.CHAT_BATCH_ADMISSION_RETRIES:
+                    raise
+                await asyncio.sleep(e.retry_after or 1.0)
+
+    @staticmethod
+    def _chat_message(msg_data: Dict[str, Any]) -> ChatMessage:
+        alternatives = msg_data.get("alternatives")
+        return ChatMessage(
+            role=MessageRole(msg_data["role"]),
+            content=msg_data["content"],
+            timestamp=datetime.fromtimestamp(msg_data["timestamp"]) if msg_data["timestamp"] else None,
+            message_id=msg_data["message_id"],
+            alternatives=[ChatService._chat_message(alt) for alt in alternatives] if alternatives else None
+        )
+
+    async def get_chat_history(self, thread_id: str, include_branches: bool = False) -> ChatHistory:
         """
-        Get chat history for a specific thread
+        Get chat history for a specific thread (the current branch, optionally
+        with the alternatives replaced by edits and regenerations)
         """
         try:
-            history_data = await langgraph_agent.get_chat_history(thread_id)
-
-            messages = []
-            for msg_data in history_data:
-                messages.append(ChatMessage(
-                    role=MessageRole(msg_data["role"]),
-                    content=msg_data["content"],
-                    timestamp=datetime.fromtimestamp(msg_data["timestamp"]) if msg_data["timestamp"] else None,
-                    message_id=msg_data["message_id"]
-                ))
+            history_data = await langgraph_agent.get_chat_history(thread_id, include_branches=include_branches)
+
+            messages = [self._chat_message(msg_data) for msg_data in history_data]
 
             return ChatHistory(
                 thread_id=thread_id,
@@ -0,0 +1,167 @@
+# ================================
+# FILE: app/services/context_window.py
+# ================================
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.prebuilt.chat_agent_executor import AgentState
+
+from app.core.config import settings
+from app.services.tool_payloads import ToolOutputCompactor, tool_output_compactor
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI assistant. "
+    "Update the existing summary with the new messages below. Keep every fact, decision, "
+    "name, number and open question the assistant may need later; drop pleasantries and "
+    "raw search output. Write at most {max_words} words of plain prose. "
+    "Output only the updated summary."
+)
+
+
+class ConversationState(AgentState, total=False):
+    """Agent state plus the stored running summary of turns outside the context window"""
+
+    context_summary: str
+    # Number of leading messages already folded into context_summary
+    summarized_message_count: int
+
+
+def resolve_token_budget(model_names: Iterable[str]) -> int:
+    """Smallest configured prompt budget among the models a call may be routed to"""
+    budgets = [
+        settings.CONTEXT_TOKEN_BUDGETS.get(name, settings.CONTEXT_TOKEN_BUDGET)
+        for name in model_names
+    ]
+    return min(budgets) if budgets else settings.CONTEXT_TOKEN_BUDGET
+
+
+def _render_transcript(messages: Sequence[BaseMessage], max_tool_chars: int = 600) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                lines.append(f"Assistant called {tool_call['name']} with {tool_call['args']}")
+            if message.content:
+                lines.append(f"Assistant: {message.content}")
+        elif isinstance(message, ToolMessage):
+            content = str(message.content)
+            if len(content) > max_tool_chars:
+                content = content[:max_tool_chars] + "..."
+            lines.append(f"Tool result ({message.name}): {content}")
+    return "\n".join(lines)
+
+
+class ContextWindow:
+    """
+    Bounds the prompt sent to the model on every agent step.
+
+    The last ``keep_turns`` turns (a turn starts at a HumanMessage) are sent
+    verbatim, further limited to ``token_budget`` tokens including the summary,
+    but never less than the current turn. Everything older is folded into
+    ``context_summary`` in the graph state. Folding is incremental: each call
+    only summarizes messages that left the window since the last one, so the
+    prompt on turn 200 is the same size as on turn 5.
+    """
+
+    def __init__(
+            self,
+            summarizer: BaseChatModel,
+            keep_turns: int,
+            token_budget: int,
+            summary_max_words: int = 250,
+            compactor: Optional[ToolOutputCompactor] = None
+    ):
+        self.summarizer = summarizer
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.summary_max_words = summary_max_words
+        self.compactor = compactor
+
+    def _window_start(self, messages: Sequence[BaseMessage], summary: str) -> int:
+        """Index of the first message sent verbatim"""
+        turn_starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if not turn_starts:
+            return 0
+
+        budget = self.token_budget - count_tokens_approximately([SystemMessage(summary)]) if summary else self.token_budget
+        start = turn_starts[-1]
+        used = count_tokens_approximately(messages[start:])
+        # Earlier turns that may join the current one (none when keep_turns <= 1; a bare
+        # [-keep_turns:] slice would keep every turn for 0)
+        earlier = turn_starts[max(0, len(turn_starts) - self.keep_turns):-1]
+        for turn_start in reversed(earlier):
+            used += count_tokens_approximately(messages[turn_start:start])
+            if used > budget:
+                break
+            start = turn_start
+        return start
+
+    async def _summarize(self, summary: str, messages: Sequence[BaseMessage]) -> str:
+        transcript = _render_transcript(messages)
+        if not transcript:
+            return summary
+        prompt = [
+            SystemMessage(SUMMARY_PROMPT.format(max_words=self.summary_max_words)),
+            HumanMessage(f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"),
+        ]
+        response = await self.summarizer.ainvoke(prompt)
+        return str(response.content).strip()
+
+    async def pre_model_hook(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """LangGraph pre-model hook: returns the bounded model input and any summary update"""
+        messages: List[BaseMessage] = list(state["messages"])
+        summary: str = state.get("context_summary") or ""
+        folded: int = state.get("summarized_message_count") or 0
+
+        update: Dict[str, Any] = {}
+        if self.compactor is not None:
+            # Tool results from earlier turns are replaced (by message id) with compact references
+            replacements = await self.compactor.compact(messages)
+            if replacements:
+                by_id = {m.id: m for m in replacements}
+                messages = [by_id.get(m.id, m) for m in messages]
+                update["messages"] = replacements
+
+        window_start = max(self._window_start(messages, summary), folded)
+        if window_start > folded:
+            try:
+                summary = await self._summarize(summary, messages[folded:window_start])
+                update.update(context_summary=summary, summarized_message_count=window_start)
+                logger.info(f"Folded {window_start - folded} messages into the conversation summary")
+            except Exception as e:
+                # Keep going with the old summary and send the unsummarized messages verbatim
+                # (over budget rather than lost); folding them is retried next step
+                logger.warning(f"Failed to update conversation summary: {e}")
+                window_start = folded
+
+        model_input: List[BaseMessage] = messages[window_start:]
+        if summary:
+            model_input = [SystemMessage(f"Summary of the earlier conversation:\n{summary}")] + model_input
+
+        update["llm_input_messages"] = model_input
+        return update
+
+
+def build_context_window(summarizer: BaseChatModel, model_names: Optional[Iterable[str]] = None) -> ContextWindow:
+    """Context window configured from CONTEXT_* settings"""
+    return ContextWindow(
+        summarizer=summarizer,
+        keep_turns=settings.CONTEXT_KEEP_TURNS,
+        token_budget=resolve_token_budget(model_names or []),
+        summary_max_words=settings.CONTEXT_SUMMARY_MAX_WORDS,
+        compactor=tool_output_compactor if settings.TOOL_PAYLOAD_COMPACTION else None,
+    )
@@ -0,0 +1,164 @@
+# ================================
+# FILE: app/services/health_monitor.py
+# ================================
+
+"""
+Dependency checks behind the readiness probe.
+
+``HealthMonitor`` refreshes a snapshot every HEALTH_CHECK_INTERVAL_SECONDS
+in the background: pool saturation, whether the checkpointer's database
+answers a ``SELECT 1``, circuit breaker states and the largest event-loop
+lag the loop monitor saw since the previous refresh. Probes only read the
+snapshot, so they cost nothing however often the load balancer polls, and
+the database sees at most one ping per interval per worker. The ping is
+skipped while the pool is saturated; queueing a health check behind real
+requests would only add to the load.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.metrics import snapshot_collector
+from app.core.profiling import loop_monitor
+from app.services.resilience import circuit_breakers
+from app.services.warmup import warmup
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Background-refreshed dependency snapshot and the readiness decision made from it"""
+
+    def __init__(self, interval: float, timeout: float, pool_saturation: float, max_loop_lag: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.pool_saturation = pool_saturation
+        self.max_loop_lag = max_loop_lag
+        self.checks: Optional[Dict[str, Any]] = None
+        self._refreshed_at: Optional[float] = None
+        self._checkpointer: Dict[str, Any] = {"reachable": None, "checked_at": None}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health check refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self):
+        pool = self._pool()
+        if not pool.get("saturated"):
+            await self._ping_checkpointer()
+        self.checks = {
+            "pool": pool,
+            "checkpointer": dict(self._checkpointer),
+            "circuit_breakers": circuit_breakers.snapshot(),
+            "event_loop": self._event_loop(),
+        }
+        self._refreshed_at = time.monotonic()
+
+    @staticmethod
+    def _event_loop() -> Dict[str, Any]:
+        if not loop_monitor.running:
+            # LOOP_MONITOR_ENABLED=false: lag is not measured and not checked
+            return {"monitored": False, "max_lag_seconds": None}
+        return {"monitored": True, "max_lag_seconds": round(loop_monitor.take_window_lag(), 4)}
+
+    def _pool(self) -> Dict[str, Any]:
+        stats = db_manager.pool_stats()
+        if not stats:
+            return {"initialized": False, "saturated": False}
+        in_use = stats["size"] - stats["available"]
+        saturation = in_use / stats["max_size"] if stats["max_size"] else 0.0
+        return {
+            "initialized": True,
+            "in_use": in_use,
+            "max_size": stats["max_size"],
+            "requests_waiting": stats["requests_waiting"],
+            "saturation": round(saturation, 3),
+            # Busy alone is fine; busy with requests queueing for a connection is not
+            "saturated": saturation >= self.pool_saturation and stats["requests_waiting"] > 0,
+        }
+
+    async def _ping_checkpointer(self):
+        if db_manager.pool is None or db_manager.memory is None:
+            self._checkpointer = {"reachable": False, "checked_at": time.time(), "error": "not initialized"}
+            return
+        started = time.perf_counter()
+        try:
+            async def ping():
+                async with db_manager.pool.connection(timeout=self.timeout) as conn:  # type: ignore[union-attr]
+                    await conn.execute("SELECT 1")
+
+            await asyncio.wait_for(ping(), timeout=self.timeout)
+            self._checkpointer = {
+                "reachable": True,
+                "checked_at": time.time(),
+                "latency_seconds": round(time.perf_counter() - started, 4),
+            }
+        except Exception as e:
+            if self._checkpointer.get("reachable") is not False:
+                logger.warning(f"Checkpointer database unreachable: {e or type(e).__name__}")
+            self._checkpointer = {"reachable": False, "checked_at": time.time(), "error": str(e) or type(e).__name__}
+
+    @property
+    def age(self) -> Optional[float]:
+        return None if self._refreshed_at is None else time.monotonic() - self._refreshed_at
+
+    def not_ready_reasons(self) -> List[str]:
+        """Why this worker should not receive traffic; empty when it is ready"""
+        if not warmup.ready:
+            return ["warming_up"]
+        age = self.age
+        if self.checks is None or age is None:
+            return ["no_health_snapshot"]
+        reasons = []
+        if age > 3 * self.interval:
+            reasons.append("health_snapshot_stale")
+        if self.checks["pool"]["saturated"]:
+            reasons.append("db_pool_saturated")
+        if not self.checks["checkpointer"]["reachable"]:
+            reasons.append("checkpointer_unreachable")
+        if (self.checks["event_loop"]["max_lag_seconds"] or 0.0) > self.max_loop_lag:
+            reasons.append("event_loop_lagging")
+        return reasons
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The last checks and their age, for the probes"""
+        age = self.age
+        return {
+            "age_seconds": round(age, 3) if age is not None else None,
+            "checks": self.checks,
+        }
+
+    def metrics(self) -> Dict[str, float]:
+        return {"ready": 0.0 if self.not_ready_reasons() else 1.0}
+
+
+# Global health monitor (started by the app lifespan)
+health_monitor = HealthMonitor(
+    interval=settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    pool_saturation=settings.HEALTH_POOL_SATURATION_THRESHOLD,
+    max_loop_lag=settings.HEALTH_MAX_LOOP_LAG_SECONDS,
+)
+snapshot_collector.register_snapshot("health", health_monitor.metrics)
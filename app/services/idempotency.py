@@ -0,0 +1,164 @@
+# ================================
+# FILE: app/services/idempotency.py
+# ================================
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused for a different request"""
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable digest of the request fields a key is bound to"""
+    encoded = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class IdempotentRun:
+    """
+    One agent run started under an idempotency key.
+
+    The run executes in its own task, so it keeps going if the client that
+    started it disconnects. Streaming runs record every frame; any number of
+    requests can replay them from the start while the run is still producing.
+    """
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.frames: List[bytes] = []
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Set by the producer when the run did not complete a turn (error frame); the key is then freed
+        self.failed = False
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def append(self, frame: bytes):
+        self.frames.append(frame)
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """All frames of the run from the first one, following the run until it ends"""
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.frames):
+                yield self.frames[index]
+                index += 1
+            if self.done:
+                return
+            await changed.wait()
+
+    async def wait(self) -> Any:
+        """Result of the run; cancelling the caller does not cancel the run"""
+        await asyncio.shield(self.task)  # type: ignore[arg-type]
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class IdempotencyStore:
+    """
+    Short-lived, in-process store of runs keyed by (scope, Idempotency-Key).
+
+    A key seen again with the same request attaches to the run: it waits for
+    (or replays) the stored result instead of starting another agent turn. A
+    key reused with a different request raises IdempotencyConflict. Finished
+    runs are kept for ``ttl`` seconds; runs that failed free their key at
+    once so the client can retry. Keys are per worker, so retries must reach
+    the same worker (sticky routing) to be deduplicated.
+    """
+
+    def __init__(self, ttl: float, max_keys: int):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._runs: "OrderedDict[Tuple[str, str], IdempotentRun]" = OrderedDict()
+
+    def start(
+            self,
+            scope: str,
+            key: str,
+            fingerprint: str,
+            producer: Callable[[IdempotentRun], Awaitable[Any]]
+    ) -> Tuple[IdempotentRun, bool]:
+        """
+        Return the run for ``key``, starting ``producer`` if there is none.
+        The flag is True when an existing run was reused.
+        """
+        self._prune(time.monotonic())
+        run = self._runs.get((scope, key))
+        if run is not None:
+            if run.fingerprint != fingerprint:
+                raise IdempotencyConflict(
+                    f"{IDEMPOTENCY_HEADER} {key!r} was already used for a different request"
+                )
+            logger.info(f"Reusing run for idempotency key {key!r} on {scope}")
+            return run, True
+
+        run = IdempotentRun(fingerprint)
+        self._runs[(scope, key)] = run
+        run.task = asyncio.create_task(self._execute(scope, key, run, producer))
+        return run, False
+
+    async def _execute(
+            self,
+            scope: str,
+            key: str,
+            run: IdempotentRun,
+            producer: Callable[[IdempotentRun], Awaitable[Any]]
+    ):
+        try:
+            run.result = await producer(run)
+        except BaseException as e:
+            run.error = e
+            run.failed = True
+            if not isinstance(e, asyncio.CancelledError):
+                logger.warning(f"Run for idempotency key {key!r} on {scope} failed: {e}")
+        finally:
+            run.finished_at = time.monotonic()
+            run._notify()
+            if run.failed and self._runs.get((scope, key)) is run:
+                del self._runs[(scope, key)]
+
+    def _prune(self, now: float):
+        expired = [
+            run_key for run_key, run in self._runs.items()
+            if run.finished_at is not None and now - run.finished_at > self.ttl
+        ]
+        for run_key in expired:
+            del self._runs[run_key]
+        # Over capacity: drop the oldest finished runs; in-flight runs are never dropped
+        excess = len(self._runs) - self.max_keys
+        if excess > 0:
+            for run_key in [k for k, run in self._runs.items() if run.done][:excess]:
+                del self._runs[run_key]
+
+
+# Global idempotency store for chat submissions
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_keys=settings.IDEMPOTENCY_MAX_KEYS,
+)
@@ -3,43 +3,82 @@
 # ================================
 
 import os
+import time
 import uuid
-from typing import AsyncGenerator, Dict, Any, List
-from pydantic import SecretStr
-from langchain_groq import ChatGroq
-from langchain_community.tools.tavily_search import TavilySearchResults
+import asyncio
+import threading
+from typing import AsyncGenerator, Dict, Any, List, Optional, Tuple
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
-from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from app.core.config import settings
 from app.core.database import db_manager
+from app.core.metrics import AGENT_RUNS_IN_FLIGHT, observe_stage
+from app.core.tracing import TracingCallbackHandler, start_span
+from app.core.checkpoint_buffer import (
+    DURABILITY_BATCHED,
+    DURABILITY_FINAL,
+    DURABILITY_MODES,
+    BufferedCheckpointSaver,
+)
+from app.services.llm_router import build_llm_router
+from app.services.tools import build_search_tool, build_tool_node
+from app.services.context_window import ConversationState, build_context_window
+from app.services.resilience import StageTimeoutError
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class ForkError(Exception):
+    """Raised when a message cannot be edited or regenerated"""
+
+
+class MessageNotFoundError(ForkError):
+    """Raised when the target message is not on the thread's current branch"""
+
+
 class LangGraphAgent:
     def __init__(self):
         self.llm = None
         self.tavily = None
+        self.tool_node = None
+        self.context_window = None
         self.agent = None
-        self._initialize_components()
+        # Components the compiled graph was built from; a replaced component triggers a rebuild
+        self._agent_components: Tuple[Any, ...] = ()
+        # Warmup initializes from a worker thread while requests may arrive on the event loop
+        self._init_lock = threading.Lock()
+
+    def initialize(self):
+        """
+        Build the LLM, tools and context window if not done yet. Runs on first
+        use rather than at import, so a worker does not import the provider
+        and search integrations before it serves anything. Components that
+        were already set (e.g. replaced by a benchmark) are kept.
+        """
+        if self.llm is not None and self.tool_node is not None and self.context_window is not None:
+            return
+        with self._init_lock:
+            self._initialize_components()
 
     def _initialize_components(self):
         """Initialize LLM, tools, and agent"""
         try:
-            # Initialize LLM
-            self.llm = ChatGroq(
-                api_key=SecretStr(settings.GROQ_API_KEY),
-                model="qwen/qwen3-32b",
-                temperature=0.1,
-            )
+            # Initialize LLM (routes across the configured providers with failover)
+            if self.llm is None:
+                self.llm = build_llm_router()
 
-            # Initialize Tavily search tool
-            self.tavily = TavilySearchResults(
-                api_key=SecretStr(settings.TAVILY_API_KEY),
-                max_results=3
-            )
+            # Initialize Tavily search tool (with per-call deadline and circuit breaker)
+            if self.tool_node is None:
+                if self.tavily is None:
+                    self.tavily = build_search_tool()
+                # Several tool calls in one step run concurrently, results kept in call order
+                self.tool_node = build_tool_node([self.tavily])
+
+            # Bound the prompt: recent turns verbatim, older turns folded into a running summary
+            if self.context_window is None:
+                self.context_window = build_context_window(self.llm, self.llm.model_names())
 
             logger.info("LangGraph agent components initialized successfully")
 
@@ -47,40 +86,122 @@ class LangGraphAgent:
             logger.error(f"Failed to initialize LangGraph agent: {e}")
             raise
 
-    def _create_agent(self, memory: AsyncPostgresSaver):
-        """Create the LangGraph agent with checkpointer"""
+    def compile_graph(self):
+        """
+        The compiled agent graph, without a checkpointer. Compiled once (and
+        again only if a component is replaced); turns copy it with their own
+        checkpointer, which is much cheaper than compiling per turn.
+        """
+        self.initialize()
         if self.llm is None:
             raise ValueError("LLM is not initialized")
-        if self.tavily is None:
-            raise ValueError("Tavily search tool is not initialized")
-        return create_react_agent(
-            model=self.llm,
-            tools=[self.tavily],
-            checkpointer=memory
-        )
+        if self.tool_node is None:
+            raise ValueError("Tool node is not initialized")
+        if self.context_window is None:
+            raise ValueError("Context window is not initialized")
+        components = (self.llm, self.tool_node, self.context_window)
+        if self.agent is None or any(a is not b for a, b in zip(components, self._agent_components)):
+            self.agent = create_react_agent(
+                model=self.llm,
+                tools=self.tool_node,
+                # One tools task per step (not one per call) so ParallelToolNode can bound the step
+                version="v1",
+                state_schema=ConversationState,
+                pre_model_hook=self.context_window.pre_model_hook
+            )
+            self._agent_components = components
+        return self.agent
+
+    def _create_agent(self, memory: BaseCheckpointSaver):
+        """Create the LangGraph agent with checkpointer"""
+        return self.compile_graph().copy(update={"checkpointer": memory})
+
     async def process_message(
             self,
-            message: str,
-            thread_id: str
+            message: Optional[str],
+            thread_id: str,
+            durability: Optional[str] = None,
+            checkpoint_id: Optional[str] = None,
+            message_id: Optional[str] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
-        Process a user message and yield streaming responses
+        Process a user message and yield streaming responses.
+
+        ``durability`` (default CHECKPOINT_DURABILITY) controls when the turn's
+        checkpoints reach the database: ``step`` after every step, ``batched``
+        in one transaction at turn end, ``final`` only the end state.
+        ``checkpoint_id`` runs the turn from that checkpoint instead of the
+        latest one, forking a new branch (see ``resolve_fork``); ``message_id``
+        sets the id of the user message (kept when regenerating). A ``message``
+        of None sends no input and resumes the turn saved in the latest checkpoint.
         """
+        buffer: Optional[BufferedCheckpointSaver] = None
+        AGENT_RUNS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        # Not made the current span: this is a generator, so the contextvar would leak to the consumer
+        turn_span = start_span("agent_turn", **{"chat.thread_id": thread_id})
         try:
+            durability = durability or settings.CHECKPOINT_DURABILITY
+            if durability not in DURABILITY_MODES:
+                raise ValueError(f"Unknown checkpoint durability mode: {durability}")
+
             memory = db_manager.get_memory_checkpointer()
+            if durability == DURABILITY_BATCHED:
+                memory = buffer = BufferedCheckpointSaver(memory)
 
             # Create agent with current memory instance
             agent = self._create_agent(memory)
 
-            # Stream the agent's response
-            async for chunk in agent.astream(
-                    {"messages": [HumanMessage(content=message)]},
-                    {"configurable": {"thread_id": thread_id}}
-            ):
-                yield chunk
+            configurable = {"thread_id": thread_id}
+            if checkpoint_id is not None:
+                configurable["checkpoint_id"] = checkpoint_id
+            config: Dict[str, Any] = {"configurable": configurable}
+            if turn_span is not None:
+                turn_span.set(**{"chat.durability": durability, "chat.fork": checkpoint_id is not None})
+                config["callbacks"] = [TracingCallbackHandler(turn_span)]
+
+            # Stream the agent's response; the whole turn shares one deadline
+            deadline = asyncio.get_running_loop().time() + settings.TURN_TIMEOUT_SECONDS
+            agent_input = None if message is None else {"messages": [HumanMessage(content=message, id=message_id)]}
+            stream = agent.astream(
+                    agent_input,
+                    config,
+                    checkpoint_during=durability != DURABILITY_FINAL
+            )
+            try:
+                while True:
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            chunk = await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    except StageTimeoutError:
+                        raise
+                    except TimeoutError:
+                        raise StageTimeoutError("Turn", settings.TURN_TIMEOUT_SECONDS) from None
+                    yield chunk
+                if buffer is not None:
+                    # Let a failed flush reach the caller: the turn was not saved
+                    await buffer.flush()
+            finally:
+                await stream.aclose()
+                if buffer is not None and buffer.pending:
+                    # The turn ended early (error, deadline, client gone): keep the steps that completed
+                    try:
+                        await asyncio.shield(buffer.flush())
+                    except Exception as flush_error:
+                        logger.error(f"Failed to flush checkpoints for thread {thread_id}: {flush_error}")
 
         except Exception as e:
+            if turn_span is not None:
+                turn_span.record_error(e)
             yield {"error": True, "message": str(e)}
+        finally:
+            AGENT_RUNS_IN_FLIGHT.dec()
+            observe_stage("agent_turn", time.perf_counter() - started)
+            if turn_span is not None:
+                turn_span.end()
+
     def extract_response_info(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
         """
         Extract response information from LangGraph chunk
@@ -139,122 +260,67 @@ class LangGraphAgent:
     #             "message": f"Failed to process message: {str(e)}"
     #         }
 
-    async def get_chat_history(self, thread_id: str) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _is_visible(message: BaseMessage) -> bool:
+        """Whether a message is shown to the user (human messages and final AI text, not tool traffic)"""
+        if isinstance(message, HumanMessage):
+            return True
+        if not isinstance(message, AIMessage):
+            return False
+        if message.tool_calls:
+            return False
+        if message.additional_kwargs and (
+                message.additional_kwargs.get('tool_calls') or message.additional_kwargs.get('function_call')):
+            return False
+        return bool(message.content) and not (isinstance(message.content, str) and not message.content.strip())
+
+    @staticmethod
+    def _format_message(message: BaseMessage) -> Dict[str, Any]:
+        timestamp = message.additional_kwargs.get("timestamp") if message.additional_kwargs else None
+        return {
+            "role": "user" if isinstance(message, HumanMessage) else "assistant",
+            "content": message.content,
+            "message_id": message.id or str(uuid.uuid4()),
+            "timestamp": timestamp
+        }
+
+    @staticmethod
+    def _checkpoint_messages(checkpoint_tuple: Optional[CheckpointTuple]) -> List[BaseMessage]:
+        if checkpoint_tuple is None:
+            return []
+        return checkpoint_tuple.checkpoint["channel_values"].get("messages", [])
+
+    async def get_chat_history(self, thread_id: str, include_branches: bool = False) -> List[Dict[str, Any]]:
         """
         Get chat history for a specific thread - returns only human messages and AI responses
-        (excludes tool calls and system messages for frontend display)
+        (excludes tool calls and system messages for frontend display).
+
+        The history is the current branch: the messages of the latest checkpoint.
+        With ``include_branches``, each message also lists the versions that
+        edits and regenerations replaced at the same position.
         """
         try:
             memory = db_manager.get_memory_checkpointer()
+            config = {"configurable": {"thread_id": thread_id}}
 
-            # Get all checkpoints for this thread
-            checkpoints = []
             try:
-                async for checkpoint in memory.alist(
-                        {"configurable": {"thread_id": thread_id}}):  # type: ignore[arg-type]
-                    checkpoints.append(checkpoint)
-            except Exception as list_error:
-                logger.warning(f"Error listing checkpoints for thread {thread_id}: {list_error}")
+                latest = await memory.aget_tuple(config)  # type: ignore[arg-type]
+            except Exception as get_error:
+                logger.warning(f"Error loading latest checkpoint for thread {thread_id}: {get_error}")
                 return []
 
-            if not checkpoints:
-                logger.info(f"No checkpoints found for thread {thread_id} - returning empty history")
+            visible = [m for m in self._checkpoint_messages(latest) if self._is_visible(m)]
+            if not visible:
+                logger.info(f"No messages found for thread {thread_id} - returning empty history")
                 return []
 
-            processed_messages = []
-            seen_message_ids = set()  # To avoid duplicates
-
-            for checkpoint in checkpoints:
-                # Handle CheckpointTuple structure
-                try:
-                    # CheckpointTuple has attributes: checkpoint, metadata, config, parent_config
-                    if hasattr(checkpoint, 'checkpoint'):
-                        checkpoint_data = checkpoint.checkpoint
-                    else:
-                        checkpoint_data = checkpoint
-
-                    # Try different possible paths for messages
-                    messages = None
-                    if hasattr(checkpoint_data, 'channel_values') and checkpoint_data.channel_values:
-                        messages = checkpoint_data.channel_values.get("messages", [])
-                    elif isinstance(checkpoint_data, dict):
-                        if "channel_values" in checkpoint_data:
-                            messages = checkpoint_data["channel_values"].get("messages", [])
-                        elif "messages" in checkpoint_data:
-                            messages = checkpoint_data["messages"]
-                        elif "values" in checkpoint_data:
-                            messages = checkpoint_data["values"].get("messages", [])
-
-                    if not messages:
-                        continue
-                except Exception as checkpoint_error:
-                    logger.warning(f"Error processing checkpoint: {checkpoint_error}")
-                    continue
-
-                for message in messages:
-                    # Skip tool calls and system messages - only process HumanMessage and AIMessage
-                    if not isinstance(message, (HumanMessage, AIMessage)):
-                        continue
-
-                    # Additional check to filter out AI messages that are tool calls
-                    if isinstance(message, AIMessage):
-                        # Check if this is a tool call message by looking for tool_calls in content or additional_kwargs
-                        if hasattr(message, 'tool_calls') and message.tool_calls:
-                            continue
-                        if hasattr(message, 'additional_kwargs') and message.additional_kwargs:
-                            if message.additional_kwargs.get('tool_calls') or message.additional_kwargs.get(
-                                    'function_call'):
-                                continue
-                        # Skip if content is empty (might be a tool call with no text response)
-                        if not message.content or (isinstance(message.content, str) and not message.content.strip()):
-                            continue
-
-                    # Generate a unique identifier for deduplication
-                    message_content = getattr(message, 'content', '') if hasattr(message, 'content') else str(message)
-                    message_type = type(message).__name__
-                    message_key = f"{message_type}:{hash(str(message_content))}"
-
-                    if message_key in seen_message_ids:
-                        continue
-                    seen_message_ids.add(message_key)
-
-                    # Get the timestamp from various possible sources
-                    timestamp = None
-                    if hasattr(message, "additional_kwargs") and message.additional_kwargs:
-                        timestamp = message.additional_kwargs.get("timestamp")
-
-                    # Fallback to checkpoint timestamp
-                    if not timestamp:
-                        if hasattr(checkpoint, 'metadata') and checkpoint.metadata:
-                            timestamp = checkpoint.metadata.get('ts') or checkpoint.metadata.get('created_at')
-                        elif isinstance(checkpoint_data, dict):
-                            timestamp = checkpoint_data.get('ts') or checkpoint_data.get('created_at')
-
-                    # Get message ID
-                    message_id = None
-                    if hasattr(message, "id") and message.id:
-                        message_id = message.id
-                    else:
-                        message_id = str(uuid.uuid4())
-
-                    if isinstance(message, HumanMessage):
-                        processed_messages.append({
-                            "role": "user",
-                            "content": message.content,
-                            "message_id": message_id,
-                            "timestamp": timestamp
-                        })
-                    elif isinstance(message, AIMessage):
-                        processed_messages.append({
-                            "role": "assistant",
-                            "content": message.content,
-                            "message_id": message_id,
-                            "timestamp": timestamp
-                        })
-
-            # Sort messages by timestamp to maintain chronological order
-            # Handle None timestamps by putting them at the beginning
-            processed_messages.sort(key=lambda x: x["timestamp"] if x["timestamp"] is not None else 0)
+            processed_messages = [self._format_message(message) for message in visible]
+            if include_branches:
+                alternatives = await self._branch_alternatives(memory, config, [m.id for m in visible])
+                for position, processed in enumerate(processed_messages):
+                    processed["alternatives"] = [
+                        self._format_message(message) for message in alternatives.get(position, [])
+                    ]
 
             return processed_messages
 
@@ -262,6 +328,100 @@ class LangGraphAgent:
             logger.error(f"Error getting chat history for thread {thread_id}: {e}")
             return []
 
+    async def _branch_alternatives(
+            self,
+            memory: BaseCheckpointSaver,
+            config: Dict[str, Any],
+            current_ids: List[Optional[str]]
+    ) -> Dict[int, List[BaseMessage]]:
+        """
+        Messages from other branches keyed by the position where the branch
+        leaves the current one (an edited prompt or a regenerated answer).
+        """
+        alternatives: Dict[int, Dict[str, BaseMessage]] = {}
+        async for checkpoint_tuple in memory.alist(config):  # type: ignore[arg-type]
+            visible = [m for m in self._checkpoint_messages(checkpoint_tuple) if self._is_visible(m)]
+            for position, message in enumerate(visible):
+                if position >= len(current_ids):
+                    break
+                if message.id != current_ids[position]:
+                    alternatives.setdefault(position, {}).setdefault(message.id or "", message)
+                    break
+        return {position: list(messages.values()) for position, messages in alternatives.items()}
+
+    async def resolve_fork(
+            self,
+            thread_id: str,
+            message_id: str,
+            new_content: Optional[str] = None
+    ) -> Tuple[str, str, Optional[str]]:
+        """
+        Find where to re-run the turn that produced ``message_id``.
+
+        For a user message (edit) or an assistant message (regenerate), returns
+        the id of the newest checkpoint on the current branch that holds exactly
+        the messages before that turn's user message, the user message content
+        to send from there (``new_content`` for edits) and, when regenerating,
+        the id of that user message so both branches share it. Running the turn
+        from that checkpoint forks a new branch, which becomes the latest.
+        """
+        memory = db_manager.get_memory_checkpointer()
+        checkpoint_tuple = await memory.aget_tuple({"configurable": {"thread_id": thread_id}})  # type: ignore[arg-type]
+        messages = self._checkpoint_messages(checkpoint_tuple)
+
+        index = next((i for i, m in enumerate(messages) if m.id == message_id), None)
+        if index is None:
+            raise MessageNotFoundError(f"Message {message_id} is not on the current branch of thread {thread_id}")
+        target = messages[index]
+        if isinstance(target, HumanMessage):
+            turn_start = index
+        elif isinstance(target, AIMessage) and new_content is None:
+            turn_start = next((i for i in range(index, -1, -1) if isinstance(messages[i], HumanMessage)), -1)
+            if turn_start < 0:
+                raise ForkError(f"Message {message_id} has no user message to regenerate from")
+        else:
+            raise ForkError("Only user messages can be edited and only assistant messages regenerated")
+        content = new_content if new_content is not None else str(messages[turn_start].content)
+        human_id = messages[turn_start].id if new_content is None else None
+
+        # Walk the current branch back to the state just before the turn started
+        fallback: Optional[str] = None
+        while checkpoint_tuple is not None:
+            count = len(self._checkpoint_messages(checkpoint_tuple))
+            if count < turn_start:
+                break
+            if count == turn_start:
+                if checkpoint_tuple.metadata.get("source") != "input":
+                    return checkpoint_tuple.config["configurable"]["checkpoint_id"], content, human_id
+                # An input checkpoint also holds the previous state; use it if nothing older does
+                fallback = fallback or checkpoint_tuple.config["configurable"]["checkpoint_id"]
+            checkpoint_tuple = await self._previous_checkpoint(memory, checkpoint_tuple)
+
+        if fallback is not None:
+            return fallback, content, human_id
+        raise ForkError(f"No stored checkpoint precedes message {message_id}; it cannot be edited or regenerated")
+
+    async def has_message(self, thread_id: str, message_id: str) -> bool:
+        """Whether the current branch of the thread contains ``message_id``"""
+        memory = db_manager.get_memory_checkpointer()
+        checkpoint_tuple = await memory.aget_tuple({"configurable": {"thread_id": thread_id}})  # type: ignore[arg-type]
+        return any(m.id == message_id for m in self._checkpoint_messages(checkpoint_tuple))
+
+    @staticmethod
+    async def _previous_checkpoint(
+            memory: BaseCheckpointSaver,
+            checkpoint_tuple: CheckpointTuple
+    ) -> Optional[CheckpointTuple]:
+        if checkpoint_tuple.parent_config is not None:
+            parent = await memory.aget_tuple(checkpoint_tuple.parent_config)
+            if parent is not None:
+                return parent
+        # With final-only durability the parent step was never stored; take the next older checkpoint
+        thread_config = {"configurable": {"thread_id": checkpoint_tuple.config["configurable"]["thread_id"]}}
+        async for older in memory.alist(thread_config, before=checkpoint_tuple.config, limit=1):  # type: ignore[arg-type]
+            return older
+        return None
+
     async def delete_chat_history(self, thread_id: str) -> Dict[str, Any]:
         """
         Deletes all chat history for a specific thread_id.
@@ -345,15 +505,14 @@ class LangGraphAgent:
 
         if "agent" in chunk:
             for message in chunk["agent"]["messages"]:
-                # Check for tool calls
-                if hasattr(message, 'additional_kwargs') and "tool_calls" in message.additional_kwargs:
+                # Check for tool calls (parsed tool_calls are provider-neutral, unlike additional_kwargs)
+                if getattr(message, 'tool_calls', None):
                     result["is_tool_call"] = True
-                    tool_calls = message.additional_kwargs["tool_calls"]
 
-                    for tool_call in tool_calls:
+                    for tool_call in message.tool_calls:
                         result["tool_calls"].append({
-                            "tool_name": tool_call["function"]["name"],
-                            "query": eval(tool_call["function"]["arguments"]).get("query", "")
+                            "tool_name": tool_call["name"],
+                            "query": tool_call["args"].get("query", "")
                         })
                 else:
                     # Final response
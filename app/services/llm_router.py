@@ -0,0 +1,445 @@
+# ================================
+# FILE: app/services/llm_router.py
+# ================================
+
+"""
+Multi-provider chat model routing.
+
+``LLMRouter`` is a chat model that fronts several provider models. It keeps a
+rolling window of time-to-first-token and outcomes per provider, tries the
+healthiest provider first, fails over to the next one on errors and can
+optionally hedge: once a call runs past the primary's p95 TTFT, the same
+request is sent to the next provider and whichever answers first wins while
+the other is cancelled.
+
+Any ``BaseChatModel`` can be a provider, so routing, failover and hedging can
+be exercised locally with fakes such as ``GenericFakeChatModel``.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, SecretStr
+
+from app.core.config import settings
+from app.core.metrics import observe_stage, record_llm_usage
+from app.core.tracing import annotate_run
+from app.services.resilience import CircuitBreaker, CircuitOpenError, call_with_breaker, circuit_breakers
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Rolling TTFT and success/failure window for one provider"""
+
+    def __init__(self, window: int):
+        self.ttft: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+
+    def record_success(self, ttft: float):
+        self.ttft.append(ttft)
+        self.outcomes.append(True)
+
+    def record_failure(self):
+        self.outcomes.append(False)
+
+    @property
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def ttft_quantile(self, q: float) -> Optional[float]:
+        if not self.ttft:
+            return None
+        ordered = sorted(self.ttft)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "error_rate": round(self.error_rate, 3),
+            "p50_ttft_seconds": self.ttft_quantile(0.5),
+            "p95_ttft_seconds": self.ttft_quantile(0.95),
+        }
+
+
+class LLMProvider:
+    """A named provider model, its rolling statistics and its circuit breaker"""
+
+    def __init__(
+            self,
+            name: str,
+            model: BaseChatModel,
+            window: int = 100,
+            breaker: Optional[CircuitBreaker] = None
+    ):
+        self.name = name
+        self.model = model
+        self.stats = ProviderStats(window)
+        self.breaker = breaker or circuit_breakers.get(f"llm:{name}")
+
+
+class LLMRouter(BaseChatModel):
+    """Chat model that routes each call across ``providers`` (in priority order)"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    providers: List[Any]
+    # Per-provider runnables actually called (tool-bound copies after bind_tools)
+    bound: Optional[List[Any]] = None
+    hedge: bool = False
+    hedge_min_samples: int = 20
+    min_samples: int = 5
+    max_error_rate: float = 0.5
+    # Deadline for one provider call (time to the full answer, or to the first chunk when streaming)
+    call_timeout: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-router"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "LLMRouter":
+        """Bind tools on every provider; providers without tool support are used as-is"""
+        bound = []
+        for provider in self.providers:
+            try:
+                bound.append(provider.model.bind_tools(tools, **kwargs))
+            except NotImplementedError:
+                logger.warning(f"LLM provider {provider.name} does not support tool binding")
+                bound.append(provider.model)
+        return self.model_copy(update={"bound": bound})
+
+    def model_names(self) -> List[str]:
+        """Model identifiers of all providers"""
+        names = []
+        for provider in self.providers:
+            name = getattr(provider.model, "model_name", None) or getattr(provider.model, "model", None)
+            names.append(str(name or provider.name))
+        return names
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider statistics, for health and metrics reporting"""
+        return {provider.name: provider.stats.snapshot() for provider in self.providers}
+
+    async def preconnect(self) -> List[str]:
+        """
+        Open a keep-alive connection to each provider whose SDK client can list
+        models (Groq and other OpenAI-style clients), so the first chat call
+        does not pay for DNS and TLS. Failures are logged and do not count
+        against the provider. Returns the names of the providers connected.
+        """
+        connected = []
+        for provider in self.providers:
+            client = getattr(getattr(provider.model, "async_client", None), "_client", None)
+            models = getattr(client, "models", None)
+            if models is None or not hasattr(models, "list"):
+                continue
+            try:
+                await models.list()
+                connected.append(provider.name)
+            except Exception as e:
+                logger.warning(f"Could not preconnect to LLM provider {provider.name}: {e}")
+        return connected
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def _runnable(self, index: int):
+        return self.bound[index] if self.bound is not None else self.providers[index].model
+
+    def _is_healthy(self, provider: LLMProvider) -> bool:
+        stats = provider.stats
+        return stats.samples < self.min_samples or stats.error_rate <= self.max_error_rate
+
+    def _ordered(self) -> List[int]:
+        """
+        Provider indexes to try: healthy ones in priority order, then the rest.
+        Providers with an open circuit are skipped; if that leaves none, fail fast.
+        """
+        available = [i for i, p in enumerate(self.providers) if p.breaker.is_available()]
+        if not available and self.providers:
+            raise CircuitOpenError("LLM", min(p.breaker.reset_timeout for p in self.providers))
+        healthy = [i for i in available if self._is_healthy(self.providers[i])]
+        unhealthy = [i for i in available if not self._is_healthy(self.providers[i])]
+        return healthy + unhealthy
+
+    def _hedge_delay(self, index: int) -> Optional[float]:
+        """Seconds to wait on ``index`` before hedging, or None when hedging does not apply"""
+        if not self.hedge:
+            return None
+        stats = self.providers[index].stats
+        if len(stats.ttft) < self.hedge_min_samples:
+            return None
+        return stats.ttft_quantile(0.95)
+
+    async def _race(self, calls: List[Tuple[int, Any]], hedge_delay: Optional[float]):
+        """
+        Run ``calls[0]``; if it has not finished after ``hedge_delay`` seconds, also
+        run ``calls[1]``. Return ``(index, result)`` of the first success and cancel
+        the loser. Raises the last error if every started call fails.
+        """
+        primary_index, primary = calls[0]
+        tasks: Dict[asyncio.Task, int] = {asyncio.ensure_future(primary): primary_index}
+        pending_hedge = calls[1] if len(calls) > 1 else None
+        if pending_hedge is None or hedge_delay is None:
+            if pending_hedge is not None:
+                pending_hedge[1].close()
+            pending_hedge = None
+
+        last_error: Optional[BaseException] = None
+        try:
+            while tasks:
+                timeout = hedge_delay if pending_hedge is not None else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedge_index, hedge_call = pending_hedge  # type: ignore[misc]
+                    logger.info(
+                        f"Hedging LLM call to {self.providers[hedge_index].name} after "
+                        f"{hedge_delay:.2f}s without an answer from {self.providers[primary_index].name}"
+                    )
+                    tasks[asyncio.ensure_future(hedge_call)] = hedge_index
+                    pending_hedge = None
+                    continue
+
+                for task in done:
+                    index = tasks.pop(task)
+                    if task.exception() is None:
+                        return index, task.result()
+                    last_error = task.exception()
+                    logger.warning(f"LLM provider {self.providers[index].name} failed: {last_error}")
+
+                if pending_hedge is not None and not tasks:
+                    # The primary failed before the hedge deadline; go straight to the next provider
+                    hedge_index, hedge_call = pending_hedge
+                    tasks[asyncio.ensure_future(hedge_call)] = hedge_index
+                    pending_hedge = None
+
+            raise last_error  # type: ignore[misc]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # A second call finished in the same tick as the winner; discard its open stream
+                    result = task.result()
+                    if isinstance(result, tuple) and hasattr(result[0], "aclose"):
+                        asyncio.ensure_future(result[0].aclose())
+            if pending_hedge is not None:
+                pending_hedge[1].close()
+
+    async def _invoke_provider(self, index: int, messages: List[BaseMessage], stop, **kwargs) -> BaseMessage:
+        provider = self.providers[index]
+        stats = provider.stats
+        started = time.monotonic()
+        try:
+            message = await call_with_breaker(
+                provider.breaker,
+                self._runnable(index).ainvoke(messages, stop=stop, **kwargs),
+                self.call_timeout,
+                f"LLM call to {provider.name}"
+            )
+        except (asyncio.CancelledError, CircuitOpenError):
+            raise
+        except Exception:
+            stats.record_failure()
+            raise
+        elapsed = time.monotonic() - started
+        stats.record_success(elapsed)
+        observe_stage("llm_call", elapsed)
+        record_llm_usage(provider.name, message)
+        return message
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        order = self._ordered()
+        last_error: Optional[BaseException] = None
+
+        position = 0
+        while position < len(order):
+            hedge_delay = self._hedge_delay(order[position])
+            candidates = order[position:position + (2 if hedge_delay is not None else 1)]
+            calls = [(i, self._invoke_provider(i, messages, stop, **kwargs)) for i in candidates]
+            try:
+                index, message = await self._race(calls, hedge_delay)
+                if index != order[0]:
+                    logger.info(f"LLM call served by fallback provider {self.providers[index].name}")
+                annotate_run(run_manager, **{"llm.provider": self.providers[index].name})
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except Exception as e:
+                last_error = e
+                position += len(candidates)
+
+        raise last_error or RuntimeError("No LLM providers configured")
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        last_error: Optional[BaseException] = None
+        for index in self._ordered():
+            provider = self.providers[index]
+            started = time.monotonic()
+            try:
+                provider.breaker.before_call()
+            except CircuitOpenError as e:
+                last_error = e
+                continue
+            try:
+                message = self._runnable(index).invoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                provider.stats.record_failure()
+                provider.breaker.record_failure()
+                last_error = e
+                logger.warning(f"LLM provider {provider.name} failed: {e}")
+                continue
+            provider.stats.record_success(time.monotonic() - started)
+            provider.breaker.record_success()
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        raise last_error or RuntimeError("No LLM providers configured")
+
+    async def _open_stream(self, index: int, messages: List[BaseMessage], stop, **kwargs):
+        """Start streaming from a provider and wait for its first chunk"""
+        provider = self.providers[index]
+        stats = provider.stats
+        started = time.monotonic()
+        stream = self._runnable(index).astream(messages, stop=stop, **kwargs).__aiter__()
+
+        async def first_chunk():
+            return await stream.__anext__()
+
+        try:
+            first = await call_with_breaker(
+                provider.breaker, first_chunk(), self.call_timeout, f"LLM call to {provider.name}"
+            )
+        except (asyncio.CancelledError, CircuitOpenError):
+            await stream.aclose()
+            raise
+        except Exception:
+            stats.record_failure()
+            await stream.aclose()
+            raise
+        ttft = time.monotonic() - started
+        stats.record_success(ttft)
+        observe_stage("llm_ttft", ttft)
+        return stream, first
+
+    async def _astream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        # Failover and hedging only apply up to the first chunk; after that we are committed.
+        order = self._ordered()
+        last_error: Optional[BaseException] = None
+        opened = None
+        served_by = None
+        started = time.monotonic()
+
+        position = 0
+        while position < len(order) and opened is None:
+            hedge_delay = self._hedge_delay(order[position])
+            candidates = order[position:position + (2 if hedge_delay is not None else 1)]
+            calls = [(i, self._open_stream(i, messages, stop, **kwargs)) for i in candidates]
+            try:
+                served_by, opened = await self._race(calls, hedge_delay)
+            except Exception as e:
+                last_error = e
+                position += len(candidates)
+
+        if opened is None:
+            raise last_error or RuntimeError("No LLM providers configured")
+
+        stream, chunk = opened
+        provider_name = self.providers[served_by].name  # type: ignore[index]
+        annotate_run(run_manager, **{"llm.provider": provider_name})
+        try:
+            while True:
+                message = chunk if isinstance(chunk, AIMessageChunk) else AIMessageChunk(content=str(chunk))
+                # Streamed usage arrives as per-chunk deltas (usually all on the last chunk)
+                record_llm_usage(provider_name, message)
+                generation = ChatGenerationChunk(message=message)
+                if run_manager:
+                    await run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+        finally:
+            await stream.aclose()
+            observe_stage("llm_call", time.monotonic() - started)
+
+
+def build_llm_router() -> LLMRouter:
+    """Build the router from LLM_PROVIDERS, skipping providers without credentials"""
+    names = []
+    for name in (name.strip() for name in settings.LLM_PROVIDERS.split(",")):
+        if not name:
+            continue
+        if name not in ("groq", "google"):
+            raise ValueError(f"Unknown LLM provider: {name}")
+        if name == "google" and not settings.GOOGLE_API_KEY:
+            logger.warning("Skipping LLM provider 'google': GOOGLE_API_KEY is not set")
+            continue
+        names.append(name)
+
+    # With a fallback configured, failing over beats retrying the same backend; decided on the
+    # providers actually built, so a lone provider keeps its retries
+    max_retries = 0 if len(names) > 1 else 2
+    providers: List[LLMProvider] = []
+
+    for name in names:
+        if name == "groq":
+            from langchain_groq import ChatGroq
+
+            model = ChatGroq(
+                api_key=SecretStr(settings.GROQ_API_KEY),
+                model=settings.GROQ_MODEL,
+                temperature=settings.LLM_TEMPERATURE,
+                max_retries=max_retries,
+            )
+        else:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            model = ChatGoogleGenerativeAI(
+                google_api_key=SecretStr(settings.GOOGLE_API_KEY),
+                model=settings.GOOGLE_CHAT_MODEL,
+                temperature=settings.LLM_TEMPERATURE,
+                max_retries=max_retries,
+            )
+        providers.append(LLMProvider(name, model, window=settings.LLM_ROUTER_WINDOW))
+
+    if not providers:
+        raise ValueError("No LLM providers configured (check LLM_PROVIDERS)")
+
+    logger.info(f"LLM router providers: {[p.name for p in providers]} (hedging={settings.LLM_HEDGE_ENABLED})")
+    return LLMRouter(
+        providers=providers,
+        hedge=settings.LLM_HEDGE_ENABLED,
+        hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+        max_error_rate=settings.LLM_ROUTER_MAX_ERROR_RATE,
+        call_timeout=settings.LLM_CALL_TIMEOUT_SECONDS,
+    )
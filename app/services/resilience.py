@@ -0,0 +1,161 @@
+# ================================
+# FILE: app/services/resilience.py
+# ================================
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class StageTimeoutError(TimeoutError):
+    """Raised when a stage (LLM call, tool call, whole turn) exceeds its deadline"""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} timed out after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> calls pass; ``failure_threshold`` failures in a row open the circuit
+    open      -> calls fail fast with CircuitOpenError for ``reset_timeout`` seconds
+    half_open -> one probe call is let through; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def is_available(self) -> bool:
+        """Whether a call would currently be let through (does not change state)"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not self._probe_in_flight
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit breaker {self.name} half-open, probing")
+        if self._probe_in_flight:
+            raise CircuitOpenError(self.name, self.reset_timeout)
+        self._probe_in_flight = True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker {self.name} closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"Circuit breaker {self.name} opened after {self.consecutive_failures} consecutive failures"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Give back a half-open probe slot when the call was cancelled without an outcome"""
+        self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        retry_after = None
+        if self.state == self.OPEN:
+            retry_after = max(0.0, round(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": retry_after,
+        }
+
+
+class CircuitBreakerRegistry:
+    """Named breakers (``llm:<provider>``, ``tool:<name>``) created on first use"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def any_open(self) -> bool:
+        return any(b.state != CircuitBreaker.CLOSED for b in self._breakers.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.snapshot() for name, breaker in self._breakers.items()}
+
+
+async def call_with_breaker(breaker: CircuitBreaker, coro, timeout: Optional[float], stage: str):
+    """
+    Await ``coro`` under ``breaker`` and a ``timeout`` second deadline.
+    Timeouts and errors count as failures; cancellation counts as neither.
+    """
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        coro.close()
+        raise
+    try:
+        async with asyncio.timeout(timeout):
+            result = await coro
+    except TimeoutError:
+        breaker.record_failure()
+        raise StageTimeoutError(stage, timeout) from None  # type: ignore[arg-type]
+    except asyncio.CancelledError:
+        breaker.release_probe()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
+
+
+# Global circuit breaker registry
+circuit_breakers = CircuitBreakerRegistry(
+    failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.BREAKER_RESET_SECONDS,
+)
@@ -0,0 +1,63 @@
+# ================================
+# FILE: app/services/search_tool.py
+# ================================
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_community.utilities.tavily_search import TAVILY_API_URL
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun
+
+from app.core.config import settings
+from app.services.tool_payloads import store_tool_payload
+from app.services.tools import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+async def preconnect_search() -> bool:
+    """Open a keep-alive connection to the Tavily API on the shared tool HTTP client"""
+    try:
+        await get_http_client().head(TAVILY_API_URL)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not preconnect to the search API: {e}")
+        return False
+
+
+class SearchTool(TavilySearchResults):
+    """
+    Tavily search that lets API errors propagate instead of returning them as
+    a successful result, so timeouts and failures reach the circuit breaker.
+    Requests go through the shared HTTP client rather than a new session per
+    call. The raw API response is moved to the tool payload store and only
+    its digest is kept as the message artifact.
+    """
+
+    async def _raw_results(self, query: str) -> Dict[str, Any]:
+        response = await get_http_client().post(f"{TAVILY_API_URL}/search", json={
+            "api_key": self.api_wrapper.tavily_api_key.get_secret_value(),
+            "query": query,
+            "max_results": self.max_results,
+            "search_depth": self.search_depth,
+            "include_domains": self.include_domains,
+            "exclude_domains": self.exclude_domains,
+            "include_answer": self.include_answer,
+            "include_raw_content": self.include_raw_content,
+            "include_images": self.include_images,
+        })
+        if response.status_code != 200:
+            raise Exception(f"Error {response.status_code}: {response.reason_phrase}")
+        return response.json()
+
+    async def _arun(
+            self,
+            query: str,
+            run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[Union[List[Dict[str, str]], str], Dict]:
+        raw_results = await self._raw_results(query)
+        content = self.api_wrapper.clean_results(raw_results["results"])
+        if settings.TOOL_PAYLOAD_COMPACTION:
+            return content, await store_tool_payload(self.name, content, raw_results)
+        return content, raw_results
@@ -0,0 +1,118 @@
+# ================================
+# FILE: app/services/synthetic_stream.py
+# ================================
+
+"""
+Synthetic chat stream: the SSE frames of /chat/message/stream without an LLM,
+search backend or checkpoint, for load-testing the HTTP, SSE and proxy layers.
+
+Frames follow the production schema and order (``stream_start``, optional
+``tool_calls``, ``content_chunk`` of up to three words, ``final_response``,
+``stream_end``). The answer text and whether a tool call happens are derived
+from the thread and message, so the same request always streams the same
+content; the delays are drawn from the configured latency distribution.
+"""
+import asyncio
+import hashlib
+import math
+import random
+from dataclasses import dataclass, replace
+from typing import AsyncGenerator, Optional
+
+from app.core.config import settings
+from app.utils.sse import SSEEventEncoder
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+_WORDS = (
+    "the a of to in and is for on that with as by at from it this be are was were has have "
+    "weather forecast today city report market price team season data study energy growth rain "
+    "temperature news update recent source according expected week morning evening local global"
+).split()
+
+
+def sample_latency(distribution: str, mean: float, rng: random.Random) -> float:
+    """A delay with the given mean; lognormal has a long right tail like real LLM latencies"""
+    if mean <= 0:
+        return 0.0
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean)
+    if distribution == "lognormal":
+        sigma = 0.6
+        return rng.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+    raise ValueError(f"Unknown latency distribution: {distribution}")
+
+
+@dataclass(frozen=True)
+class SyntheticProfile:
+    """Latency and shape of a synthetic turn"""
+
+    distribution: str = "lognormal"
+    ttft: float = 0.4
+    chunk_delay: float = 0.03
+    response_words: int = 60
+    tool_call_ratio: float = 0.3
+    tool_latency: float = 0.5
+    seed: Optional[int] = None
+
+    def with_overrides(self, **overrides) -> "SyntheticProfile":
+        """Copy with the given fields replaced, ignoring overrides that are None"""
+        profile = replace(self, **{k: v for k, v in overrides.items() if v is not None})
+        if profile.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {profile.distribution}")
+        return profile
+
+
+def default_profile() -> SyntheticProfile:
+    """Profile from the SYNTHETIC_* settings"""
+    return SyntheticProfile().with_overrides(
+        distribution=settings.SYNTHETIC_LATENCY_DISTRIBUTION,
+        ttft=settings.SYNTHETIC_TTFT_SECONDS,
+        chunk_delay=settings.SYNTHETIC_CHUNK_DELAY_SECONDS,
+        response_words=settings.SYNTHETIC_RESPONSE_WORDS,
+        tool_call_ratio=settings.SYNTHETIC_TOOL_CALL_RATIO,
+        tool_latency=settings.SYNTHETIC_TOOL_LATENCY_SECONDS,
+    )
+
+
+def _content_rng(thread_id: str, message: str) -> random.Random:
+    digest = hashlib.sha256(f"{thread_id}\x00{message}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+async def synthetic_stream(
+        message: str,
+        thread_id: str,
+        profile: SyntheticProfile
+) -> AsyncGenerator[bytes, None]:
+    """Stream one synthetic turn as SSE frames"""
+    encoder = SSEEventEncoder(thread_id)
+    content = _content_rng(thread_id, message)
+    timing = random.Random(profile.seed)
+
+    yield encoder.encode("stream_start", queue_position=0)
+
+    tool_calls = None
+    if content.random() < profile.tool_call_ratio:
+        # The model decides to search, the tool runs, then the answer is generated
+        await asyncio.sleep(sample_latency(profile.distribution, profile.ttft, timing))
+        tool_calls = [{"tool_name": "tavily_search_results_json", "query": message[:200]}]
+        yield encoder.encode("tool_calls", tool_calls=tool_calls)
+        await asyncio.sleep(sample_latency(profile.distribution, profile.tool_latency, timing))
+
+    words = [content.choice(_WORDS) for _ in range(max(1, profile.response_words))]
+    words[0] = words[0].capitalize()
+    words[-1] += "."
+    await asyncio.sleep(sample_latency(profile.distribution, profile.ttft, timing))
+
+    for start in range(0, len(words), 3):
+        if start:
+            await asyncio.sleep(sample_latency(profile.distribution, profile.chunk_delay, timing))
+        yield encoder.content_chunk(" ".join(words[start:start + 3]))
+
+    yield encoder.encode("final_response", response=" ".join(words), tool_calls=tool_calls)
+    yield encoder.encode("stream_end")
@@ -0,0 +1,169 @@
+# ================================
+# FILE: app/services/thread_locks.py
+# ================================
+
+import asyncio
+import logging
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadBusyError(Exception):
+    """Raised when another turn is already running on the same thread"""
+
+
+class ThreadTurnLease:
+    """Exclusive right to run one turn on a thread; must be released exactly once"""
+
+    def __init__(
+            self,
+            locks: "ThreadTurnLocks",
+            thread_id: str,
+            lock: asyncio.Lock,
+            stack: Optional[AsyncExitStack] = None,
+            conn=None
+    ):
+        self.thread_id = thread_id
+        self._locks = locks
+        self._lock = lock
+        self._stack = stack
+        self._conn = conn
+        self._released = False
+
+    async def release(self):
+        if self._released:
+            return
+        self._released = True
+        try:
+            if self._stack is not None:
+                try:
+                    await self._conn.execute(
+                        "SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (self.thread_id,)
+                    )
+                except Exception as e:
+                    # A session lock lives as long as its connection; drop it rather than
+                    # hand a connection that may still hold the lock back to the pool
+                    logger.warning(f"Failed to release advisory lock for thread {self.thread_id}: {e}")
+                    await self._conn.close()
+                finally:
+                    await self._stack.aclose()
+        finally:
+            self._lock.release()
+            self._locks._unref(self.thread_id)
+
+
+class ThreadTurnLocks:
+    """
+    Serializes turns per thread_id so concurrent requests on one thread never
+    run the agent on the same checkpoint lineage at the same time.
+
+    Within a worker an asyncio.Lock per thread orders the turns. With the
+    ``postgres`` backend the holder additionally takes a session-level
+    advisory lock keyed on the thread id, which serializes turns across
+    workers; the connection holding it stays checked out for the turn.
+
+    ``policy`` decides what a second request does: ``queue`` waits up to
+    ``wait_timeout`` seconds for the running turn, ``reject`` fails at once.
+    """
+
+    def __init__(self, policy: str, wait_timeout: float, backend: str, poll_interval: float):
+        if policy not in ("queue", "reject"):
+            raise ValueError(f"Unknown thread turn policy: {policy}")
+        if backend not in ("local", "postgres"):
+            raise ValueError(f"Unknown thread lock backend: {backend}")
+        self.policy = policy
+        self.wait_timeout = wait_timeout
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._refs: Dict[str, int] = {}
+
+    async def acquire(self, thread_id: str) -> ThreadTurnLease:
+        """Wait for (or, with the reject policy, demand) exclusive use of the thread"""
+        lock = self._locks.get(thread_id)
+        if lock is None:
+            lock = self._locks[thread_id] = asyncio.Lock()
+        self._refs[thread_id] = self._refs.get(thread_id, 0) + 1
+
+        try:
+            if self.policy == "reject" and lock.locked():
+                raise ThreadBusyError("A response is already being generated for this thread.")
+
+            deadline = asyncio.get_running_loop().time() + self.wait_timeout
+            try:
+                async with asyncio.timeout_at(deadline):
+                    await lock.acquire()
+            except TimeoutError:
+                raise ThreadBusyError("Timed out waiting for the previous turn on this thread.") from None
+
+            if self.backend != "postgres":
+                return ThreadTurnLease(self, thread_id, lock)
+
+            try:
+                stack, conn = await self._acquire_advisory_lock(thread_id, deadline)
+            except BaseException:
+                lock.release()
+                raise
+            return ThreadTurnLease(self, thread_id, lock, stack, conn)
+
+        except BaseException:
+            self._unref(thread_id)
+            raise
+
+    @asynccontextmanager
+    async def hold(self, thread_id: str) -> AsyncIterator[ThreadTurnLease]:
+        """Context manager form of acquire/release"""
+        lease = await self.acquire(thread_id)
+        try:
+            yield lease
+        finally:
+            await lease.release()
+
+    def is_busy(self, thread_id: str) -> bool:
+        """Whether a turn is running on this thread in this worker"""
+        lock = self._locks.get(thread_id)
+        return lock is not None and lock.locked()
+
+    async def _acquire_advisory_lock(self, thread_id: str, deadline: float):
+        loop = asyncio.get_running_loop()
+        stack = AsyncExitStack()
+        try:
+            conn = await stack.enter_async_context(db_manager.get_connection())
+            while True:
+                cur = await conn.execute(
+                    "SELECT pg_try_advisory_lock(hashtextextended(%s, 0)) AS locked", (thread_id,)
+                )
+                row = await cur.fetchone()
+                if row and row["locked"]:
+                    return stack, conn
+                if self.policy == "reject":
+                    raise ThreadBusyError("A response is already being generated for this thread.")
+                if loop.time() + self.poll_interval > deadline:
+                    raise ThreadBusyError("Timed out waiting for the previous turn on this thread.")
+                # Poll instead of pg_advisory_lock so a waiting turn can still time out
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            await stack.aclose()
+            raise
+
+    def _unref(self, thread_id: str):
+        refs = self._refs.get(thread_id, 0) - 1
+        if refs <= 0:
+            self._refs.pop(thread_id, None)
+            self._locks.pop(thread_id, None)
+        else:
+            self._refs[thread_id] = refs
+
+
+# Global per-thread turn lock registry
+thread_turn_locks = ThreadTurnLocks(
+    policy=settings.THREAD_TURN_POLICY,
+    wait_timeout=settings.THREAD_TURN_WAIT_SECONDS,
+    backend=settings.THREAD_LOCK_BACKEND,
+    poll_interval=settings.THREAD_LOCK_POLL_SECONDS,
+)
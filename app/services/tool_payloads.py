@@ -0,0 +1,143 @@
+# ================================
+# FILE: app/services/tool_payloads.py
+# ================================
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+from app.core.config import settings
+from app.core.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+# Fields that differ between otherwise identical search responses and would defeat deduplication
+_VOLATILE_KEYS = ("response_time", "request_id")
+
+
+def _strip_volatile(payload: Any) -> Any:
+    if isinstance(payload, dict):
+        return {k: _strip_volatile(v) for k, v in payload.items() if k not in _VOLATILE_KEYS}
+    return payload
+
+
+def _canonical(payload: Any) -> bytes:
+    return json.dumps(_strip_volatile(payload), sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _as_list(content: Any) -> Optional[List[Any]]:
+    if isinstance(content, list):
+        return content
+    if isinstance(content, str) and content.startswith("["):
+        try:
+            parsed = json.loads(content)
+        except ValueError:
+            return None
+        return parsed if isinstance(parsed, list) else None
+    return None
+
+
+def describe_payload(content: Any, max_chars: int = 240) -> str:
+    """Short human-readable digest of a tool result (search hits become their URLs)"""
+    items = _as_list(content)
+    if items and all(isinstance(item, dict) and "url" in item for item in items):
+        return f"{len(items)} results: " + ", ".join(item.get("title") or item["url"] for item in items)
+    text = content if isinstance(content, str) else json.dumps(content, default=str)
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+class ToolPayloadStore:
+    """
+    Content-addressed storage for full tool outputs in the ``tool_payloads``
+    table. Payloads are keyed by the SHA-256 of their canonical JSON, so the
+    same result fetched on any thread is stored once.
+    """
+
+    async def put(self, tool_name: str, payload: Any) -> str:
+        data = _canonical(payload)
+        digest = hashlib.sha256(data).hexdigest()
+        async with db_manager.get_connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO tool_payloads (digest, tool_name, payload, size_bytes, created_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                ON CONFLICT (digest) DO NOTHING
+                """,
+                (digest, tool_name, data.decode("utf-8"), len(data))
+            )
+        return digest
+
+    async def get(self, digest: str) -> Optional[Any]:
+        async with db_manager.get_connection() as conn:
+            cur = await conn.execute("SELECT payload FROM tool_payloads WHERE digest = %s", (digest,))
+            row = await cur.fetchone()
+        return json.loads(row["payload"]) if row else None
+
+
+class ToolOutputCompactor:
+    """
+    Replaces tool results from earlier turns in the graph state with a compact
+    reference (digest plus a short description). The model still sees full
+    results for the turn in which the tool ran; afterwards only the reference is
+    checkpointed, re-read and re-sent on every following turn.
+    """
+
+    def __init__(self, store: ToolPayloadStore, min_chars: int):
+        self.store = store
+        self.min_chars = min_chars
+
+    def _needs_compaction(self, message: BaseMessage) -> bool:
+        if not isinstance(message, ToolMessage) or message.additional_kwargs.get("compacted"):
+            return False
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+        return len(content) >= self.min_chars or bool(message.artifact)
+
+    async def compact(self, messages: Sequence[BaseMessage]) -> List[ToolMessage]:
+        """Compacted replacements (same message ids) for tool results before the latest turn"""
+        last_turn = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        replacements: List[ToolMessage] = []
+        for message in messages[:last_turn]:
+            if not self._needs_compaction(message):
+                continue
+            artifact = message.artifact if isinstance(message.artifact, dict) else {}
+            digest = artifact.get("payload_digest")
+            try:
+                if digest is None:
+                    digest = await self.store.put(message.name or "tool", {
+                        "content": message.content,
+                        "artifact": message.artifact,
+                    })
+            except Exception as e:
+                # Never drop a payload we could not store; try again next turn
+                logger.warning(f"Failed to store tool payload for message {message.id}: {e}")
+                continue
+            replacements.append(ToolMessage(
+                id=message.id,
+                tool_call_id=message.tool_call_id,
+                name=message.name,
+                status=message.status,
+                content=f"[{message.name} result {digest[:12]}] {describe_payload(message.content)}",
+                additional_kwargs={"compacted": True, "payload_digest": digest},
+            ))
+        return replacements
+
+
+async def store_tool_payload(tool_name: str, content: Any, artifact: Any) -> Dict[str, Any]:
+    """
+    Store a fresh tool result and return the small artifact to keep in state
+    in place of the raw response. Falls back to the raw artifact on error.
+    """
+    try:
+        digest = await tool_payload_store.put(tool_name, {"content": content, "artifact": artifact})
+    except Exception as e:
+        logger.warning(f"Failed to store {tool_name} payload, keeping it inline: {e}")
+        return artifact
+    return {"payload_digest": digest}
+
+
+# Global tool payload store and compactor
+tool_payload_store = ToolPayloadStore()
+tool_output_compactor = ToolOutputCompactor(tool_payload_store, min_chars=settings.TOOL_PAYLOAD_MIN_CHARS)
@@ -0,0 +1,166 @@
+# ================================
+# FILE: app/services/tools.py
+# ================================
+
+import asyncio
+import inspect
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Sequence
+
+import httpx
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, ToolException
+from langgraph.prebuilt import ToolNode
+from pydantic import SecretStr
+
+from app.core.config import settings
+from app.core.metrics import stage_timer
+from app.services.resilience import CircuitBreaker, CircuitOpenError, call_with_breaker, circuit_breakers
+
+logger = logging.getLogger(__name__)
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Tool call slots of the running tool step (set by ParallelToolNode, taken by GuardedTool)
+_step_call_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("step_call_slots", default=None)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide HTTP client for tool backends, so searches reuse warm connections"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.TOOL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.TOOL_HTTP_MAX_CONNECTIONS,
+            ),
+            timeout=settings.TOOL_CALL_TIMEOUT_SECONDS,
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class GuardedTool(BaseTool):
+    """
+    Wraps a tool with a per-call deadline and a circuit breaker. Failures are
+    raised as ToolException and returned to the model as the tool result, so a
+    broken backend degrades the answer instead of failing the whole turn.
+    """
+
+    inner: BaseTool
+    breaker: Any
+    timeout: Optional[float] = None
+
+    def __init__(self, inner: BaseTool, breaker: CircuitBreaker, timeout: Optional[float], **kwargs: Any):
+        super().__init__(
+            name=inner.name,
+            description=inner.description,
+            args_schema=inner.args_schema,
+            response_format=inner.response_format,
+            handle_tool_error=True,
+            inner=inner,
+            breaker=breaker,
+            timeout=timeout,
+            **kwargs
+        )
+
+    def _inner_kwargs(self, method, config: RunnableConfig, run_manager) -> Dict[str, Any]:
+        """Forward config/run_manager only when the wrapped tool's implementation accepts them"""
+        parameters = inspect.signature(method).parameters
+        forwarded: Dict[str, Any] = {}
+        if "config" in parameters:
+            forwarded["config"] = config
+        if "run_manager" in parameters:
+            forwarded["run_manager"] = run_manager
+        return forwarded
+
+    def _run(self, *args: Any, config: RunnableConfig, run_manager=None, **kwargs: Any) -> Any:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            raise ToolException(str(e))
+        try:
+            result = self.inner._run(*args, **kwargs, **self._inner_kwargs(self.inner._run, config, run_manager))
+        except Exception as e:
+            self.breaker.record_failure()
+            raise ToolException(f"{self.name} failed: {e}")
+        self.breaker.record_success()
+        return result
+
+    async def _arun(self, *args: Any, config: RunnableConfig, run_manager=None, **kwargs: Any) -> Any:
+        slots = _step_call_slots.get()
+        if slots is None:
+            return await self._guarded_arun(args, kwargs, config, run_manager)
+        async with slots:
+            return await self._guarded_arun(args, kwargs, config, run_manager)
+
+    async def _guarded_arun(self, args: tuple, kwargs: Dict[str, Any], config: RunnableConfig, run_manager) -> Any:
+        try:
+            with stage_timer("tool_call", trace=False):
+                return await call_with_breaker(
+                    self.breaker,
+                    self.inner._arun(*args, **kwargs, **self._inner_kwargs(self.inner._arun, config, run_manager)),
+                    self.timeout,
+                    f"Tool call {self.name}"
+                )
+        except ToolException:
+            raise
+        except Exception as e:
+            logger.warning(f"Tool {self.name} failed: {e}")
+            raise ToolException(f"{self.name} failed: {e}")
+
+
+class ParallelToolNode(ToolNode):
+    """
+    Tool node whose step runs at most ``max_concurrency`` tool calls at a
+    time. ToolNode already runs a step's calls concurrently and returns the
+    ToolMessages in call order; this only bounds it. The bound is a
+    semaphore placed in the step's context, which the ``GuardedTool``
+    wrappers acquire around each call, so the stock ToolNode internals are
+    left alone. The agent uses one tools node per step (``v1``) instead of
+    one graph task per call, so the cap applies to the step.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], max_concurrency: int, **kwargs: Any):
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        token = _step_call_slots.set(asyncio.Semaphore(self.max_concurrency))
+        try:
+            return await super().ainvoke(input, config, **kwargs)
+        finally:
+            _step_call_slots.reset(token)
+
+
+def build_tool_node(tools: Sequence[BaseTool]) -> ParallelToolNode:
+    """Tool node that runs a step's tool calls in parallel (TOOL_MAX_PARALLEL_CALLS)"""
+    return ParallelToolNode(tools, max_concurrency=settings.TOOL_MAX_PARALLEL_CALLS)
+
+
+def guard_tool(tool: BaseTool, timeout: Optional[float] = None) -> GuardedTool:
+    """Wrap ``tool`` with the ``tool:<name>`` breaker and the configured tool deadline"""
+    return GuardedTool(
+        tool,
+        breaker=circuit_breakers.get(f"tool:{tool.name}"),
+        timeout=timeout if timeout is not None else settings.TOOL_CALL_TIMEOUT_SECONDS,
+    )
+
+
+def build_search_tool() -> GuardedTool:
+    """Tavily search guarded by a deadline and circuit breaker"""
+    # Imported on first use: langchain_community is slow to import
+    from app.services.search_tool import SearchTool
+
+    return guard_tool(SearchTool(
+        api_key=SecretStr(settings.TAVILY_API_KEY),
+        max_results=3
+    ))
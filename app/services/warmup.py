@@ -0,0 +1,164 @@
+# ================================
+# FILE: app/services/warmup.py
+# ================================
+
+"""
+Startup warmup.
+
+The first requests after a deploy would otherwise open the pool's
+connections, fetch the Clerk JWKS, build the agent graph and open the
+connections to the LLM providers and Tavily. ``Warmup`` does all of that in
+the background right after startup, with the steps running concurrently
+under one deadline, and the readiness probe (``/system/ready``) reports the
+worker ready only once it has finished, so load balancers route traffic to
+warm workers. A failed or timed-out step is logged and recorded; it does not
+keep the worker out of rotation.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import db_manager
+from app.core.metrics import snapshot_collector
+from app.services.langgraph_agent import langgraph_agent
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """Runs the warmup steps once per process and tracks whether they finished"""
+
+    def __init__(self, enabled: bool, timeout: float, preconnect_http: bool):
+        self.enabled = enabled
+        self.timeout = timeout
+        self.preconnect_http = preconnect_http
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self._started_at: Optional[float] = None
+        self._seconds: Optional[float] = None
+        self._done = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def start(self):
+        if self._task is not None or self.ready:
+            return
+        self._started_at = time.monotonic()
+        if not self.enabled:
+            self._finish()
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait(self):
+        await self._done.wait()
+
+    async def _run(self):
+        steps: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "db_pool": self._open_db_pool,
+            "jwks": self._prime_jwks,
+            "agent_graph": self._compile_graph,
+        }
+        if self.preconnect_http:
+            steps["http"] = self._preconnect_http
+        logger.info(f"Warming up: {', '.join(steps)}")
+        try:
+            await asyncio.gather(*(self._step(name, fn) for name, fn in steps.items()))
+        finally:
+            self._finish()
+        failed = [name for name, step in self.steps.items() if step["status"] not in ("ok", "skipped")]
+        if failed:
+            logger.warning(f"Warmup finished in {self._seconds:.2f}s; incomplete steps: {', '.join(failed)}")
+        else:
+            logger.info(f"Warmup finished in {self._seconds:.2f}s")
+
+    async def _step(self, name: str, fn: Callable[[], Awaitable[Any]]):
+        started = time.monotonic()
+        try:
+            detail = await asyncio.wait_for(fn(), timeout=self.timeout)
+            status = "skipped" if detail is False else "ok"
+            error = None
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"not finished after {self.timeout:.0f}s"
+        except Exception as e:
+            status, error = "failed", str(e)
+        self.steps[name] = {"status": status, "seconds": round(time.monotonic() - started, 3)}
+        if error is not None:
+            self.steps[name]["error"] = error
+            logger.warning(f"Warmup step {name} {status}: {error}")
+        elif isinstance(detail, (list, str)):
+            self.steps[name]["detail"] = detail
+
+    def _finish(self):
+        if self._started_at is not None:
+            self._seconds = time.monotonic() - self._started_at
+        self._done.set()
+
+    # ------------------------------------------------------------------
+    # Steps (return False when there is nothing to warm)
+    # ------------------------------------------------------------------
+
+    async def _open_db_pool(self):
+        """Wait until the pool holds its DB_POOL_MIN_SIZE connections"""
+        if db_manager.pool is None:
+            return False
+        await db_manager.pool.wait(timeout=self.timeout)
+
+    async def _prime_jwks(self):
+        """Fetch and cache the Clerk signing keys"""
+        if not settings.CLERK_INSTANCE_URL:
+            return False
+        from app.dependencies.thread import get_jwks_client
+
+        await asyncio.to_thread(get_jwks_client().get_signing_keys)
+
+    async def _compile_graph(self):
+        """Build the agent components and compile the graph (CPU-bound, so off the event loop)"""
+        await asyncio.to_thread(langgraph_agent.compile_graph)
+
+    async def _preconnect_http(self):
+        """Open keep-alive connections to the LLM providers and the search API"""
+        from app.services.search_tool import preconnect_search
+
+        await asyncio.to_thread(langgraph_agent.initialize)
+        preconnect = getattr(langgraph_agent.llm, "preconnect", None)
+        connected = list(await preconnect()) if preconnect is not None else []
+        if await preconnect_search():
+            connected.append("tavily")
+        return connected
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Readiness and per-step outcome, for the readiness probe"""
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "seconds": round(self._seconds, 3) if self._seconds is not None else None,
+            "steps": dict(self.steps),
+        }
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "ready": 1.0 if self.ready else 0.0,
+            "duration_seconds": self._seconds or 0.0,
+        }
+
+
+# Global warmup (started by the app lifespan)
+warmup = Warmup(
+    enabled=settings.WARMUP_ENABLED,
+    timeout=settings.WARMUP_TIMEOUT_SECONDS,
+    preconnect_http=settings.WARMUP_PRECONNECT_HTTP,
+)
+snapshot_collector.register_snapshot("warmup", warmup.metrics)
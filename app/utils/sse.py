@@ -0,0 +1,135 @@
+# ================================
+# FILE: app/utils/sse.py
+# ================================
+
+"""
+Server-Sent Events frame encoding for chat streams.
+
+Every frame of a stream carries the same ``thread_id`` and ``message_id``, so
+those are serialized once per stream and spliced into each frame as raw bytes.
+Per frame only the event type, the changed fields and the timestamp are written.
+"""
+import json
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.core.metrics import SSE_FRAMES
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None  # type: ignore[assignment]
+
+
+SSE_HEADERS: Dict[str, str] = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Content-Type": "text/event-stream",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control",
+}
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    def dumps(value: Any) -> bytes:
+        """Serialize a value to compact JSON bytes"""
+        return orjson.dumps(value, default=str)
+else:
+    def dumps(value: Any) -> bytes:
+        """Serialize a value to compact JSON bytes"""
+        return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+
+class _TimestampClock:
+    """Formats the current UTC time, re-rendering at most once per millisecond"""
+
+    __slots__ = ("_ms", "_value")
+
+    def __init__(self):
+        self._ms = -1
+        self._value = b""
+
+    def now(self) -> bytes:
+        ms = int(time.time() * 1000)
+        if ms != self._ms:
+            seconds, millis = divmod(ms, 1000)
+            self._value = (
+                time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{millis:03d}"
+            ).encode("ascii")
+            self._ms = ms
+        return self._value
+
+
+_clock = _TimestampClock()
+_type_prefixes: Dict[str, bytes] = {}
+_field_prefixes: Dict[str, bytes] = {}
+# Labelled counter children per event type, so counting a frame is a dict lookup and an add
+_frame_counters: Dict[str, Any] = {}
+
+
+def _count_frame(event_type: str):
+    counter = _frame_counters.get(event_type)
+    if counter is None:
+        counter = _frame_counters[event_type] = SSE_FRAMES.labels(event_type)
+    counter.inc()
+
+
+def _type_prefix(event_type: str) -> bytes:
+    prefix = _type_prefixes.get(event_type)
+    if prefix is None:
+        prefix = b'data: {"type":' + dumps(event_type)
+        _type_prefixes[event_type] = prefix
+    return prefix
+
+
+def _field_prefix(name: str) -> bytes:
+    prefix = _field_prefixes.get(name)
+    if prefix is None:
+        prefix = b"," + dumps(name) + b":"
+        _field_prefixes[name] = prefix
+    return prefix
+
+
+def is_event(frame: bytes, event_type: str) -> bool:
+    """Whether an encoded frame is of the given event type"""
+    return frame.startswith(_type_prefix(event_type))
+
+
+class SSEEventEncoder:
+    """
+    Encodes the ``data:`` frames of a single chat stream.
+
+    Frames keep the schema of the original dict-based events:
+    ``{"type": ..., <fields>, "thread_id": ..., "message_id": ..., "timestamp": ...}``.
+    """
+
+    def __init__(self, thread_id: str, message_id: Optional[str] = None):
+        self.thread_id = thread_id
+        self.message_id = message_id or str(uuid.uuid4())
+        self._envelope = (
+            _field_prefix("thread_id") + dumps(thread_id)
+            + _field_prefix("message_id") + dumps(self.message_id)
+            + b',"timestamp":"'
+        )
+        self._content_prefix = _type_prefix("content_chunk") + _field_prefix("content")
+        self._content_frames = SSE_FRAMES.labels("content_chunk")
+
+    def encode(self, event_type: str, **fields: Any) -> bytes:
+        """Encode an arbitrary event with the given payload fields"""
+        _count_frame(event_type)
+        parts = [_type_prefix(event_type)]
+        for name, value in fields.items():
+            parts.append(_field_prefix(name))
+            parts.append(dumps(value))
+        parts.append(self._envelope)
+        parts.append(_clock.now())
+        parts.append(b'"}\n\n')
+        return b"".join(parts)
+
+    def content_chunk(self, content: str) -> bytes:
+        """Encode a ``content_chunk`` event (the per-token hot path)"""
+        self._content_frames.inc()
+        return self._content_prefix + dumps(content) + self._envelope + _clock.now() + b'"}\n\n'
@@ -1,18 +1,39 @@
 # app/utils/thread_permissions.py
 
+from typing import Iterable
+
 from fastapi import HTTPException, status
 from app.core.database import db_manager
+from app.core.metrics import stage_timer
 
 
 async def verify_thread_ownership(thread_id: str, user_id: str) -> None:
-    async with db_manager.get_connection() as conn:
-        result = await conn.execute(
-            "SELECT 1 FROM threads WHERE id = %s AND user_id = %s LIMIT 1",
-            (thread_id, user_id)
-        )
-        row = await result.fetchone()
+    with stage_timer("thread_ownership"):
+        async with db_manager.get_connection() as conn:
+            result = await conn.execute(
+                "SELECT 1 FROM threads WHERE id = %s AND user_id = %s LIMIT 1",
+                (thread_id, user_id)
+            )
+            row = await result.fetchone()
         if row is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You do not have access to this thread."
             )
+
+
+async def verify_threads_ownership(thread_ids: Iterable[str], user_id: str) -> None:
+    """Check many threads with one query; fails if any of them is not the user's"""
+    wanted = set(thread_ids)
+    with stage_timer("thread_ownership"):
+        async with db_manager.get_connection() as conn:
+            result = await conn.execute(
+                "SELECT id FROM threads WHERE user_id = %s AND id = ANY(%s)",
+                (user_id, list(wanted))
+            )
+            owned = {row["id"] for row in await result.fetchall()}
+    if wanted - owned:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"You do not have access to {len(wanted - owned)} of the requested threads."
+        )
@@ -0,0 +1,10 @@
+"""
+Record and replay of agent conversations.
+
+``benchmarks.cassettes.record`` runs conversations through the real
+``process_message`` (real LLM providers and search) and stores every LLM and
+search request/response pair, with its latency, in a cassette file.
+``benchmarks.cassettes.replay`` runs the same conversations offline, serving
+the recorded responses from a fake model and search backend at the recorded
+or a scaled timing, and reports latency, token usage and agent steps.
+"""
@@ -0,0 +1,314 @@
+"""
+Cassette file format and the recording/replaying stand-ins.
+
+A cassette is JSON: the settings it was recorded with and one entry per turn
+with the user message, the LLM calls (request messages, response message,
+latency) and search calls (query, response body, latency) in call order,
+plus what the recorded run measured (wall time, steps, answer).
+
+Recording wraps each router provider's model and the tool HTTP client's
+transport, so the router, ``GuardedTool`` and ``SearchTool`` code runs as in
+production. Replay keeps that code too: a fake provider model and a mock
+transport answer from the cassette.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict, messages_to_dict
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+FORMAT_VERSION = 1
+
+
+def configure_env():
+    """Defaults for running the agent outside the app (call before importing it)"""
+    os.environ.setdefault("THREAD_LOCK_BACKEND", "local")
+    os.environ.setdefault("TRACING_ENABLED", "false")
+    # The payload store lives in Postgres; cassette runs keep tool results inline
+    os.environ.setdefault("TOOL_PAYLOAD_COMPACTION", "false")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def request_digest(messages: List[BaseMessage]) -> str:
+    """
+    Digest of an LLM request, to spot prompts that differ from the recording.
+    Message ids and timestamps are new on every run, so only the role,
+    content and tool calls count.
+    """
+    payload = json.dumps([
+        [
+            message.type,
+            message.content,
+            [[call["name"], call["args"]] for call in getattr(message, "tool_calls", None) or []],
+            getattr(message, "tool_call_id", None),
+        ]
+        for message in messages
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Cassette:
+    """Recorded turns, and the position of the turn being recorded or replayed"""
+
+    def __init__(self, meta: Optional[Dict[str, Any]] = None, turns: Optional[List[Dict[str, Any]]] = None):
+        self.meta = meta or {}
+        self.turns = turns or []
+        self.turn: Optional[Dict[str, Any]] = None
+        self._llm_position = 0
+        self._served_searches: List[int] = []
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported cassette version {data.get('version')} in {path}")
+        return cls(data["meta"], data["turns"])
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"version": FORMAT_VERSION, "meta": self.meta, "turns": self.turns}, f, indent=1)
+
+    def start_recording(self, conversation: int, thread_id: str, message: str) -> Dict[str, Any]:
+        self.turn = {"conversation": conversation, "thread_id": thread_id, "message": message,
+                     "llm": [], "search": []}
+        self.turns.append(self.turn)
+        return self.turn
+
+    def start_replay(self, index: int) -> Dict[str, Any]:
+        self.turn = self.turns[index]
+        self._llm_position = 0
+        self._served_searches = []
+        return self.turn
+
+    def next_llm(self) -> Dict[str, Any]:
+        calls = self.turn["llm"]
+        if self._llm_position >= len(calls):
+            raise RuntimeError(
+                f"Cassette has {len(calls)} LLM call(s) for this turn; the agent made more "
+                "(the graph changed the number of model steps)"
+            )
+        call = calls[self._llm_position]
+        self._llm_position += 1
+        return call
+
+    @property
+    def llm_calls_served(self) -> int:
+        return self._llm_position
+
+    def next_search(self, query: str) -> Dict[str, Any]:
+        """The recorded search with this query, else the next unused one"""
+        searches = self.turn["search"]
+        unused = [i for i in range(len(searches)) if i not in self._served_searches]
+        if not unused:
+            raise RuntimeError(f"Cassette has {len(searches)} search call(s) for this turn; the agent made more")
+        index = next((i for i in unused if searches[i]["query"] == query), unused[0])
+        self._served_searches.append(index)
+        return searches[index]
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes calls to ``inner`` and appends each request/response pair to the cassette"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any
+    cassette: Any
+    provider: str
+    model_name: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-recorder"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "RecordingChatModel":
+        return self.model_copy(update={"inner": self.inner.bind_tools(tools, **kwargs)})
+
+    def _record(self, messages: List[BaseMessage], response: BaseMessage, latency: float):
+        self.cassette.turn["llm"].append({
+            "provider": self.provider,
+            "model": self.model_name,
+            "request_digest": request_digest(messages),
+            "request": messages_to_dict(messages),
+            "response": message_to_dict(response),
+            "latency": round(latency, 4),
+        })
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        response = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._record(messages, response, time.perf_counter() - started)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._record(messages, response, time.perf_counter() - started)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Answers with the cassette's next recorded response after its recorded
+    latency times ``time_scale`` (0 answers at once). Counts the requests
+    that differ from the recording and the prompt tokens actually sent.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cassette: Any
+    time_scale: float = 1.0
+    model_name: str = "cassette-replay"
+    divergent_requests: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ReplayChatModel":
+        # Copies would keep their own counters; the recorded responses already carry the tool calls
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> tuple:
+        call = self.cassette.next_llm()
+        if request_digest(messages) != call["request_digest"]:
+            self.divergent_requests += 1
+        self.prompt_tokens += count_tokens_approximately(messages)
+        response = messages_from_dict([call["response"]])[0]
+        if not isinstance(response, AIMessage):
+            raise RuntimeError(f"Recorded LLM response is a {type(response).__name__}, not an AIMessage")
+        return response, call["latency"] * self.time_scale
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        response, delay = self._respond(messages)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        response, delay = self._respond(messages)
+        if delay > 0:
+            time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards tool HTTP requests and records the Tavily ``/search`` exchanges"""
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        if not request.url.path.endswith("/search"):
+            return response
+        body = await response.aread()
+        query = json.loads(request.content or b"{}").get("query", "")
+        self.cassette.turn["search"].append({
+            "query": query,
+            "status": response.status_code,
+            "response": body.decode("utf-8"),
+            "latency": round(time.perf_counter() - started, 4),
+        })
+        return httpx.Response(response.status_code, headers=response.headers, content=body)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Answers Tavily ``/search`` requests from the cassette"""
+
+    def __init__(self, cassette: Cassette, time_scale: float = 1.0):
+        self.cassette = cassette
+        self.time_scale = time_scale
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/search"):
+            return httpx.Response(404)
+        query = json.loads(request.content or b"{}").get("query", "")
+        call = self.cassette.next_search(query)
+        delay = call["latency"] * self.time_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return httpx.Response(call["status"], content=call["response"].encode("utf-8"),
+                              headers={"Content-Type": "application/json"})
+
+
+async def run_turn(message: str, thread_id: str) -> Dict[str, Any]:
+    """Run one turn through ``process_message``; returns what it measured"""
+    from app.services.langgraph_agent import langgraph_agent
+
+    steps = 0
+    answer = ""
+    tool_calls = 0
+    started = time.perf_counter()
+    async for chunk in langgraph_agent.process_message(message, thread_id):
+        if "error" in chunk:
+            raise RuntimeError(f"Turn failed: {chunk['message']}")
+        steps += 1
+        info = langgraph_agent.extract_response_info(chunk)
+        tool_calls += len(info["tool_calls"])
+        if info["is_final_response"]:
+            answer = info["content"]
+    return {
+        "seconds": round(time.perf_counter() - started, 4),
+        "steps": steps,
+        "tool_calls": tool_calls,
+        "answer": answer,
+    }
+
+
+def usage_totals(llm_calls: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Input/output tokens the provider reported for the recorded responses"""
+    totals = {"input_tokens": 0, "output_tokens": 0}
+    for call in llm_calls:
+        usage = call["response"]["data"].get("usage_metadata") or {}
+        totals["input_tokens"] += usage.get("input_tokens", 0)
+        totals["output_tokens"] += usage.get("output_tokens", 0)
+    return totals
@@ -0,0 +1,106 @@
+"""
+Record agent conversations into a cassette.
+
+Runs each conversation through ``process_message`` with the configured LLM
+providers and Tavily (real API keys from the environment) on an in-memory
+checkpointer, and writes every LLM and search request/response pair with its
+latency to the cassette.
+
+The input file has one user message per line; a blank line starts a new
+conversation (thread).
+
+Usage:
+    python -m benchmarks.cassettes.record conversations.txt --output cassette.json
+"""
+import argparse
+import asyncio
+import os
+import platform
+from datetime import datetime, timezone
+from typing import List
+
+from benchmarks.cassettes.cassette import configure_env
+
+
+def read_conversations(path: str) -> List[List[str]]:
+    conversations: List[List[str]] = [[]]
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                conversations[-1].append(line)
+            elif conversations[-1]:
+                conversations.append([])
+    return [conversation for conversation in conversations if conversation]
+
+
+async def record(args: argparse.Namespace):
+    import httpx
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from app.core.checkpoint_serde import build_checkpoint_serde
+    from app.core.config import settings
+    from app.core.database import db_manager
+    from app.services import tools
+    from app.services.langgraph_agent import langgraph_agent
+    from benchmarks.cassettes.cassette import (
+        Cassette,
+        RecordingChatModel,
+        RecordingTransport,
+        git_commit,
+        run_turn,
+        usage_totals,
+    )
+
+    conversations = read_conversations(args.conversations)
+    langgraph_agent.initialize()
+    router = langgraph_agent.llm
+    models = router.model_names()
+    cassette = Cassette(meta={
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "providers": [provider.name for provider in router.providers],
+        "models": models,
+        "durability": settings.CHECKPOINT_DURABILITY,
+    })
+
+    db_manager.memory = InMemorySaver(serde=build_checkpoint_serde())
+    for provider, model_name in zip(router.providers, models):
+        provider.model = RecordingChatModel(
+            inner=provider.model, cassette=cassette, provider=provider.name, model_name=model_name
+        )
+    tools._http_client = httpx.AsyncClient(
+        transport=RecordingTransport(cassette), timeout=settings.TOOL_CALL_TIMEOUT_SECONDS
+    )
+
+    run_id = os.urandom(3).hex()
+    try:
+        for index, conversation in enumerate(conversations):
+            thread_id = f"cassette-{run_id}-{index}"
+            for message in conversation:
+                turn = cassette.start_recording(index, thread_id, message)
+                turn["recorded"] = await run_turn(message, thread_id)
+                turn["recorded"]["usage"] = usage_totals(turn["llm"])
+                print(
+                    f"conversation {index} turn {len(cassette.turns)}: {turn['recorded']['seconds']:.2f}s  "
+                    f"{len(turn['llm'])} LLM call(s)  {len(turn['search'])} search(es)", flush=True
+                )
+    finally:
+        await tools.close_http_client()
+        cassette.save(args.output)
+    print(f"Cassette with {len(cassette.turns)} turn(s) written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("conversations", help="Text file: one message per line, blank line between conversations")
+    parser.add_argument("--output", required=True, help="Cassette file to write")
+    args = parser.parse_args()
+
+    configure_env()
+    asyncio.run(record(args))
+
+
+if __name__ == "__main__":
+    main()
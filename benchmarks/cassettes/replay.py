@@ -0,0 +1,178 @@
+"""
+Replay a cassette offline and report latency, tokens and agent steps.
+
+Runs the recorded conversations through ``process_message`` on an in-memory
+checkpointer, with the LLM and search answered from the cassette after their
+recorded latency times ``--time-scale`` (1 = as recorded, 0.1 = ten times
+faster, 0 = no waiting). No API keys or network are needed.
+
+Per turn it reports wall time, agent steps (graph updates), LLM and tool
+calls, the provider-reported tokens of the replayed responses, an estimate
+of the prompt tokens actually sent, and how many LLM requests differ from
+the recorded ones: after a prompt or graph change the recorded answers are
+still served, so the run shows the cost of the new prompts and steps. A turn
+that makes more LLM or search calls than were recorded fails with an error.
+
+Usage:
+    python -m benchmarks.cassettes.replay cassette.json [--time-scale 0] [--output replay.json]
+    python -m benchmarks.cassettes.replay --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from benchmarks.cassettes.cassette import configure_env
+
+TOTAL_KEYS = ("seconds", "steps", "llm_calls", "tool_calls", "input_tokens", "output_tokens", "prompt_tokens")
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from app.core.checkpoint_serde import build_checkpoint_serde
+    from app.core.database import db_manager
+    from app.services import tools
+    from app.services.context_window import build_context_window
+    from app.services.langgraph_agent import langgraph_agent
+    from app.services.llm_router import LLMProvider, LLMRouter
+    from benchmarks.cassettes.cassette import (
+        Cassette,
+        ReplayChatModel,
+        ReplayTransport,
+        git_commit,
+        run_turn,
+        usage_totals,
+    )
+
+    cassette = Cassette.load(args.cassette)
+    models = cassette.meta.get("models") or ["cassette-replay"]
+    model = ReplayChatModel(cassette=cassette, time_scale=args.time_scale, model_name=models[0])
+    # A single provider: the cassette already holds whichever provider answered each call
+    router = LLMRouter(providers=[LLMProvider("replay", model)])
+    langgraph_agent.llm = router
+    langgraph_agent.context_window = build_context_window(router, models)
+    tools._http_client = httpx.AsyncClient(transport=ReplayTransport(cassette, args.time_scale))
+    db_manager.memory = InMemorySaver(serde=build_checkpoint_serde())
+
+    results: List[Dict[str, Any]] = []
+    for index in range(len(cassette.turns)):
+        turn = cassette.start_replay(index)
+        divergent, prompt_tokens = model.divergent_requests, model.prompt_tokens
+        result: Dict[str, Any] = {"turn": index, "conversation": turn["conversation"]}
+        try:
+            measured = await run_turn(turn["message"], turn["thread_id"])
+        except Exception as e:
+            result["error"] = str(e)
+            results.append(result)
+            print(f"turn {index}: {e}", flush=True)
+            continue
+        served = turn["llm"][:cassette.llm_calls_served]
+        result.update(
+            seconds=measured["seconds"],
+            steps=measured["steps"],
+            llm_calls=len(served),
+            tool_calls=measured["tool_calls"],
+            **usage_totals(served),
+            prompt_tokens=model.prompt_tokens - prompt_tokens,
+            divergent_requests=model.divergent_requests - divergent,
+            answer_matches=measured["answer"] == turn["recorded"]["answer"],
+            recorded={
+                "seconds": turn["recorded"]["seconds"],
+                "steps": turn["recorded"]["steps"],
+                "llm_calls": len(turn["llm"]),
+            },
+        )
+        results.append(result)
+        _print_turn(result)
+
+    await tools.close_http_client()
+    completed = [result for result in results if "error" not in result]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "cassette": os.path.basename(args.cassette),
+            "cassette_commit": cassette.meta.get("commit"),
+            "time_scale": args.time_scale,
+        },
+        "totals": {
+            **{key: round(sum(result[key] for result in completed), 4) for key in TOTAL_KEYS},
+            "turns": len(results),
+            "errors": len(results) - len(completed),
+            "divergent_requests": sum(result["divergent_requests"] for result in completed),
+        },
+        "turns": results,
+    }
+
+
+def _print_turn(result: Dict[str, Any]):
+    recorded = result["recorded"]
+    line = (
+        f"turn {result['turn']:<3} {result['seconds']:>7.2f}s (rec {recorded['seconds']:.2f}s)  "
+        f"steps {result['steps']} (rec {recorded['steps']})  llm {result['llm_calls']}/{recorded['llm_calls']}  "
+        f"tools {result['tool_calls']}  tokens in {result['input_tokens']} out {result['output_tokens']}  "
+        f"prompt ~{result['prompt_tokens']}"
+    )
+    if result["divergent_requests"]:
+        line += f"  changed prompts {result['divergent_requests']}"
+    print(line, flush=True)
+
+
+def compare(old_path: str, new_path: str):
+    """Print the change of the replay totals between two result files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')} ({new['meta'].get('cassette')})")
+
+    def delta(before: Optional[float], after: Optional[float]) -> str:
+        if not before or after is None:
+            return "n/a"
+        return f"{(after - before) / before * 100:+.1f}%"
+
+    for key in TOTAL_KEYS + ("errors", "divergent_requests"):
+        before, after = old["totals"].get(key), new["totals"].get(key)
+        print(f"{key:<20} {before!s:>12} -> {after!s:<12} {delta(before, after)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", nargs="?", help="Cassette file written by benchmarks.cassettes.record")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier for the recorded latencies")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.cassette:
+        parser.error("a cassette file is required")
+
+    # Replay needs no credentials; the settings only require the keys to be set
+    os.environ.setdefault("GROQ_API_KEY", "replay")
+    os.environ.setdefault("TAVILY_API_KEY", "replay")
+    os.environ.setdefault("LLM_PROVIDERS", "groq")
+    configure_env()
+    results = asyncio.run(replay(args))
+    totals = results["totals"]
+    print(
+        f"{totals['turns']} turn(s) in {totals['seconds']:.2f}s  steps {totals['steps']}  "
+        f"llm {totals['llm_calls']}  tools {totals['tool_calls']}  tokens in {totals['input_tokens']} "
+        f"out {totals['output_tokens']}  prompt ~{totals['prompt_tokens']}  errors {totals['errors']}"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Checkpoint serializer benchmark.
+
+Serializes a message-heavy conversation state (the ``messages`` channel of a
+long thread with search results) with each compression codec and reports
+write/read throughput and blob size. With ``--postgres`` it also writes
+checkpoints through ``AsyncPostgresSaver`` to the configured database and
+reports checkpoints/second and bytes on disk (``pg_column_size``, i.e. after
+any TOAST compression). Benchmark threads are deleted afterwards.
+
+Usage:
+    python -m benchmarks.checkpoint_serde [--turns 40] [--repeat 5] [--postgres] [--json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from app.core.checkpoint_serde import CompressedSerializer, zstandard
+from app.core.config import settings
+
+CODECS: List[Optional[str]] = [None, "zlib"] + (["zstd"] if zstandard is not None else [])
+
+WORDS = (
+    "the a of to in and is for on that with as by at from market report said new year city "
+    "government weather rain temperature forecast price company shares team match season "
+    "minister election policy data study research health energy climate growth rate bank"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    # Random word order keeps the compression ratio closer to real prose than repeated sentences
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _conversation(turns: int) -> List[BaseMessage]:
+    """A thread where every turn runs one search, like the agent does for news/weather questions"""
+    rng = random.Random(turns)
+    messages: List[BaseMessage] = []
+    for turn in range(turns):
+        call_id = f"call_{turn}"
+        results = [
+            {
+                "title": f"Result {i} for question {turn}",
+                "url": f"https://example.com/articles/{turn}/{i}",
+                "content": _text(rng, 250),
+                "score": 0.9 - i / 10,
+            }
+            for i in range(3)
+        ]
+        messages += [
+            HumanMessage(f"Question {turn}: what is the latest on topic {turn}?", id=str(uuid.uuid4())),
+            AIMessage("", id=str(uuid.uuid4()), tool_calls=[
+                {"name": "tavily_search_results_json", "args": {"query": f"topic {turn}"}, "id": call_id}
+            ]),
+            ToolMessage(json.dumps(results), tool_call_id=call_id, name="tavily_search_results_json",
+                        id=str(uuid.uuid4())),
+            AIMessage(_text(rng, 120), id=str(uuid.uuid4())),
+        ]
+    return messages
+
+
+def _best(fn, repeat: int) -> float:
+    """Best wall time of ``repeat`` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _serde(codec: Optional[str]) -> CompressedSerializer:
+    return CompressedSerializer(
+        codec=codec or "none",
+        min_bytes=settings.CHECKPOINT_COMPRESSION_MIN_BYTES,
+        level=settings.CHECKPOINT_COMPRESSION_LEVEL,
+    )
+
+
+def run_serde(turns: int, repeat: int) -> List[Dict[str, Any]]:
+    value = _conversation(turns)
+    cases = []
+    plain_size = None
+    for codec in CODECS:
+        serde = _serde(codec)
+        typed = serde.dumps_typed(value)
+        size = len(typed[1])
+        plain_size = plain_size or size
+        dump_time = _best(lambda: serde.dumps_typed(value), repeat)
+        load_time = _best(lambda: serde.loads_typed(typed), repeat)
+        cases.append({
+            "codec": codec or "none",
+            "type": typed[0],
+            "bytes": size,
+            "ratio": round(plain_size / size, 2),
+            "dumps_per_sec": round(1 / dump_time, 1),
+            "loads_per_sec": round(1 / load_time, 1),
+            "dumps_mb_per_sec": round(plain_size / dump_time / 1e6, 1),
+            "loads_mb_per_sec": round(plain_size / load_time / 1e6, 1),
+        })
+    return cases
+
+
+async def run_postgres(turns: int, checkpoints: int) -> List[Dict[str, Any]]:
+    from langgraph.checkpoint.base import empty_checkpoint
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    value = _conversation(turns)
+    cases = []
+    async with AsyncConnectionPool(
+            settings.PSYCOPG_DATABASE_URL,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row,
+                    "sslmode": settings.PSQL_SSLMODE},
+    ) as pool:
+        for codec in CODECS:
+            saver = AsyncPostgresSaver(pool, serde=_serde(codec))  # type: ignore[arg-type]
+            await saver.setup()
+            thread_id = f"bench-serde-{codec or 'none'}-{uuid.uuid4()}"
+            configs = []
+            try:
+                start = time.perf_counter()
+                config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+                for i in range(checkpoints):
+                    checkpoint = empty_checkpoint()
+                    checkpoint["channel_values"] = {"messages": value}
+                    checkpoint["channel_versions"] = {"messages": str(i + 1)}
+                    config = await saver.aput(config, checkpoint, {"step": i}, {"messages": str(i + 1)})
+                    configs.append(config)
+                write_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for config in configs:
+                    await saver.aget_tuple(config)
+                read_time = time.perf_counter() - start
+
+                async with pool.connection() as conn:
+                    cur = await conn.execute(
+                        "SELECT SUM(octet_length(blob)) AS raw, SUM(pg_column_size(blob)) AS disk "
+                        "FROM checkpoint_blobs WHERE thread_id = %s",
+                        (thread_id,)
+                    )
+                    sizes = await cur.fetchone()
+            finally:
+                await saver.adelete_thread(thread_id)
+
+            cases.append({
+                "codec": codec or "none",
+                "checkpoints": checkpoints,
+                "writes_per_sec": round(checkpoints / write_time, 1),
+                "reads_per_sec": round(checkpoints / read_time, 1),
+                "blob_bytes": int(sizes["raw"] or 0),
+                "disk_bytes": int(sizes["disk"] or 0),
+            })
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40, help="Conversation turns in the serialized state")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--postgres", action="store_true", help="Also write checkpoints to the configured database")
+    parser.add_argument("--checkpoints", type=int, default=50, help="Checkpoints per codec with --postgres")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {
+        "turns": args.turns,
+        "min_bytes": settings.CHECKPOINT_COMPRESSION_MIN_BYTES,
+        "level": settings.CHECKPOINT_COMPRESSION_LEVEL,
+        "serde": run_serde(args.turns, args.repeat),
+    }
+    if args.postgres:
+        results["postgres"] = asyncio.run(run_postgres(args.turns, args.checkpoints))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"messages channel of a {args.turns}-turn thread, level {results['level']}, best of {args.repeat}")
+    for case in results["serde"]:
+        print(
+            f"  {case['codec']:<5} {case['bytes']:>10,} bytes  x{case['ratio']:<5}  "
+            f"dumps {case['dumps_per_sec']:>8,}/s ({case['dumps_mb_per_sec']} MB/s)  "
+            f"loads {case['loads_per_sec']:>8,}/s ({case['loads_mb_per_sec']} MB/s)"
+        )
+    for case in results.get("postgres", []):
+        print(
+            f"  postgres {case['codec']:<5} writes {case['writes_per_sec']:>7,}/s  reads {case['reads_per_sec']:>7,}/s  "
+            f"blob {case['blob_bytes']:>12,} bytes  on disk {case['disk_bytes']:>12,} bytes"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Import-time profile of the app.
+
+Imports ``app.main`` in fresh interpreters and reports the wall time to a
+loaded app (median of ``--repeat`` runs) plus, from ``python -X importtime``,
+the modules and top-level packages with the largest cumulative import time.
+Run it before and after adding imports to module level: a worker pays this on
+every cold start.
+
+Usage:
+    python -m benchmarks.import_time [--module app.main] [--repeat 5] [--top 25] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # Settings require the keys; nothing is called at import
+    env.setdefault("GROQ_API_KEY", "import-time")
+    env.setdefault("TAVILY_API_KEY", "import-time")
+    return env
+
+
+def wall_time(module: str, repeat: int) -> List[float]:
+    """Seconds to import ``module`` in a fresh interpreter, interpreter startup excluded"""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    return [
+        float(subprocess.run([sys.executable, "-W", "ignore", "-c", code], env=_env(),
+                             capture_output=True, text=True, check=True).stdout.strip())
+        for _ in range(repeat)
+    ]
+
+
+def import_profile(module: str) -> List[Dict[str, Any]]:
+    """``-X importtime`` records: module, self and cumulative microseconds, nesting depth"""
+    stderr = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", f"import {module}"],
+        env=_env(), capture_output=True, text=True, check=True,
+    ).stderr
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        records.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return records
+
+
+def by_package(records: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Self time summed per top-level package, in microseconds"""
+    totals: Dict[str, int] = {}
+    for record in records:
+        package = record["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + record["self_us"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    times = wall_time(args.module, args.repeat)
+    records = import_profile(args.module)
+    heaviest = sorted(records, key=lambda record: record["cumulative_us"], reverse=True)
+    return {
+        "module": args.module,
+        "wall_seconds": {"median": statistics.median(times), "min": min(times), "max": max(times)},
+        "modules_imported": len(records),
+        "top_modules": heaviest[:args.top],
+        "top_packages": dict(list(by_package(records).items())[:args.top]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    wall = results["wall_seconds"]
+    print(f"import {results['module']}: {wall['median'] * 1000:.0f} ms median "
+          f"({wall['min'] * 1000:.0f}-{wall['max'] * 1000:.0f} ms), {results['modules_imported']} modules")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for record in results["top_modules"]:
+        print(f"{record['cumulative_us'] / 1000:>14.1f} {record['self_us'] / 1000:>9.1f}  "
+              f"{'  ' * record['depth']}{record['module']}")
+    print(f"\n{'self ms':>14}  package")
+    for package, self_us in results["top_packages"].items():
+        print(f"{self_us / 1000:>14.1f}  {package}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+End-to-end load benchmark with local stand-ins for the LLM, search and auth
+providers (see ``benchmarks.load.run``)
+"""
@@ -0,0 +1,175 @@
+"""
+Local stand-ins for the paid backends used by the load benchmark.
+
+``FakeChatModel`` answers after a configurable time to first token and
+token rate, and asks for one search on a configurable share of questions.
+``search_transport`` answers the Tavily ``/search`` calls of the real search
+tool, so tool calls still go through ``GuardedTool``, the circuit breaker
+and tool payload compaction. Content is derived from the question, so runs
+are reproducible.
+"""
+import asyncio
+import hashlib
+import json
+import random
+from typing import Any, AsyncIterator, List, Optional
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+WORDS = (
+    "the a of to in and is for on that with as by at from market report said new year city "
+    "weather rain temperature forecast price company team season policy data study energy growth"
+).split()
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _last_human(messages: List[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return str(message.content)
+    return ""
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model with a simulated TTFT and token rate"""
+
+    model_name: str = "fake-bench"
+    tool_name: str = "tavily_search_results_json"
+    ttft: float = 0.3
+    tokens_per_second: float = 80.0
+    output_tokens: int = 120
+    search_ratio: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-bench"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        question = _last_human(messages)
+        rng = random.Random(_seed(question))
+        usage = {
+            "input_tokens": sum(len(str(m.content)) // 4 for m in messages),
+            "output_tokens": self.output_tokens,
+            "total_tokens": 0,
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        if isinstance(messages[-1], HumanMessage) and rng.random() < self.search_ratio:
+            usage["output_tokens"] = 20
+            return AIMessage("", tool_calls=[{
+                "name": self.tool_name,
+                "args": {"query": question[:80] or "news"},
+                "id": f"call_{rng.getrandbits(32):08x}",
+            }], usage_metadata=usage)
+        words = [rng.choice(WORDS) for _ in range(self.output_tokens)]
+        return AIMessage(" ".join(words).capitalize() + ".", usage_metadata=usage)
+
+    def _generation_time(self) -> float:
+        return self.ttft + self.output_tokens / self.tokens_per_second
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        message = self._reply(messages)
+        await asyncio.sleep(self.ttft if message.tool_calls else self._generation_time())
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _astream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._reply(messages)
+        await asyncio.sleep(self.ttft)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="", tool_call_chunks=[{
+                    "name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0
+                } for call in message.tool_calls],
+                usage_metadata=message.usage_metadata,
+            ))
+            return
+        words = str(message.content).split(" ")
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            last = index == len(words) - 1
+            chunk = AIMessageChunk(
+                content=word if index == 0 else " " + word,
+                usage_metadata=message.usage_metadata if last else None,
+            )
+            yield ChatGenerationChunk(message=chunk)
+
+
+def search_transport(latency: float = 0.4, results: int = 5) -> httpx.AsyncBaseTransport:
+    """Transport answering Tavily ``/search`` requests after ``latency`` seconds"""
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        query = json.loads(request.content or b"{}").get("query", "")
+        rng = random.Random(_seed(query))
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i} for {query}",
+                    "url": f"https://example.com/{rng.getrandbits(32):08x}/{i}",
+                    "content": " ".join(rng.choice(WORDS) for _ in range(60)),
+                    "score": round(1 - i / 10, 2),
+                }
+                for i in range(results)
+            ],
+        })
+
+    return httpx.MockTransport(handle)
+
+
+def install_fakes(
+        ttft: float,
+        tokens_per_second: float,
+        output_tokens: int,
+        search_ratio: float,
+        search_latency: float,
+):
+    """Swap the agent's model and the search backend for the local fakes (call after importing the app)"""
+    from app.services import tools
+    from app.services.context_window import build_context_window
+    from app.services.langgraph_agent import langgraph_agent
+    from app.services.llm_router import LLMProvider, LLMRouter
+
+    langgraph_agent.initialize()
+    model = FakeChatModel(
+        tool_name=langgraph_agent.tavily.name,
+        ttft=ttft,
+        tokens_per_second=tokens_per_second,
+        output_tokens=output_tokens,
+        search_ratio=search_ratio,
+    )
+    router = LLMRouter(providers=[LLMProvider("fake", model)])
+    langgraph_agent.llm = router
+    langgraph_agent.context_window = build_context_window(router, router.model_names())
+    tools._http_client = httpx.AsyncClient(transport=search_transport(search_latency))
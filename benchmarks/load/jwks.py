@@ -0,0 +1,71 @@
+"""
+Local stand-in for the Clerk instance: an RSA key, a JWKS endpoint serving
+its public half and RS256 tokens signed with it.
+
+Point the app at it with ``CLERK_INSTANCE_URL=<LocalJWKS.url>``; the app then
+verifies benchmark tokens through its normal JWKS path.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+JWKS_PATH = "/.well-known/jwks.json"
+
+
+class LocalJWKS:
+    """Serves ``/.well-known/jwks.json`` on 127.0.0.1 from a background thread"""
+
+    def __init__(self, kid: str = "bench-key"):
+        self.kid = kid
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(self._key.public_key()))
+        jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+        body = json.dumps({"keys": [jwk]}).encode("utf-8")
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != JWKS_PATH:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="bench-jwks", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalJWKS":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def token(self, user_id: str, ttl: int = 3600) -> str:
+        """A Clerk-style session token for ``user_id``"""
+        now = int(time.time())
+        claims = {
+            "sub": user_id,
+            "email": f"{user_id}@bench.local",
+            "iss": self.url,
+            "iat": now,
+            "nbf": now,
+            "exp": now + ttl,
+        }
+        return jwt.encode(claims, self._key, algorithm="RS256", headers={"kid": self.kid})
@@ -0,0 +1,288 @@
+"""
+End-to-end load benchmark.
+
+Starts a local JWKS signer and the app (``benchmarks.load.server``, fake LLM
+and search, real Postgres), creates one user and thread per client, then
+drives each scenario at each concurrency level with closed-loop clients for
+``--duration`` seconds:
+
+    stream    POST /chat/message/stream   (TTFT = first content_chunk frame)
+    history   GET  /chat/history/{thread_id}
+    titles    GET  /chat/titles
+    search    GET  /chat/search?query=...
+
+Results (RPS, p50/p95/p99 latency and TTFT in ms, errors) are printed and
+written as JSON with ``--output``; ``--compare OLD NEW`` diffs two result files.
+
+Usage:
+    python -m benchmarks.load.run [--concurrency 1,4,16,64] [--duration 15] [--output load.json]
+    python -m benchmarks.load.run --compare baseline.json load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.load.jwks import LocalJWKS
+
+API = "/api/v1"
+SCENARIOS = ("stream", "history", "titles", "search")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+class Client:
+    """One benchmark user with its own thread"""
+
+    def __init__(self, http: httpx.AsyncClient, token: str):
+        self.http = http
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.thread_id = ""
+        self.turn = 0
+
+    async def setup(self, seed_turns: int):
+        response = await self.http.post(f"{API}/chat/thread", json={"thread_title": "Benchmark chat"},
+                                        headers=self.headers)
+        response.raise_for_status()
+        self.thread_id = response.json()["id"]
+        for _ in range(seed_turns):
+            await self.stream()
+
+    async def stream(self) -> Optional[float]:
+        """Run one streamed turn; returns the TTFT, raises on an error frame"""
+        self.turn += 1
+        started = time.perf_counter()
+        ttft = None
+        async with self.http.stream(
+                "POST", f"{API}/chat/message/stream",
+                json={"message": f"Question {self.turn} about the weather in city {self.thread_id[:4]}",
+                      "thread_id": self.thread_id},
+                headers=self.headers,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if ttft is None and '"type":"content_chunk"' in line:
+                    ttft = time.perf_counter() - started
+                elif '"type":"error"' in line:
+                    raise RuntimeError(line[6:])
+        return ttft
+
+    async def history(self):
+        (await self.http.get(f"{API}/chat/history/{self.thread_id}", headers=self.headers)).raise_for_status()
+
+    async def titles(self):
+        (await self.http.get(f"{API}/chat/titles", params={"page": 1, "limit": 20},
+                             headers=self.headers)).raise_for_status()
+
+    async def search(self):
+        (await self.http.get(f"{API}/chat/search", params={"query": "bench"},
+                             headers=self.headers)).raise_for_status()
+
+
+async def _run_level(clients: List[Client], scenario: str, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def loop(client: Client):
+        nonlocal errors
+        call = getattr(client, scenario)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                ttft = await call()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if ttft is not None:
+                ttfts.append(ttft)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(loop(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": scenario,
+        "concurrency": len(clients),
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": _percentiles(latencies),
+        "ttft_ms": _percentiles(ttfts),
+    }
+
+
+async def _wait_ready(http: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Benchmark server exited with code {server.returncode}")
+        try:
+            if (await http.get(f"{API}/system/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("Benchmark server did not become ready")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    levels = [int(level) for level in args.concurrency.split(",")]
+    scenarios = [name.strip() for name in args.scenarios.split(",")]
+    jwks = LocalJWKS().start()
+    port = _free_port()
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.load.server",
+        "--clerk-url", jwks.url, "--port", str(port),
+        "--ttft", str(args.ttft), "--tps", str(args.tps), "--tokens", str(args.tokens),
+        "--search-ratio", str(args.search_ratio), "--search-latency", str(args.search_latency),
+    ])
+    limits = httpx.Limits(max_connections=max(levels) * 2, max_keepalive_connections=max(levels) * 2)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as http:
+            await _wait_ready(http, server)
+            run_id = os.urandom(3).hex()
+            clients = [Client(http, jwks.token(f"bench-{run_id}-{i}")) for i in range(max(levels))]
+            await asyncio.gather(*(client.setup(args.seed_turns) for client in clients))
+
+            results = []
+            for scenario in scenarios:
+                for level in levels:
+                    if args.warmup > 0:
+                        await _run_level(clients[:level], scenario, args.warmup)
+                    result = await _run_level(clients[:level], scenario, args.duration)
+                    results.append(result)
+                    _print_result(result)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        jwks.stop()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "duration_seconds": args.duration,
+            "fake_llm": {"ttft": args.ttft, "tokens_per_second": args.tps, "output_tokens": args.tokens},
+            "fake_search": {"ratio": args.search_ratio, "latency": args.search_latency},
+        },
+        "results": results,
+    }
+
+
+def _print_result(result: Dict[str, Any]):
+    latency = result["latency_ms"] or {}
+    line = (
+        f"{result['scenario']:<8} c={result['concurrency']:<4} {result['rps']:>9.1f} rps  "
+        f"p50 {latency.get('p50', 0):>8.1f}  p95 {latency.get('p95', 0):>8.1f}  p99 {latency.get('p99', 0):>8.1f} ms"
+    )
+    if result["ttft_ms"]:
+        line += f"  ttft p50 {result['ttft_ms']['p50']:.1f} p95 {result['ttft_ms']['p95']:.1f} ms"
+    if result["errors"]:
+        line += f"  errors {result['errors']}"
+    print(line, flush=True)
+
+
+def compare(old_path: str, new_path: str):
+    """Print the change of RPS and latency/TTFT percentiles between two result files"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    baseline = {(r["scenario"], r["concurrency"]): r for r in old["results"]}
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+
+    def delta(before: Optional[float], after: Optional[float]) -> str:
+        if not before or after is None:
+            return "     n/a"
+        return f"{(after - before) / before * 100:+7.1f}%"
+
+    for result in new["results"]:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        old_latency, new_latency = before["latency_ms"] or {}, result["latency_ms"] or {}
+        line = (
+            f"{result['scenario']:<8} c={result['concurrency']:<4} rps {delta(before['rps'], result['rps'])}  "
+            f"p50 {delta(old_latency.get('p50'), new_latency.get('p50'))}  "
+            f"p99 {delta(old_latency.get('p99'), new_latency.get('p99'))}"
+        )
+        if result["ttft_ms"] and before["ttft_ms"]:
+            line += f"  ttft p50 {delta(before['ttft_ms']['p50'], result['ttft_ms']['p50'])}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated client counts")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per scenario and level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each level")
+    parser.add_argument("--seed-turns", type=int, default=2, help="Turns per thread before measuring")
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tps", type=float, default=80.0)
+    parser.add_argument("--tokens", type=int, default=120)
+    parser.add_argument("--search-ratio", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.4)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Runs the app under uvicorn with the load-benchmark fakes installed.
+
+Started by ``benchmarks.load.run``; the database settings come from the
+environment as usual (it needs a reachable Postgres), the LLM and search
+backends and the Clerk instance are replaced by local stand-ins.
+
+Usage:
+    python -m benchmarks.load.server --clerk-url http://127.0.0.1:PORT [--port 8765] [--ttft 0.3] ...
+"""
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clerk-url", required=True, help="Base URL of the JWKS stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Fake LLM time to first token (s)")
+    parser.add_argument("--tps", type=float, default=80.0, help="Fake LLM output tokens per second")
+    parser.add_argument("--tokens", type=int, default=120, help="Fake LLM answer length in tokens")
+    parser.add_argument("--search-ratio", type=float, default=0.5, help="Share of questions that run a search")
+    parser.add_argument("--search-latency", type=float, default=0.4, help="Fake search latency (s)")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so they are set before the app is imported
+    os.environ["CLERK_INSTANCE_URL"] = args.clerk_url
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("TAVILY_API_KEY", "bench")
+    os.environ.setdefault("LLM_PROVIDERS", "groq")
+    # Measure the service, not the per-user rate limit; background job workers only add polling noise
+    os.environ.setdefault("LLM_USER_RATE_PER_MINUTE", "1000000")
+    os.environ.setdefault("LLM_USER_BURST", "100000")
+    os.environ.setdefault("CHAT_JOB_WORKERS", "0")
+
+    import uvicorn
+
+    from app.main import app
+    from benchmarks.load.fakes import install_fakes
+
+    install_fakes(
+        ttft=args.ttft,
+        tokens_per_second=args.tps,
+        output_tokens=args.tokens,
+        search_ratio=args.search_ratio,
+        search_latency=args.search_latency,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
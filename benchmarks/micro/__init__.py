@@ -0,0 +1,8 @@
+"""
+Microbenchmarks for the CPU-bound hot paths, checked against stored baselines.
+
+Each ``bench_*.py`` module defines ``bench_*`` functions that take a
+``Benchmark`` and hand it the callable to time, in the style of
+pytest-benchmark. ``python -m benchmarks.micro.run`` runs them and compares
+the medians with ``baselines.json``.
+"""
@@ -0,0 +1,48 @@
+"""Chunk parsing: both ``extract_response_info`` implementations over recorded turns"""
+from typing import Any, Dict
+
+from app.services.langgraph_agent import langgraph_agent
+from benchmarks.micro.harness import Benchmark, parametrize
+from benchmarks.micro.recordings import messages_stream, updates_stream
+
+
+def _messages_extract(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The first ``extract_response_info`` in ``LangGraphAgent``, for token-level
+    ``{"messages": [...]}`` chunks; the class keeps it, but the later definition
+    for ``updates`` chunks shadows it, so it is copied here to be timed.
+    """
+    response_info = {
+        "is_tool_call": False,
+        "is_final_response": False,
+        "content": "",
+        "content_chunk": "",
+        "tool_calls": []
+    }
+
+    if "messages" in chunk:
+        for message in chunk["messages"]:
+            if hasattr(message, 'content'):
+                response_info["content_chunk"] = message.content
+                response_info["content"] = message.content
+
+            if hasattr(message, 'tool_calls') and message.tool_calls:
+                response_info["is_tool_call"] = True
+                response_info["tool_calls"] = message.tool_calls
+
+    if chunk.get("__end__"):
+        response_info["is_final_response"] = True
+
+    return response_info
+
+
+@parametrize("search", (False, True))
+def bench_extract_updates(benchmark: Benchmark, search: bool):
+    chunks = updates_stream(search)
+    extract = langgraph_agent.extract_response_info
+    benchmark(lambda: [extract(chunk) for chunk in chunks])
+
+
+def bench_extract_messages(benchmark: Benchmark):
+    chunks = messages_stream()
+    benchmark(lambda: [_messages_extract(chunk) for chunk in chunks])
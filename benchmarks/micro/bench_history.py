@@ -0,0 +1,33 @@
+"""History materialization: ``LangGraphAgent.get_chat_history`` on stored checkpoints"""
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.core.checkpoint_serde import build_checkpoint_serde
+from app.core.database import db_manager
+from app.services.langgraph_agent import langgraph_agent
+from benchmarks.micro.harness import Benchmark, parametrize
+from benchmarks.micro.recordings import conversation, store_checkpoints
+
+
+def _install(benchmark: Benchmark, turns: int, every_turn: bool) -> str:
+    # The production serializer, so the timing includes decompressing the messages channel
+    db_manager.memory = InMemorySaver(serde=build_checkpoint_serde())
+    thread_id = f"bench-history-{turns}"
+    benchmark.loop.run_until_complete(
+        store_checkpoints(db_manager.memory, thread_id, conversation(turns), every_turn=every_turn)
+    )
+    return thread_id
+
+
+@parametrize("turns", (10, 100, 1000))
+def bench_get_chat_history(benchmark: Benchmark, turns: int):
+    thread_id = _install(benchmark, turns, every_turn=False)
+    history = benchmark.run_async(lambda: langgraph_agent.get_chat_history(thread_id))
+    assert len(history) == 2 * turns, len(history)
+
+
+@parametrize("turns", (10, 100))
+def bench_get_chat_history_branches(benchmark: Benchmark, turns: int):
+    """``include_branches`` scans every checkpoint of the thread"""
+    thread_id = _install(benchmark, turns, every_turn=True)
+    history = benchmark.run_async(lambda: langgraph_agent.get_chat_history(thread_id, include_branches=True))
+    assert len(history) == 2 * turns, len(history)
@@ -0,0 +1,35 @@
+"""SSE framing: the chunk loop of ``ChatService.process_chat_message_streaming``"""
+import asyncio
+from unittest import mock
+
+from app.services.chat_service import chat_service
+from app.services.langgraph_agent import langgraph_agent
+from benchmarks.micro.harness import Benchmark, parametrize
+from benchmarks.micro.recordings import updates_stream
+
+
+async def _no_sleep(_delay, result=None):
+    return result
+
+
+@parametrize("search", (False, True))
+def bench_streaming_frames(benchmark: Benchmark, search: bool):
+    chunks = updates_stream(search)
+    thread_id = f"bench-sse-{search}"
+
+    async def process_message(message, thread_id, checkpoint_id=None, message_id=None):
+        for chunk in chunks:
+            yield chunk
+
+    async def turn():
+        return [frame async for frame in chat_service.process_chat_message_streaming(
+            "What is the weather in Paris?", thread_id, "bench-user"
+        )]
+
+    # Replay the recorded turn instead of running the graph, and drop the per-chunk pacing
+    # delay so the loop's own cost is what gets timed
+    with mock.patch.object(langgraph_agent, "process_message", process_message), \
+            mock.patch.object(asyncio, "sleep", _no_sleep):
+        frames = benchmark.run_async(turn)
+    assert b'"stream_end"' in frames[-1], frames[-1]
+    benchmark.extra["frames"] = len(frames)
@@ -0,0 +1,33 @@
+"""Thread list responses: ``ThreadResponse`` construction as in ``/chat/titles`` and ``/chat/search``"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.schemas.threads import ThreadResponse
+from benchmarks.micro.harness import Benchmark, parametrize
+
+
+def _rows(count: int):
+    """Rows as the pool's ``dict_row`` factory returns them"""
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": uuid.UUID(int=i + 1),
+            "user_id": "user_2bench",
+            "thread_title": f"Benchmark chat {i} about the weather",
+            "created_at": started + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+@parametrize("rows", (1000,))
+def bench_thread_responses(benchmark: Benchmark, rows: int):
+    records = _rows(rows)
+    benchmark(lambda: [
+        ThreadResponse(
+            id=row['id'],
+            user_id=row['user_id'],
+            thread_title=row['thread_title'],
+            created_at=row['created_at']
+        ) for row in records
+    ])
@@ -0,0 +1,101 @@
+"""
+Timing harness for the microbenchmarks.
+
+``Benchmark`` times a callable the way pytest-benchmark does: one warmup
+call, then enough calls per round for a round to last ``min_time``, and
+``rounds`` rounds. Each round gives one per-call time; their min, median
+and max are recorded.
+"""
+import asyncio
+import gc
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+def parametrize(name: str, values: Iterable[Any]):
+    """Run a ``bench_*`` function once per value, passed as the keyword ``name``"""
+
+    def decorate(fn):
+        fn.params = (name, list(values))
+        return fn
+
+    return decorate
+
+
+def calibrate(repeat: int = 3) -> float:
+    """Seconds for a fixed pure-Python workload, used to scale baselines between machines"""
+    def workload():
+        data = {f"key{i}": [i, str(i), {"n": i}] for i in range(2000)}
+        return sorted(data.items(), key=lambda item: item[1][1])
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(20):
+            workload()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class Benchmark:
+    """Fixture handed to each ``bench_*`` function; call it with the function to time"""
+
+    def __init__(self, name: str, rounds: int = 7, min_time: float = 0.02):
+        self.name = name
+        self.rounds = rounds
+        self.min_time = min_time
+        self.stats: Optional[Dict[str, Any]] = None
+        self.extra: Dict[str, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __call__(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        result = fn(*args, **kwargs)
+
+        # Calls per round so that the timer resolution does not matter
+        iterations = 1
+        while True:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                fn(*args, **kwargs)
+            if time.perf_counter() - started >= self.min_time or iterations >= 1 << 20:
+                break
+            iterations *= 2
+
+        timings: List[float] = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(self.rounds):
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    fn(*args, **kwargs)
+                timings.append((time.perf_counter() - started) / iterations)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        self.stats = {
+            "median": statistics.median(timings),
+            "min": min(timings),
+            "max": max(timings),
+            "rounds": self.rounds,
+            "iterations": iterations,
+        }
+        return result
+
+    def run_async(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Time a coroutine; ``factory`` returns a fresh awaitable per call"""
+        return self(lambda: self.loop.run_until_complete(factory()))
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop for async setup and ``run_async``, closed by ``close``"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
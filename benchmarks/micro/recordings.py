@@ -0,0 +1,116 @@
+"""
+Synthetic inputs for the microbenchmarks: conversations, checkpoints and the
+chunk streams the agent yields for one turn. Everything is seeded, so every
+run times the same data.
+"""
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver, empty_checkpoint
+
+TOOL_NAME = "tavily_search_results_json"
+
+WORDS = (
+    "the a of to in and is for on that with as by at from market report said new year city "
+    "weather rain temperature forecast price company team season policy data study energy growth"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _search_results(rng: random.Random, turn: int) -> str:
+    return json.dumps([
+        {
+            "title": f"Result {i} for question {turn}",
+            "url": f"https://example.com/articles/{turn}/{i}",
+            "content": _text(rng, 80),
+            "score": round(0.9 - i / 10, 2),
+        }
+        for i in range(3)
+    ])
+
+
+def conversation(turns: int, answer_words: int = 80) -> List[BaseMessage]:
+    """A thread where every other turn runs a search, with the message timestamps the agent stores"""
+    rng = random.Random(turns)
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    messages: List[BaseMessage] = []
+    for turn in range(turns):
+        timestamp = (started + timedelta(minutes=turn)).isoformat()
+        messages.append(HumanMessage(
+            f"Question {turn}: what is the latest on topic {turn}?",
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            additional_kwargs={"timestamp": timestamp},
+        ))
+        if turn % 2:
+            call_id = f"call_{turn}"
+            messages += [
+                AIMessage("", id=str(uuid.UUID(int=rng.getrandbits(128))), tool_calls=[
+                    {"name": TOOL_NAME, "args": {"query": f"topic {turn}"}, "id": call_id}
+                ]),
+                ToolMessage(_search_results(rng, turn), tool_call_id=call_id, name=TOOL_NAME,
+                            id=str(uuid.UUID(int=rng.getrandbits(128)))),
+            ]
+        messages.append(AIMessage(
+            _text(rng, answer_words),
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            additional_kwargs={"timestamp": timestamp},
+        ))
+    return messages
+
+
+async def store_checkpoints(
+        saver: BaseCheckpointSaver,
+        thread_id: str,
+        messages: List[BaseMessage],
+        every_turn: bool = False
+):
+    """
+    Write ``messages`` to ``thread_id`` as the latest checkpoint; with
+    ``every_turn`` one checkpoint per turn, like a thread that grew turn by turn.
+    """
+    ends = [i + 1 for i, m in enumerate(messages) if isinstance(m, AIMessage) and not m.tool_calls]
+    config: Dict[str, Any] = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for step, end in enumerate(ends if every_turn else ends[-1:]):
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": messages[:end]}
+        checkpoint["channel_versions"] = {"messages": step + 1}
+        config = await saver.aput(
+            config, checkpoint, {"source": "loop", "step": step, "writes": None}, {"messages": step + 1}
+        )
+
+
+def updates_stream(search: bool, answer_words: int = 120) -> List[Dict[str, Any]]:
+    """The chunks ``process_message`` yields for one turn (graph ``updates`` stream mode)"""
+    rng = random.Random(answer_words * 2 + search)
+    chunks: List[Dict[str, Any]] = []
+    if search:
+        chunks += [
+            {"agent": {"messages": [AIMessage("", id="run-1", tool_calls=[
+                {"name": TOOL_NAME, "args": {"query": "weather in Paris today"}, "id": "call_1"}
+            ])]}},
+            {"tools": {"messages": [ToolMessage(_search_results(rng, 0), tool_call_id="call_1", name=TOOL_NAME)]}},
+        ]
+    chunks.append({"agent": {"messages": [AIMessage(_text(rng, answer_words), id="run-2")]}})
+    return chunks
+
+
+def messages_stream(answer_words: int = 120) -> List[Dict[str, Any]]:
+    """A token-level stream in the ``{"messages": [chunk]}`` shape the older extractor reads"""
+    rng = random.Random(answer_words)
+    words = _text(rng, answer_words).split(" ")
+    chunks = [{"messages": [AIMessageChunk(content="", id="run-1", tool_call_chunks=[
+        {"name": TOOL_NAME, "args": '{"query": "weather in Paris today"}', "id": "call_1", "index": 0}
+    ])]}]
+    chunks += [
+        {"messages": [AIMessageChunk(content=word if i == 0 else " " + word, id="run-2")]}
+        for i, word in enumerate(words)
+    ]
+    chunks.append({"__end__": True})
+    return chunks
@@ -0,0 +1,195 @@
+"""
+Microbenchmark runner with a regression gate.
+
+Runs every ``bench_*`` function of the ``benchmarks/micro/bench_*.py``
+modules and compares each per-call time (the fastest round by default, the
+least disturbed by other processes) with ``baselines.json``. Baselines
+are scaled by a calibration workload timed after every case on both
+machines (the fastest of them, like the benchmark times), so a baseline
+recorded on a laptop still applies in CI. A benchmark more than
+``--threshold`` slower than its scaled baseline, also when run again, fails
+the run (exit code 1).
+
+Usage:
+    python -m benchmarks.micro.run [-k history] [--threshold 0.25] [--json]
+    python -m benchmarks.micro.run --save        # record new baselines after an intended change
+"""
+import argparse
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import platform
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+
+def _configure_env():
+    # Settings are read at import time; the benchmarks never reach the LLM or search APIs
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("TAVILY_API_KEY", "bench")
+    os.environ.setdefault("LLM_PROVIDERS", "groq")
+    os.environ.setdefault("THREAD_LOCK_BACKEND", "local")
+    os.environ.setdefault("TRACING_ENABLED", "false")
+    # The streaming benchmark runs thousands of turns for one user
+    os.environ.setdefault("LLM_USER_RATE_PER_MINUTE", "100000000")
+    os.environ.setdefault("LLM_USER_BURST", "10000000")
+
+
+def collect(
+        keyword: Optional[str],
+        names: Optional[Set[str]] = None
+) -> List[Tuple[str, Callable[..., Any], Dict[str, Any]]]:
+    """``(name, function, kwargs)`` for every benchmark case, in module order"""
+    import benchmarks.micro as package
+
+    cases = []
+    for info in sorted(pkgutil.iter_modules(package.__path__), key=lambda info: info.name):
+        if not info.name.startswith("bench_"):
+            continue
+        module = importlib.import_module(f"benchmarks.micro.{info.name}")
+        functions = [
+            fn for name, fn in inspect.getmembers(module, inspect.isfunction)
+            if name.startswith("bench_") and fn.__module__ == module.__name__
+        ]
+        for fn in sorted(functions, key=lambda fn: fn.__code__.co_firstlineno):
+            base = f"{info.name[len('bench_'):]}.{fn.__name__[len('bench_'):]}"
+            params = getattr(fn, "params", None)
+            if params is None:
+                variants = [(base, {})]
+            else:
+                param, values = params
+                variants = [(f"{base}[{param}={value}]", {param: value}) for value in values]
+            cases += [
+                (name, fn, kwargs) for name, kwargs in variants
+                if (not keyword or keyword in name) and (names is None or name in names)
+            ]
+    return cases
+
+
+def run(args: argparse.Namespace, names: Optional[Set[str]] = None) -> Dict[str, Any]:
+    _configure_env()
+    from benchmarks.micro.harness import Benchmark, calibrate
+
+    calibration = float("inf")
+    results: Dict[str, Any] = {}
+    for name, fn, kwargs in collect(args.keyword, names):
+        benchmark = Benchmark(name, rounds=args.rounds, min_time=args.min_time)
+        try:
+            fn(benchmark, **kwargs)
+        finally:
+            benchmark.close()
+        if benchmark.stats is None:
+            raise RuntimeError(f"{name} did not call the benchmark fixture")
+        results[name] = dict(benchmark.stats, **benchmark.extra)
+        calibration = min(calibration, calibrate())
+        if not args.json:
+            print(f"{name:<50} {benchmark.stats[args.stat] * 1e6:>12.1f} us", flush=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "calibration_seconds": calibration,
+        },
+        "results": results,
+    }
+
+
+def check(
+        current: Dict[str, Any],
+        baseline: Dict[str, Any],
+        threshold: float,
+        stat: str = "min",
+        scale: bool = True
+) -> List[Dict[str, Any]]:
+    """Compare ``stat`` with the baseline; ``scale`` adjusts for the calibration speed of both runs"""
+    factor = 1.0
+    if scale:
+        factor = current["meta"]["calibration_seconds"] / baseline["meta"]["calibration_seconds"]
+
+    rows = []
+    for name, stats in current["results"].items():
+        before = baseline["results"].get(name)
+        expected = before[stat] * factor if before else None
+        change = stats[stat] / expected - 1 if expected else None
+        rows.append({
+            "name": name,
+            f"{stat}_us": round(stats[stat] * 1e6, 2),
+            "baseline_us": round(expected * 1e6, 2) if expected else None,
+            "change": round(change, 4) if change is not None else None,
+            "regressed": change is not None and change > threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.02, help="Minimum seconds per round")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--stat", choices=("min", "median"), default="min", help="Per-call time to compare")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--no-scale", action="store_true", help="Compare raw times, without calibration scaling")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.save and args.keyword:
+        # Baselines share one calibration, so they are recorded together
+        parser.error("--save records every benchmark and cannot be combined with -k")
+
+    current = run(args)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --save")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = check(current, baseline, args.threshold, stat=args.stat, scale=not args.no_scale)
+
+    slow = {row["name"] for row in rows if row["regressed"]}
+    if slow:
+        # Another process can slow a single case down; only a case that is slow twice counts
+        if not args.json:
+            print(f"\nRe-running {len(slow)} slow benchmark(s)")
+        retry = run(args, names=slow)
+        for name, stats in retry["results"].items():
+            if stats[args.stat] < current["results"][name][args.stat]:
+                current["results"][name] = stats
+        rows = check(current, baseline, args.threshold, stat=args.stat, scale=not args.no_scale)
+
+    if args.json:
+        print(json.dumps({"meta": current["meta"], "comparison": rows}, indent=2))
+    else:
+        print()
+        for row in rows:
+            if row["change"] is None:
+                status = "no baseline"
+            else:
+                status = f"{row['change'] * 100:+7.1f}% vs {row['baseline_us']:.1f} us"
+                if row["regressed"]:
+                    status += "  REGRESSION"
+            print(f"{row['name']:<50} {status}")
+
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than "
+              f"{args.threshold * 100:.0f}%: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+SSE frame encoding benchmark.
+
+Compares the original per-frame encoding (dict + ``datetime.utcnow()`` +
+``json.dumps`` + f-string) with ``SSEEventEncoder`` and reports frames per
+second on a single core.
+
+Usage:
+    python -m benchmarks.sse_encoder [--frames 200000] [--repeat 5] [--json]
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from app.utils.sse import JSON_BACKEND, SSEEventEncoder
+
+CHUNKS = [
+    "The capital of",
+    "France is Paris.",
+    "It is known",
+    "for the Eiffel",
+    "Tower, the Louvre",
+    "and café culture — très bien!",
+]
+TOOL_CALLS = [{"tool_name": "tavily_search_results_json", "query": "weather in Paris today"}]
+
+
+def _legacy_content(thread_id: str, message_id: str) -> Callable[[str], str]:
+    def encode(content: str) -> str:
+        content_response = {
+            "type": "content_chunk",
+            "content": content,
+            "thread_id": thread_id,
+            "message_id": message_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        return f"data: {json.dumps(content_response)}\n\n"
+    return encode
+
+
+def _legacy_tool_calls(thread_id: str, message_id: str) -> Callable[[str], str]:
+    def encode(_: str) -> str:
+        tool_response = {
+            "type": "tool_calls",
+            "tool_calls": TOOL_CALLS,
+            "thread_id": thread_id,
+            "message_id": message_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        return f"data: {json.dumps(tool_response)}\n\n"
+    return encode
+
+
+def _measure(encode: Callable[[str], object], frames: int, repeat: int) -> float:
+    """Return the best frames/second over ``repeat`` runs"""
+    best = 0.0
+    chunks = CHUNKS
+    n_chunks = len(chunks)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(frames):
+            encode(chunks[i % n_chunks])
+        elapsed = time.perf_counter() - start
+        best = max(best, frames / elapsed)
+    return best
+
+
+def run(frames: int, repeat: int) -> Dict[str, object]:
+    thread_id = str(uuid.uuid4())
+    message_id = str(uuid.uuid4())
+    encoder = SSEEventEncoder(thread_id, message_id)
+
+    cases: List[Dict[str, object]] = []
+    for name, legacy, fast in (
+        ("content_chunk", _legacy_content(thread_id, message_id), encoder.content_chunk),
+        ("tool_calls", _legacy_tool_calls(thread_id, message_id),
+         lambda _: encoder.encode("tool_calls", tool_calls=TOOL_CALLS)),
+    ):
+        legacy_fps = _measure(legacy, frames, repeat)
+        fast_fps = _measure(fast, frames, repeat)
+        cases.append({
+            "frame": name,
+            "legacy_frames_per_sec": round(legacy_fps),
+            "encoder_frames_per_sec": round(fast_fps),
+            "speedup": round(fast_fps / legacy_fps, 2),
+        })
+
+    return {"json_backend": JSON_BACKEND, "frames": frames, "repeat": repeat, "cases": cases}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    # Numbers are reported per core, so keep the process on a single CPU where supported
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+    results = run(args.frames, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"JSON backend: {results['json_backend']}  ({args.frames} frames x {args.repeat} runs, 1 core)")
+    for case in results["cases"]:  # type: ignore[union-attr]
+        print(
+            f"  {case['frame']:<14} legacy {case['legacy_frames_per_sec']:>10,} fps   "
+            f"encoder {case['encoder_frames_per_sec']:>10,} fps   x{case['speedup']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
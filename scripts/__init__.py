@@ -0,0 +1,3 @@
+"""
+Maintenance scripts for FastAPI LangGraph Chatbot
+"""
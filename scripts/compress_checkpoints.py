@@ -0,0 +1,128 @@
+"""
+Rewrite existing checkpoint blobs with the configured compression.
+
+Walks ``checkpoint_blobs`` and ``checkpoint_writes`` in primary-key order and
+rewrites, batch by batch, every blob that would be compressed if it were
+written today. Rows are only updated if their type tag is unchanged, so the
+script is safe to run while the API is serving traffic and can be resumed at
+any point. ``--decompress`` reverts all rows to the plain format, which is
+needed before rolling back to a build without ``app/core/checkpoint_serde.py``.
+
+Usage:
+    python -m scripts.compress_checkpoints [--codec zstd] [--batch-size 500] [--dry-run]
+    python -m scripts.compress_checkpoints --decompress
+"""
+import argparse
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from psycopg import AsyncConnection
+
+from app.core.checkpoint_serde import TAG_SEPARATOR, CompressedSerializer
+from app.core.config import settings
+
+# Primary key columns per table, used for keyset pagination
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "checkpoint_blobs": ("thread_id", "checkpoint_ns", "channel", "version"),
+    "checkpoint_writes": ("thread_id", "checkpoint_ns", "checkpoint_id", "task_id", "idx"),
+}
+
+
+def _rewrite(serde: CompressedSerializer, type_: str, blob: bytes, decompress: bool) -> Tuple[str, bytes]:
+    if decompress:
+        return serde.decompress_typed(type_, blob)
+    return serde.compress_typed(type_, blob)
+
+
+async def migrate_table(
+        conn: AsyncConnection,
+        table: str,
+        serde: CompressedSerializer,
+        batch_size: int,
+        decompress: bool,
+        dry_run: bool
+) -> Dict[str, int]:
+    key = TABLES[table]
+    columns = ", ".join(key)
+    placeholders = ", ".join(["%s"] * len(key))
+    match = " AND ".join(f"{column} = %s" for column in key)
+    # Only rows that can change: plain rows when compressing, tagged rows when decompressing
+    type_filter = "type LIKE %s" if decompress else "type NOT LIKE %s"
+    select_sql = (
+        f"SELECT {columns}, type, blob FROM {table} "
+        f"WHERE {{after}}blob IS NOT NULL AND {type_filter} "
+        f"ORDER BY {columns} LIMIT %s"
+    )
+    first_sql = select_sql.format(after="")
+    next_sql = select_sql.format(after=f"({columns}) > ({placeholders}) AND ")
+    update_sql = f"UPDATE {table} SET type = %s, blob = %s WHERE {match} AND type = %s"
+
+    stats = {"scanned": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+    last_key: Optional[Tuple] = None
+    tag_pattern = f"%{TAG_SEPARATOR}%"
+    while True:
+        if last_key is None:
+            cur = await conn.execute(first_sql, (tag_pattern, batch_size))
+        else:
+            cur = await conn.execute(next_sql, (*last_key, tag_pattern, batch_size))
+        rows = await cur.fetchall()
+        if not rows:
+            break
+
+        updates: List[Tuple] = []
+        for row in rows:
+            row_key, type_, blob = tuple(row[:len(key)]), row[len(key)], bytes(row[len(key) + 1])
+            stats["scanned"] += 1
+            stats["bytes_before"] += len(blob)
+            new_type, new_blob = _rewrite(serde, type_, blob, decompress)
+            stats["bytes_after"] += len(new_blob)
+            if new_type != type_:
+                updates.append((new_type, new_blob, *row_key, type_))
+
+        if updates and not dry_run:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    await cur.executemany(update_sql, updates)
+        stats["rewritten"] += len(updates)
+        last_key = tuple(rows[-1][:len(key)])
+        print(f"  {table}: {stats['scanned']:,} scanned, {stats['rewritten']:,} rewritten", flush=True)
+
+    return stats
+
+
+async def run(codec: Optional[str], batch_size: int, decompress: bool, dry_run: bool):
+    serde = CompressedSerializer(
+        codec=codec or settings.CHECKPOINT_COMPRESSION,
+        min_bytes=settings.CHECKPOINT_COMPRESSION_MIN_BYTES,
+        level=settings.CHECKPOINT_COMPRESSION_LEVEL,
+    )
+    if serde.codec is None and not decompress:
+        print("Checkpoint compression is disabled (CHECKPOINT_COMPRESSION=none), nothing to do")
+        return
+
+    action = "Decompressing" if decompress else f"Compressing with {serde.codec}"
+    print(f"{action} checkpoint blobs of at least {serde.min_bytes} bytes{' (dry run)' if dry_run else ''}")
+    async with await AsyncConnection.connect(
+            settings.PSYCOPG_DATABASE_URL, autocommit=True, sslmode=settings.PSQL_SSLMODE
+    ) as conn:
+        for table in TABLES:
+            stats = await migrate_table(conn, table, serde, batch_size, decompress, dry_run)
+            saved = stats["bytes_before"] - stats["bytes_after"]
+            print(
+                f"{table}: {stats['rewritten']:,}/{stats['scanned']:,} rows rewritten, "
+                f"{stats['bytes_before']:,} -> {stats['bytes_after']:,} bytes ({saved:+,} saved)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codec", choices=["zstd", "zlib"], help="Defaults to CHECKPOINT_COMPRESSION")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--decompress", action="store_true", help="Rewrite compressed rows back to plain")
+    parser.add_argument("--dry-run", action="store_true", help="Report savings without writing")
+    args = parser.parse_args()
+    asyncio.run(run(args.codec, args.batch_size, args.decompress, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+
+# Settings are read at import time; the tests never reach the LLM or search APIs
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+os.environ.setdefault("LLM_PROVIDERS", "groq")
+os.environ.setdefault("THREAD_LOCK_BACKEND", "local")
+os.environ.setdefault("TRACING_ENABLED", "false")
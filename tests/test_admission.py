@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController
+
+
+def make_controller(max_concurrency: int = 1) -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        user_rate_per_minute=6000,
+        user_burst=10,
+        max_queue_size=10,
+        queue_timeout=5,
+        max_rate_delay=1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_skipped_by_a_release_in_the_same_iteration():
+    controller = make_controller()
+    holder = controller.enqueue("a")
+    await holder.acquire()
+
+    waiting = controller.enqueue("b")
+    task = asyncio.create_task(waiting.acquire())
+    await asyncio.sleep(0)
+    assert controller.snapshot()["waiting"] == 1
+
+    # Cancelling the task cancels the waiter's future at once; its own cleanup runs only later
+    task.cancel()
+    holder.release()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert controller.snapshot() == {"active": 0, "waiting": 0, "max_concurrency": 1}
+    # The slot is free and the cancelled user's token was refunded
+    assert controller._buckets["b"].tokens == pytest.approx(10, abs=0.1)
+    after = controller.enqueue("c")
+    assert after.position == 0
+    await after.acquire()
+    after.release()
+    assert controller.snapshot()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_order_as_slots_free():
+    controller = make_controller()
+    first = controller.enqueue("a")
+    await first.acquire()
+    second = controller.enqueue("b")
+    assert second.position == 1
+
+    task = asyncio.create_task(second.acquire())
+    first.release()
+    await task
+    assert controller.snapshot()["active"] == 1
+    second.release()
+    assert controller.snapshot()["active"] == 0
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.core.database import db_manager
+from app.services import chat_jobs
+from app.services.chat_jobs import ChatJobWorker
+from app.services.langgraph_agent import langgraph_agent
+from app.services.llm_router import LLMProvider, LLMRouter
+from app.services.tools import build_tool_node, guard_tool
+
+
+class ToolCallingFake(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def answers():
+    yield AIMessage("", tool_calls=[{"name": "search", "args": {"query": "weather"}, "id": "call-1"}])
+    while True:
+        yield AIMessage("It is sunny.")
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """The real agent on an in-memory checkpointer, with a search tool that waits for ``gate``"""
+    gate = asyncio.Event()
+    searching = asyncio.Event()
+
+    @tool
+    async def search(query: str) -> str:
+        """Search the web"""
+        searching.set()
+        await gate.wait()
+        return "Sunny all day"
+
+    monkeypatch.setattr(langgraph_agent, "llm", LLMRouter(providers=[LLMProvider("fake", ToolCallingFake(messages=answers()))]))
+    monkeypatch.setattr(langgraph_agent, "tavily", guard_tool(search))
+    monkeypatch.setattr(langgraph_agent, "tool_node", build_tool_node([langgraph_agent.tavily]))
+    monkeypatch.setattr(langgraph_agent, "context_window", None)
+    monkeypatch.setattr(db_manager, "memory", InMemorySaver())
+    return gate, searching
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """A worker whose job and event tables are replaced by in-memory records"""
+    worker = ChatJobWorker(
+        concurrency=1, poll_interval=1, heartbeat_interval=1, stale_after=10,
+        max_attempts=3, retention_hours=1, event_flush_interval=0
+    )
+    worker.finished = []
+
+    async def finish(job_id, status, result=None, error=None, delay=0.0):
+        worker.finished.append((status, result, error))
+
+    async def flush(self):
+        self._pending = []
+
+    monkeypatch.setattr(worker, "_finish", finish)
+    monkeypatch.setattr(chat_jobs._EventWriter, "flush", flush)
+    return worker
+
+
+@pytest.mark.asyncio
+async def test_job_interrupted_by_shutdown_resumes_instead_of_resending(agent, worker):
+    gate, searching = agent
+    job = {"id": "job-1", "thread_id": "thread-1", "user_id": "user-1", "message": "Weather?",
+           "attempts": 1, "last_seq": 0}
+
+    # Shut down while the turn waits on its tool call; the user message is already checkpointed
+    run = asyncio.create_task(worker._run_job(dict(job)))
+    await asyncio.wait_for(searching.wait(), timeout=5)
+    worker._stopping = True
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+    assert worker.finished == []
+
+    # The graceful re-queue refunds the attempt, so the next claim sees attempts == 1 again
+    worker._stopping = False
+    gate.set()
+    await asyncio.wait_for(worker._run_job(dict(job)), timeout=5)
+
+    status, result, error = worker.finished[-1]
+    assert (status, error) == ("succeeded", None)
+    assert result["response"] == "It is sunny."
+
+    history = await langgraph_agent.get_chat_history("thread-1")
+    assert [(m["role"], m["content"]) for m in history] == [("user", "Weather?"), ("assistant", "It is sunny.")]
+    assert history[0]["message_id"] == "job-1"